@@ -49,10 +49,22 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'investment_manager.routers.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'investment_manager.querycount.QueryCountMiddleware',
 ]
 
+# Requests running more queries than this are logged by QueryCountMiddleware
+QUERY_COUNT_WARNING_THRESHOLD = 50
+
+# Serve the list and individual_* pages with the coroutine views in async_views.py.
+# Turn on when running under ASGI (see README); under WSGI the sync views are cheaper.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '') == '1'
+
+# Currency that consolidated totals are converted into, using the FxRate table
+REPORTING_CURRENCY = os.environ.get('REPORTING_CURRENCY', 'usd')
+
 ROOT_URLCONF = 'LISP.urls'
 
 # TEMPLATE_DIR_DATATB = os.path.join(BASE_DIR, "django_dyn_dt/templates")
@@ -90,6 +102,47 @@ DATABASES = {
     }
 }
 
+# Read replica for reports, exports and analytics (see investment_manager/routers.py).
+# REPLICA_DB_HOST points at a streaming replica of 'default' and turns the routing on.
+# REPLICA_DB_NAME on its own adds a second local database standing in for a replica,
+# which the routing tests use; routing stays off for everything else.
+REPLICA_DATABASE_ALIAS = None
+if os.environ.get('REPLICA_DB_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['REPLICA_DB_HOST'],
+        'PORT': os.environ.get('REPLICA_DB_PORT', DATABASES['default']['PORT']),
+        'NAME': os.environ.get('REPLICA_DB_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASE_ALIAS = 'replica'
+elif os.environ.get('REPLICA_DB_NAME'):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['REPLICA_DB_NAME']}
+
+DATABASE_ROUTERS = ['investment_manager.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Client summaries, rendered fragments and the reload counters of the FX rate table
+# and fee schedule live here, so every web worker and management command has to
+# share it. REDIS_URL selects Redis; without it each process gets a private
+# LocMemCache, which only suits runserver and the tests.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Web worker processes, also read by gunicorn. Above 1 the app refuses to start on a per-process cache
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# After a write, a browser's reads stay on the primary this long so it sees its own changes
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -1,4 +1,4 @@
 from django.contrib import admin
-from .models import Client, Investment, Contribution
+from .models import Client, ClientBalance, FeeSchedule, Investment, Contribution
 
-admin.site.register((Client, Investment, Contribution))
+admin.site.register((Client, ClientBalance, Investment, Contribution, FeeSchedule))
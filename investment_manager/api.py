@@ -0,0 +1,246 @@
+from datetime import date
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from . import ledger, maturities, portfolios, search, simulations
+from .fragments import conditional_on
+from .models import Client, Contribution, Investment
+from .pagination import keyset_page, parse_page_size
+from .routers import reads_from_replica
+from .summaries import summary_cache
+
+
+def _choice(model, field_name):
+    """Parser for a filter on a choice field, rejecting values outside its choices."""
+    choices = dict(model._meta.get_field(field_name).choices)
+
+    def parse(value):
+        if value not in choices:
+            raise ValueError(f"'{value}' is not one of {', '.join(choices)}")
+        return value
+    return parse
+
+
+# Filters map a query parameter to (lookup, parser), as in exports.EXPORTS
+CLIENT_LIST = {
+    'model': Client,
+    'fields': (
+        'id', 'full_name', 'email', 'phone', 'client_nrc', 'risk_level', 'financial_goal',
+        'expected_contribution', 'contribution_frequency', 'target_amount', 'currency', 'created_at',
+    ),
+    'sort_fields': ('id', 'full_name', 'email', 'target_amount', 'expected_contribution', 'created_at'),
+    'filters': {
+        'currency': ('currency', _choice(Client, 'currency')),
+        'risk_level': ('risk_level', _choice(Client, 'risk_level')),
+        'financial_goal': ('financial_goal', _choice(Client, 'financial_goal')),
+        'contribution_frequency': ('contribution_frequency', _choice(Client, 'contribution_frequency')),
+        'manager': ('manager_id', int),
+    },
+    'search_fields': ('full_name', 'email', 'phone', 'client_nrc'),
+    'search': search.filter_clients,
+}
+
+CONTRIBUTION_LIST = {
+    'model': Contribution,
+    'fields': (
+        'id', 'client_id', 'client__full_name', 'client__currency', 'date', 'contribution_amount',
+        'payment_method', 'fees', 'investable_amount', 'manager__first_name', 'manager__last_name', 'created_at',
+    ),
+    'sort_fields': ('id', 'date', 'contribution_amount', 'fees', 'investable_amount', 'client__full_name', 'created_at'),
+    'filters': {
+        'client': ('client_id', int),
+        'manager': ('manager_id', int),
+        'currency': ('client__currency', _choice(Client, 'currency')),
+        'payment_method': ('payment_method', _choice(Contribution, 'payment_method')),
+        'date_from': ('date__gte', date.fromisoformat),
+        'date_to': ('date__lte', date.fromisoformat),
+    },
+    'search_fields': ('client__full_name', 'description'),
+}
+
+# Status filters and sorts use current_status, computed for today, not the status stored at the last revaluation
+INVESTMENT_LIST = {
+    'model': Investment,
+    'queryset': lambda: Investment.objects.with_current_value(),
+    'fields': (
+        'id', 'client_id', 'client__full_name', 'client__currency', 'investment_type', 'investment_amount',
+        'start_date', 'maturity_date', 'expected_annual_growth_rate_percentage', 'expected_current_value',
+        'manager__first_name', 'manager__last_name', 'status', 'created_at', 'current_value', 'current_status',
+    ),
+    'sort_fields': (
+        'id', 'start_date', 'investment_amount', 'investment_type', 'current_status',
+        'expected_annual_growth_rate_percentage', 'client__full_name', 'created_at',
+    ),
+    'filters': {
+        'client': ('client_id', int),
+        'manager': ('manager_id', int),
+        'currency': ('client__currency', _choice(Client, 'currency')),
+        'status': ('current_status', _choice(Investment, 'status')),
+        'investment_type': ('investment_type', _choice(Investment, 'investment_type')),
+        'start_from': ('start_date__gte', date.fromisoformat),
+        'start_to': ('start_date__lte', date.fromisoformat),
+    },
+    'search_fields': ('client__full_name', 'description'),
+}
+
+
+# Upper bounds for a simulation run inside a request
+MAX_SIMULATION_PATHS = 20000
+MAX_SIMULATION_MONTHS = 600
+
+
+def _choice_labels(model):
+    return {field.name: dict(field.choices) for field in model._meta.fields if field.choices}
+
+
+def _paginated_list(request, spec):
+    model = spec['model']
+    queryset = spec['queryset']() if 'queryset' in spec else model.objects.all()
+
+    lookups = {}
+    for param, (lookup, parse) in spec['filters'].items():
+        value = request.GET.get(param)
+        if value:
+            try:
+                lookups[lookup] = parse(value)
+            except ValueError as e:
+                return JsonResponse({'error': f"Invalid {param}: {e}"}, status=400)
+    queryset = queryset.filter(**lookups)
+
+    text = request.GET.get('q', '').strip()
+    if text and 'search' in spec:
+        queryset = spec['search'](queryset, text)
+    elif text:
+        condition = Q()
+        for field in spec['search_fields']:
+            condition |= Q(**{f'{field}__icontains': text})
+        queryset = queryset.filter(condition)
+
+    sort = request.GET.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort_field = sort.lstrip('-')
+    if sort_field not in spec['sort_fields']:
+        return JsonResponse({'error': f"Cannot sort by '{sort_field}'"}, status=400)
+
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+        rows, next_cursor = keyset_page(
+            queryset.values(*spec['fields']),
+            sort_field,
+            descending=descending,
+            cursor=request.GET.get('cursor'),
+            page_size=page_size,
+        )
+    except ValidationError as e:
+        return JsonResponse({'error': e.messages[0]}, status=400)
+
+    labels = _choice_labels(model)
+    for row in rows:
+        for field, choices in labels.items():
+            if field in row:
+                row[f'{field}_display'] = choices.get(row[field], row[field])
+
+    return JsonResponse({'results': rows, 'next_cursor': next_cursor})
+
+
+@require_GET
+@login_required
+@conditional_on('clients')
+def client_list(request):
+    return _paginated_list(request, CLIENT_LIST)
+
+
+@require_GET
+@login_required
+@conditional_on('contributions')
+def contribution_list(request):
+    return _paginated_list(request, CONTRIBUTION_LIST)
+
+
+@require_GET
+@login_required
+@conditional_on('investments')
+def investment_list(request):
+    return _paginated_list(request, INVESTMENT_LIST)
+
+
+@require_GET
+@login_required
+def client_typeahead(request):
+    try:
+        limit = int(request.GET.get('limit', search.TYPEAHEAD_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': "limit must be a whole number"}, status=400)
+    return JsonResponse({'results': search.typeahead(request.GET.get('q', ''), limit)})
+
+
+@require_GET
+@login_required
+@reads_from_replica
+def maturity_calendar(request):
+    try:
+        today = date.fromisoformat(request.GET['date']) if request.GET.get('date') else None
+    except ValueError:
+        return JsonResponse({'error': "date must be YYYY-MM-DD"}, status=400)
+    return JsonResponse(maturities.maturity_calendar(today))
+
+
+@require_GET
+@login_required
+@reads_from_replica
+def client_balance(request, pk):
+    client = get_object_or_404(Client, pk=pk)
+    try:
+        as_of = date.fromisoformat(request.GET['date']) if request.GET.get('date') else None
+    except ValueError:
+        return JsonResponse({'error': "date must be YYYY-MM-DD"}, status=400)
+    return JsonResponse(ledger.balance_as_of(client.pk, as_of).as_dict())
+
+
+@require_GET
+@login_required
+@reads_from_replica
+def client_goal(request, pk):
+    client = get_object_or_404(Client, pk=pk)
+    try:
+        paths = int(request.GET.get('paths', simulations.DEFAULT_PATHS))
+        horizon_months = int(request.GET.get('horizon_months', simulations.DEFAULT_HORIZON_MONTHS))
+    except ValueError:
+        return JsonResponse({'error': "paths and horizon_months must be whole numbers"}, status=400)
+    if not (0 < paths <= MAX_SIMULATION_PATHS and 0 < horizon_months <= MAX_SIMULATION_MONTHS):
+        return JsonResponse({'error': f"paths must be 1-{MAX_SIMULATION_PATHS} and horizon_months 1-{MAX_SIMULATION_MONTHS}"}, status=400)
+    result = simulations.simulate_goals(Client.objects.filter(pk=client.pk), paths=paths, horizon_months=horizon_months)
+    return JsonResponse({
+        'client_id': client.pk,
+        'risk_level': client.risk_level,
+        'financial_goal': client.financial_goal,
+        'paths': paths,
+        'horizon_months': horizon_months,
+        **result.clients[client.pk],
+    })
+
+
+@require_GET
+@login_required
+@reads_from_replica
+def portfolio_valuation(request):
+    try:
+        as_of = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return JsonResponse({'error': "date must be YYYY-MM-DD"}, status=400)
+    try:
+        queryset = portfolios.filter_investments(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': f"Invalid filter: {e}"}, status=400)
+    return JsonResponse(portfolios.value_portfolios(as_of, queryset).as_dict())
+
+
+@require_GET
+@login_required
+def cache_stats(request):
+    return JsonResponse({'client_summary': summary_cache.stats()})
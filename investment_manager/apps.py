@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core.exceptions import ImproperlyConfigured
 
 
 class InvestmentManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'investment_manager'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the cache invalidation receivers)
+        from .checks import check_shared_cache
+
+        # gunicorn runs no system checks, so refuse to serve stale pages from several workers here
+        errors = [message for message in check_shared_cache(None) if message.is_serious()]
+        if errors:
+            raise ImproperlyConfigured(f"{errors[0].msg} {errors[0].hint}")
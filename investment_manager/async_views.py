@@ -0,0 +1,125 @@
+"""
+Async versions of the read-heavy pages, routed in place of the sync views when
+ASYNC_READ_VIEWS is on (see the ASGI deployment notes in the README).
+Querysets are materialised with the async ORM before rendering, so templates
+never touch the database from the event loop. The async ORM runs each query on
+the request's single database thread, so the queries a view gathers still run
+one after another; the gain is that a waiting request doesn't hold a worker.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import render
+
+from .fragments import arender_fragment, conditional_on
+from .models import Client, Contribution, Investment
+from .routers import reads_from_replica
+from .summaries import reporting_summary, summary_cache
+
+
+def async_login_required(view):
+    """login_required for coroutine views; resolves the user without blocking the event loop."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user  # so templates and context processors don't look it up again synchronously
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _listed(queryset):
+    return [row async for row in queryset]
+
+
+async def _client_or_404(queryset, pk):
+    try:
+        return await queryset.aget(pk=pk)
+    except Client.DoesNotExist:
+        raise Http404("No Client matches the given query.")
+
+
+async def _render(request, template_name, context):
+    # Rendering is CPU work on fully loaded objects; keep it off the event loop
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@async_login_required
+@conditional_on('clients')
+async def all_client_data(request):
+    async def context():
+        return {'clients': await _listed(Client.objects.all())}
+    return await arender_fragment(request, 'investment_manager/clients.html', context)
+
+
+@async_login_required
+@conditional_on('contributions')
+async def all_contribution_data(request):
+    async def context():
+        return {'contributions': await _listed(Contribution.objects.select_related('client', 'manager'))}
+    return await arender_fragment(request, 'investment_manager/all_client_contributions.html', context)
+
+
+@async_login_required
+@conditional_on('investments')
+async def all_investment_data(request):
+    async def context():
+        return {'investments': await _listed(Investment.objects.with_current_value().select_related('client', 'manager'))}
+    return await arender_fragment(request, 'investment_manager/all_client_investments.html', context)
+
+
+@async_login_required
+@reads_from_replica
+async def individual_client_data(request, pk):
+    client_data, summary = await asyncio.gather(
+        _client_or_404(Client.objects.select_related('manager'), pk),
+        summary_cache.aget(pk),
+    )
+    context = {
+        'client_data': client_data,
+        'summary': summary,
+        # The rate table may need a reload from the database
+        'reporting': await sync_to_async(reporting_summary)(summary, client_data.currency),
+    }
+    return await _render(request, 'investment_manager/individual_client.html', context)
+
+
+@async_login_required
+@reads_from_replica
+async def individual_contribution_data(request, pk):
+    client, summary, contributions = await asyncio.gather(
+        _client_or_404(Client.objects.all(), pk),
+        summary_cache.aget(pk),
+        _listed(Contribution.objects.filter(client_id=pk).select_related('client', 'manager')),
+    )
+    context = {
+        'client_data': client,
+        'contributions': contributions,
+        'total_contributions': summary['contribution_count'],
+        'total_amount_contributed': summary['total_contributed'],
+        'total_fees': summary['total_fees'],
+    }
+    return await _render(request, 'investment_manager/individual_contributions.html', context)
+
+
+@async_login_required
+@reads_from_replica
+async def individual_investment_data(request, pk):
+    client, summary, investments = await asyncio.gather(
+        _client_or_404(Client.objects.all(), pk),
+        summary_cache.aget(pk),
+        _listed(Investment.objects.filter(client_id=pk).with_current_value().select_related('client', 'manager')),
+    )
+    context = {
+        'client_data': client,
+        'investments': investments,
+        'total_investments': summary['investment_count'],
+        'total_amount_invested': summary['total_invested'],
+        'total_current_value': summary['current_value'],
+        'amount_available': summary['available'],
+    }
+    return await _render(request, 'investment_manager/individual_investments.html', context)
@@ -0,0 +1,208 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import fx
+from .models import AumSnapshot, AumSnapshotRun, Client, Contribution, Investment
+
+
+CASH = 'cash'  # investment_type used for uninvested client funds
+ZERO = Decimal('0.00')
+
+INVESTMENT_DIMENSIONS = {
+    'group_type': F('investment_type'),
+    'group_currency': F('client__currency'),
+    'group_risk_level': F('client__risk_level'),
+    'group_manager': F('client__manager_id'),
+}
+CLIENT_DIMENSIONS = {
+    'group_currency': F('client__currency'),
+    'group_risk_level': F('client__risk_level'),
+    'group_manager': F('client__manager_id'),
+}
+
+
+def _investment_key(row):
+    return (row['group_type'], row['group_currency'], row['group_risk_level'], row['group_manager'])
+
+
+def _cash_key(row):
+    return (CASH, row['group_currency'], row['group_risk_level'], row['group_manager'])
+
+
+def _restrict(queryset, keys, with_type):
+    """Narrow a queryset to the dimension values appearing in `keys` so touched groups are recomputed without a full scan."""
+    if not keys:
+        return queryset.none()
+    lookups = {
+        'client__currency__in': {key[1] for key in keys},
+        'client__risk_level__in': {key[2] for key in keys},
+        'client__manager_id__in': {key[3] for key in keys},
+    }
+    if with_type:
+        lookups['investment_type__in'] = {key[0] for key in keys}
+    return queryset.filter(**lookups)
+
+
+def investment_rollups(keys=None):
+    """{group key: (count, invested, current value)} for active investments at their last valuation."""
+    investments = Investment.objects.filter(status='active')
+    if keys is not None:
+        investments = _restrict(investments, keys, with_type=True)
+    rows = investments.values(**INVESTMENT_DIMENSIONS).annotate(
+        count=Count('id'),
+        invested=Sum('investment_amount'),
+        value=Sum(Coalesce('expected_current_value', 'investment_amount')),
+    )
+    return {
+        _investment_key(row): (row['count'], row['invested'] or ZERO, row['value'] or ZERO)
+        for row in rows
+        if keys is None or _investment_key(row) in keys
+    }
+
+
+def cash_rollups(keys=None):
+    """
+    {group key: (0, cash, cash)} where cash is investable contributions not yet
+    invested, plus what matured investments paid out at their final valuation.
+    """
+    contributions = Contribution.objects.all()
+    investments = Investment.objects.all()
+    if keys is not None:
+        contributions = _restrict(contributions, keys, with_type=False)
+        investments = _restrict(investments, keys, with_type=False)
+
+    cash = defaultdict(lambda: ZERO)
+    for row in contributions.values(**CLIENT_DIMENSIONS).annotate(total=Sum('investable_amount')):
+        cash[_cash_key(row)] += row['total'] or ZERO
+    rows = investments.values(**CLIENT_DIMENSIONS).annotate(
+        total=Sum('investment_amount'),
+        paid_out=Sum(Coalesce('expected_current_value', 'investment_amount'), filter=Q(status='completed')),
+    )
+    for row in rows:
+        cash[_cash_key(row)] += (row['paid_out'] or ZERO) - (row['total'] or ZERO)
+    return {key: (0, amount, amount) for key, amount in cash.items() if keys is None or key in keys}
+
+
+def touched_groups(since):
+    """
+    Group keys with a row written after `since`: created, edited, revalued,
+    matured or given new fees, all of which move updated_at. A changed
+    investment touches its client's cash too, which it draws on and pays into,
+    and an edited client touches every group its rows are now in.
+    """
+    changed_clients = Client.objects.filter(updated_at__gte=since)
+    investment_keys, cash_keys = set(), set()
+    for investments in (Investment.objects.filter(updated_at__gte=since), Investment.objects.filter(client__in=changed_clients.values('pk'))):
+        investment_keys |= {_investment_key(row) for row in investments.values(**INVESTMENT_DIMENSIONS).distinct()}
+        cash_keys |= {_cash_key(row) for row in investments.values(**CLIENT_DIMENSIONS).distinct()}
+
+    cash_keys |= {_cash_key(row) for row in Contribution.objects.filter(updated_at__gte=since).values(**CLIENT_DIMENSIONS).distinct()}
+    cash_keys |= {
+        (CASH, currency, risk_level, manager_id)
+        for currency, risk_level, manager_id in changed_clients.values_list('currency', 'risk_level', 'manager_id').distinct()
+    }
+    return investment_keys, cash_keys
+
+
+def row_counts(watermark):
+    """(investments, contributions) created before `watermark`."""
+    return (
+        Investment.objects.filter(created_at__lt=watermark).count(),
+        Contribution.objects.filter(created_at__lt=watermark).count(),
+    )
+
+
+def rows_left_groups(run):
+    """
+    Whether rows in `run`'s snapshot have since left their groups, which touched_groups
+    can't see: deleted, so fewer rows were created before its watermark than it
+    counted, or moved to another client, type or group (Client.regrouped_at).
+    """
+    if run.investment_rows is None or run.contribution_rows is None:
+        return True  # taken before the counts were recorded
+    if Client.objects.filter(regrouped_at__gte=run.watermark).exists():
+        return True
+    investments, contributions = row_counts(run.watermark)
+    return investments < run.investment_rows or contributions < run.contribution_rows
+
+
+def _snapshot_rows(snapshot_date, rollups):
+    return [
+        AumSnapshot(
+            snapshot_date=snapshot_date,
+            investment_type=key[0],
+            currency=key[1],
+            risk_level=key[2],
+            manager_id=key[3],
+            investment_count=count,
+            invested_amount=invested,
+            current_value=value,
+        )
+        for key, (count, invested, value) in rollups.items()
+    ]
+
+
+@transaction.atomic
+def build_snapshot(snapshot_date=None, full=False):
+    """
+    Write the AUM snapshot for snapshot_date. Unless `full`, start from the previous
+    snapshot and recompute only the groups with rows written since that snapshot
+    was taken; every other group is carried forward as is. Falls back to a full
+    rebuild when rows were deleted or moved between groups since (rows_left_groups).
+    """
+    snapshot_date = snapshot_date or date.today()
+    watermark = timezone.now()
+    previous = AumSnapshotRun.objects.filter(snapshot_date__lt=snapshot_date).order_by('-snapshot_date').first()
+    full = full or previous is None or rows_left_groups(previous)
+
+    if full:
+        rollups = {**investment_rollups(), **cash_rollups()}
+        carried = {}
+    else:
+        investment_keys, cash_keys = touched_groups(previous.watermark)
+        rollups = {**investment_rollups(investment_keys), **cash_rollups(cash_keys)}
+        touched = investment_keys | cash_keys
+        carried = {
+            (row.investment_type, row.currency, row.risk_level, row.manager_id): (row.investment_count, row.invested_amount, row.current_value)
+            for row in AumSnapshot.objects.filter(snapshot_date=previous.snapshot_date)
+            if (row.investment_type, row.currency, row.risk_level, row.manager_id) not in touched
+        }
+
+    AumSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+    AumSnapshot.objects.bulk_create(_snapshot_rows(snapshot_date, {**carried, **rollups}), batch_size=1000)
+    investment_rows, contribution_rows = row_counts(watermark)
+    run, _ = AumSnapshotRun.objects.update_or_create(
+        snapshot_date=snapshot_date,
+        defaults={
+            'watermark': watermark,
+            'groups_recomputed': len(rollups),
+            'groups_carried': len(carried),
+            'full_rebuild': full,
+            'investment_rows': investment_rows,
+            'contribution_rows': contribution_rows,
+        },
+    )
+    return run
+
+
+def consolidated(snapshots, *group_by, counts=()):
+    """
+    Snapshot current_value per group_by value, per currency and in the reporting
+    currency, each row converted at the rate for its own snapshot_date.
+    """
+    return fx.consolidated_totals(snapshots, ['current_value'], 'currency', 'snapshot_date', group_by=group_by, counts=counts)
+
+
+def type_labels():
+    """investment_type display names, including the 'cash' group."""
+    return {**dict(Investment._meta.get_field('investment_type').choices), CASH: 'Cash'}
+
+
+def largest_first(groups):
+    return sorted(groups, key=lambda group: group['consolidated']['current_value'], reverse=True)
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Client, ClientBalance, Contribution, Investment
+
+
+ZERO = Decimal('0.00')
+BALANCE_FIELDS = ['total_contributed', 'total_investable', 'total_invested', 'available']
+
+
+def compute_balances(client_ids=None):
+    """Recompute balances from the raw tables with one grouped aggregate per table."""
+    contributions = Contribution.objects.all()
+    investments = Investment.objects.all()
+    clients = Client.objects.all()
+    if client_ids is not None:
+        contributions = contributions.filter(client_id__in=client_ids)
+        investments = investments.filter(client_id__in=client_ids)
+        clients = clients.filter(id__in=client_ids)
+
+    contributed = {
+        row['client_id']: row
+        for row in contributions.values('client_id').annotate(
+            contributed=Sum('contribution_amount'),
+            investable=Sum('investable_amount'),
+        )
+    }
+    invested = dict(
+        investments.values('client_id').annotate(total=Sum('investment_amount')).values_list('client_id', 'total')
+    )
+
+    balances = {}
+    for client_id in clients.values_list('id', flat=True).iterator():
+        row = contributed.get(client_id, {})
+        total_investable = row.get('investable') or ZERO
+        total_invested = invested.get(client_id) or ZERO
+        balances[client_id] = ClientBalance(
+            client_id=client_id,
+            total_contributed=row.get('contributed') or ZERO,
+            total_investable=total_investable,
+            total_invested=total_invested,
+            available=total_investable - total_invested,
+        )
+    return balances
+
+
+def find_mismatches(client_ids=None):
+    """Return (expected, stored) pairs for every client whose ledger row has drifted."""
+    expected = compute_balances(client_ids)
+    stored = ClientBalance.objects.in_bulk(list(expected))
+    mismatches = []
+    for client_id, balance in expected.items():
+        current = stored.get(client_id)
+        if current is None or any(getattr(current, f) != getattr(balance, f) for f in BALANCE_FIELDS):
+            mismatches.append((balance, current))
+    return mismatches
+
+
+@transaction.atomic
+def rebuild_balances(client_ids=None, batch_size=1000):
+    """Overwrite drifted or missing ledger rows and return how many were fixed."""
+    mismatches = find_mismatches(client_ids)
+    missing = [expected for expected, current in mismatches if current is None]
+    drifted = [expected for expected, current in mismatches if current is not None]
+    ClientBalance.objects.bulk_create(missing, batch_size=batch_size)
+    ClientBalance.objects.bulk_update(drifted, BALANCE_FIELDS, batch_size=batch_size)
+    return len(mismatches)
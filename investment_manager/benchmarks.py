@@ -0,0 +1,182 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils.http import urlencode
+
+from . import urls
+from .models import Client, Contribution, Investment
+from .revaluation import revalue_investments, revalue_pending
+
+
+# Views that end the session or only make sense with form input are skipped
+SKIPPED_VIEWS = {'logout', 'login', 'register'}
+# Path parameters that are not a client id
+EXTRA_KWARGS = {
+    'export_data': {'dataset': 'contributions'},
+    'pick_client': {'action': 'contribution'},
+}
+# Required query parameters, built when the targets are
+EXTRA_QUERIES = {'api_portfolio_valuation': lambda: {'date': date.today().isoformat()}}
+
+
+class Rollback(Exception):
+    """Raised inside a benchmark's transaction to discard whatever it wrote."""
+
+
+def measure(func, repeat=5, rollback=False):
+    """Run func `repeat` times; return timings in ms and the queries issued on the last run."""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            if rollback:
+                try:
+                    with transaction.atomic():
+                        func()
+                        raise Rollback
+                except Rollback:
+                    pass
+            else:
+                func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured.captured_queries)
+    return {
+        'runs': repeat,
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': queries,
+    }
+
+
+def view_targets(client_id):
+    """(name, url) for every GET-able route in urls.py, with path parameters and required query parameters filled in."""
+    targets = []
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_VIEWS:
+            continue
+        kwargs = dict(EXTRA_KWARGS.get(pattern.name, {}))
+        for converter_name in pattern.pattern.converters:
+            kwargs.setdefault(converter_name, client_id)
+        url = reverse(pattern.name, kwargs=kwargs)
+        if pattern.name in EXTRA_QUERIES:
+            url += '?' + urlencode(EXTRA_QUERIES[pattern.name]())
+        targets.append((pattern.name, url))
+    return targets
+
+
+def benchmark_views(user, client_id, repeat=5):
+    browser = TestClient()
+    browser.force_login(user)
+    results = {}
+    for name, url in view_targets(client_id):
+        status = []
+
+        def fetch():
+            response = browser.get(url)
+            if response.streaming:
+                # Drain streaming responses so the whole export is timed
+                b''.join(response.streaming_content)
+            status.append(response.status_code)
+
+        results[name] = {'url': url, **measure(fetch, repeat), 'status': status[-1]}
+    return results
+
+
+def benchmark_saves(user, client, repeat=5):
+    """Time the model save paths inside rolled-back transactions so the data set is unchanged."""
+    today = date.today()
+
+    def save_client():
+        Client(
+            full_name='Benchmark Client', email='benchmark@example.com', phone='0970000000', city='Lusaka',
+            date_of_birth=date(1990, 1, 1), client_nrc='999999/99/9', date_of_joining=today,
+            risk_level='low', contribution_type='lump_sum', contribution_frequency='once_off',
+            financial_goal='education', target_amount=Decimal('1000.00'), expected_contribution=Decimal('100.00'),
+            currency=client.currency, manager=user,
+        ).save()
+
+    def save_contribution():
+        Contribution(
+            client=client, manager=user, date=today, contribution_amount=Decimal('1000.00'), payment_method='cash',
+        ).save()
+
+    def save_investment():
+        Contribution(
+            client=client, manager=user, date=today, contribution_amount=Decimal('1000.00'), payment_method='cash',
+        ).save()
+        Investment(
+            client=client, manager=user, investment_duration=12, start_date=today, investment_type='fd',
+            investment_amount=Decimal('500.00'), expected_annual_growth_rate_percentage=Decimal('10.000'),
+        ).save()
+
+    return {
+        'client_save': measure(save_client, repeat, rollback=True),
+        'contribution_save': measure(save_contribution, repeat, rollback=True),
+        'contribution_and_investment_save': measure(save_investment, repeat, rollback=True),
+    }
+
+
+def benchmark_jobs(user, repeat=1):
+    """The bulk jobs behind update_records: a full revaluation, then the incremental pass it leaves nothing for."""
+    browser = TestClient()
+    browser.force_login(user)
+    return {
+        'revalue_investments_full': measure(lambda: revalue_investments(), repeat),
+        'revalue_pending': measure(lambda: revalue_pending(), repeat),
+        'update_records_post': measure(lambda: browser.post(reverse('update_records')), repeat),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(user, repeat=5, include_jobs=True):
+    client = Client.objects.filter(manager=user).order_by('pk').first() or Client.objects.order_by('pk').first()
+    if client is None:
+        raise ValueError("No clients to benchmark against; run seed_data first")
+
+    # The test client sends Host: testserver
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        results = {
+            'views': benchmark_views(user, client.pk, repeat),
+            'saves': benchmark_saves(user, client, repeat),
+        }
+        if include_jobs:
+            results['jobs'] = benchmark_jobs(user)
+
+    return {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'rows': {
+            'clients': Client.objects.count(),
+            'contributions': Contribution.objects.count(),
+            'investments': Investment.objects.count(),
+        },
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def write_results(report, path):
+    with open(path, 'w') as handle:
+        json.dump(report, handle, indent=2)
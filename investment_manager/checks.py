@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+
+# Backends that keep their entries inside one process
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+HINT = "Set REDIS_URL, or point CACHES at another shared backend."
+
+
+def _process_local_caches():
+    """Quoted aliases of the caches whose invalidations must reach every process, if they are not shared."""
+    aliases = {
+        getattr(settings, 'CLIENT_SUMMARY_CACHE_ALIAS', 'default'),
+        getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default'),
+    }
+    return ', '.join(f"'{alias}'" for alias in sorted(aliases) if settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    names = _process_local_caches()
+    workers = getattr(settings, 'WEB_CONCURRENCY', 1)
+    if names and workers > 1:
+        return [Error(
+            f"Cache {names} is private to each process, but WEB_CONCURRENCY is {workers}: "
+            "a write in one worker would not invalidate the summaries and pages cached by the others.",
+            hint=HINT,
+            id='investment_manager.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    names = _process_local_caches()
+    if names:
+        return [Warning(
+            f"Cache {names} is private to each process, so imports, recompute_fees and other commands "
+            "cannot invalidate what the web server has cached.",
+            hint=HINT,
+            id='investment_manager.W001',
+        )]
+    return []
@@ -0,0 +1,205 @@
+import csv
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.contrib.auth.decorators import login_required
+from django.db import router
+from django.http import FileResponse, HttpResponseBadRequest, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from .models import Client, Contribution, Investment
+from .routers import reads_from_replica
+
+
+CHUNK_SIZE = 2000
+# Spreadsheets read text starting with one of these as a formula when the file is opened
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORTS = {
+    'clients': {
+        'model': Client,
+        'columns': (
+            ('ID', 'id'),
+            ('Full Name', 'full_name'),
+            ('Email', 'email'),
+            ('Phone', 'phone'),
+            ('City', 'city'),
+            ('Date of Birth', 'date_of_birth'),
+            ('NRC', 'client_nrc'),
+            ('Date of Joining', 'date_of_joining'),
+            ('Risk Level', 'risk_level'),
+            ('Contribution Type', 'contribution_type'),
+            ('Contribution Frequency', 'contribution_frequency'),
+            ('Financial Goal', 'financial_goal'),
+            ('Target Amount', 'target_amount'),
+            ('Expected Contribution', 'expected_contribution'),
+            ('Currency', 'currency'),
+            ('Manager First Name', 'manager__first_name'),
+            ('Manager Last Name', 'manager__last_name'),
+            ('Created At', 'created_at'),
+        ),
+        'filters': {
+            'client': ('id', int),
+            'manager': ('manager_id', int),
+            'currency': ('currency', str),
+            'date_from': ('date_of_joining__gte', date.fromisoformat),
+            'date_to': ('date_of_joining__lte', date.fromisoformat),
+        },
+    },
+    'contributions': {
+        'model': Contribution,
+        'columns': (
+            ('ID', 'id'),
+            ('Client ID', 'client_id'),
+            ('Client Name', 'client__full_name'),
+            ('Currency', 'client__currency'),
+            ('Date', 'date'),
+            ('Contribution Amount', 'contribution_amount'),
+            ('Payment Method', 'payment_method'),
+            ('Fee Rate (%)', 'fee_rate_percentage'),
+            ('Fees', 'fees'),
+            ('Investable Amount', 'investable_amount'),
+            ('Manager First Name', 'manager__first_name'),
+            ('Manager Last Name', 'manager__last_name'),
+            ('Description', 'description'),
+            ('Created At', 'created_at'),
+        ),
+        'filters': {
+            'client': ('client_id', int),
+            'manager': ('manager_id', int),
+            'currency': ('client__currency', str),
+            'date_from': ('date__gte', date.fromisoformat),
+            'date_to': ('date__lte', date.fromisoformat),
+        },
+    },
+    'investments': {
+        'model': Investment,
+        'queryset': lambda: Investment.objects.with_current_value(),
+        'columns': (
+            ('ID', 'id'),
+            ('Client ID', 'client_id'),
+            ('Client Name', 'client__full_name'),
+            ('Currency', 'client__currency'),
+            ('Investment Type', 'investment_type'),
+            ('Investment Amount', 'investment_amount'),
+            ('Duration (months)', 'investment_duration'),
+            ('Start Date', 'start_date'),
+            ('Maturity Date', 'maturity_date'),
+            ('Expected Growth Rate (%)', 'expected_annual_growth_rate_percentage'),
+            ('Current Value', 'current_value'),
+            ('Status', 'current_status'),
+            ('Manager First Name', 'manager__first_name'),
+            ('Manager Last Name', 'manager__last_name'),
+            ('Description', 'description'),
+            ('Created At', 'created_at'),
+        ),
+        'filters': {
+            'client': ('client_id', int),
+            'manager': ('manager_id', int),
+            'currency': ('client__currency', str),
+            'date_from': ('start_date__gte', date.fromisoformat),
+            'date_to': ('start_date__lte', date.fromisoformat),
+        },
+    },
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def build_queryset(spec, params):
+    """Apply the export filters from the query string. Raises ValueError on malformed values."""
+    lookups = {}
+    for param, (lookup, parse) in spec['filters'].items():
+        value = params.get(param)
+        if value:
+            lookups[lookup] = parse(value)
+    queryset = spec['queryset']() if 'queryset' in spec else spec['model'].objects.all()
+    return queryset.filter(**lookups).order_by('pk')
+
+
+def iter_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Stream tuples straight from the cursor without building model instances."""
+    return queryset.values_list(*[path for _, path in columns]).iterator(chunk_size=chunk_size)
+
+
+def _csv_value(value):
+    # A leading quote keeps free text such as "=HYPERLINK(...)" from running as a formula
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _excel_value(value, sheet):
+    # Excel has no notion of time zones
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value, dt_timezone.utc)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # openpyxl stores text starting with '=' as a formula; force a plain text cell
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+
+def stream_csv(queryset, columns, filename):
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow([header for header, _ in columns])
+        for row in iter_rows(queryset, columns):
+            yield writer.writerow([_csv_value(value) for value in row])
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def write_xlsx(queryset, columns, filename):
+    # Write-only mode flushes each row to disk, so memory stays flat regardless of row count
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append([header for header, _ in columns])
+    for row in iter_rows(queryset, columns):
+        sheet.append([_excel_value(value, sheet) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+@require_GET
+@login_required
+@reads_from_replica
+def export_data(request, dataset):
+    spec = EXPORTS.get(dataset)
+    if spec is None:
+        raise Http404(f"Unknown export '{dataset}'")
+
+    try:
+        queryset = build_queryset(spec, request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(f"Invalid export filter: {e}")
+    # A CSV streams after the view has returned, so fix the database while the routing applies
+    queryset = queryset.using(router.db_for_read(spec['model']))
+
+    file_format = request.GET.get('format', 'csv')
+    filename = f"{dataset}_{date.today():%Y%m%d}"
+    if file_format == 'csv':
+        return stream_csv(queryset, spec['columns'], filename)
+    if file_format == 'xlsx':
+        return write_xlsx(queryset, spec['columns'], filename)
+    return HttpResponseBadRequest("format must be 'csv' or 'xlsx'")
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.db.models import Case, DateField, DecimalField, ExpressionWrapper, F, Func, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Least, Power, Round
+
+from .valuation import DAYS_PER_YEAR
+
+
+class DaysBetween(Func):
+    """Whole days from `start` to `end` (end - start) for two date expressions."""
+
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL: date - date is already an integer number of days
+        return super().as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+
+def valuation_date(as_of):
+    """The date growth stops accruing: as_of, capped at maturity_date."""
+    as_of = Value(as_of, output_field=DateField())
+    return Least(Coalesce('maturity_date', as_of), as_of)
+
+
+def compounded_value(as_of):
+    """
+    investment_amount * (1 + rate/100) ** (elapsed_days / 365.25), rounded to cents,
+    as a database expression so it can be selected, filtered and aggregated. The SQL
+    counterpart of valuation.value() for listings and reports computed in the query.
+    """
+    years = ExpressionWrapper(
+        DaysBetween(valuation_date(as_of), F('start_date')) / Value(DAYS_PER_YEAR),
+        output_field=DecimalField(),
+    )
+    # Multiply rather than divide by 100: SQLite stores whole rates like 24.000 as integers and would divide them as such
+    growth = Power(Value(Decimal('1')) + F('expected_annual_growth_rate_percentage') * Value(Decimal('0.01')), years)
+    return Round(
+        ExpressionWrapper(F('investment_amount') * growth, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        2,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def valuation_status(as_of):
+    return Case(
+        When(maturity_date__lt=as_of, then=Value('completed')),
+        default=Value('active'),
+    )
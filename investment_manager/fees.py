@@ -0,0 +1,253 @@
+"""
+Contribution fees from the FeeSchedule table.
+
+The band for a contribution is chosen from the most specific schedule that has
+one, in the order (currency, method), (currency, any), (any, method), (any, any).
+Within a schedule, the latest effective_from on or before the contribution date
+is the version in force, and its band with the highest min_amount the amount
+reaches sets the rate for the whole amount. With no band at all the fee is
+DEFAULT_FEE_RATE, the rate that used to be hard-coded.
+
+recompute_fees only rewrites rates a schedule band covers and that were not
+given by hand (Contribution.fee_rate_overridden).
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import fragments
+from .models import ClientBalance, Contribution, FeeSchedule, LedgerEntry
+from .routers import on_primary
+from .summaries import summary_cache
+
+
+DEFAULT_FEE_RATE = Decimal('3.000')
+GENERATION_KEY = 'fee-schedule'  # write counter shared through the fragment cache so every process reloads
+UPDATE_FIELDS = ['fee_rate_percentage', 'fees', 'investable_amount', 'updated_at']
+RECOMPUTE_FIELDS = (
+    'id', 'client_id', 'client__currency', 'date', 'contribution_amount', 'payment_method',
+    'fee_rate_percentage', 'fees', 'investable_amount', 'fee_rate_overridden',
+)
+
+
+class ScheduleTable:
+    """
+    The whole fee schedule held in memory, so picking a rate is a few bisects and
+    no query. Reloaded when the shared write counter moves, which the FeeSchedule
+    signals bump, or when the table's row count or latest updated_at has moved,
+    which is checked every few seconds.
+    """
+
+    def __init__(self):
+        self._schedules = None
+        self._generation = None
+        self._stamp = fragments.TableStamp(FeeSchedule)
+        self._lock = threading.Lock()
+
+    def _current(self):
+        generation = fragments.generation(GENERATION_KEY)
+        with self._lock:
+            if self._schedules is None or generation != self._generation or self._stamp.moved():
+                bands = defaultdict(lambda: defaultdict(list))
+                count, latest = 0, None
+                rows = FeeSchedule.objects.order_by('effective_from', 'min_amount')
+                # Held until the table changes, so never loaded from a lagging replica
+                with on_primary():
+                    for row in rows.values_list('currency', 'payment_method', 'effective_from', 'min_amount', 'fee_rate_percentage', 'updated_at'):
+                        currency, method, effective_from, min_amount, rate, updated_at = row
+                        bands[(currency, method)][effective_from.toordinal()].append((min_amount, rate))
+                        count += 1
+                        latest = updated_at if latest is None else max(latest, updated_at)
+                # {(currency, method): (sorted effective ordinals, [(band minimums, band rates)] per version)}
+                self._schedules = {
+                    key: (
+                        list(versions),
+                        [([band[0] for band in versions[day]], [band[1] for band in versions[day]]) for day in versions],
+                    )
+                    for key, versions in bands.items()
+                }
+                self._generation = generation
+                self._stamp.loaded(count, latest)
+            return self._schedules
+
+    def snapshot(self):
+        """The current schedule, for looking up many rates with band_rate() without rechecking the counter."""
+        return self._current()
+
+    def rate(self, currency, payment_method, on, amount):
+        """Fee rate percentage for a contribution of `amount` on date `on`."""
+        return band_rate(self._current(), currency, payment_method, on, amount)
+
+    def rate_for(self, contribution):
+        return self.rate(contribution.client.currency, contribution.payment_method, contribution.date, contribution.contribution_amount)
+
+    def invalidate(self):
+        with self._lock:
+            self._schedules = None
+
+
+fee_schedule = ScheduleTable()
+
+
+def scheduled_rate(schedules, currency, payment_method, on, amount):
+    """The rate of the band covering a contribution, or None when no schedule version in force has one."""
+    for key in ((currency, payment_method), (currency, ''), ('', payment_method), ('', '')):
+        if key not in schedules:
+            continue
+        days, versions = schedules[key]
+        version = bisect.bisect_right(days, on.toordinal()) - 1
+        if version < 0:
+            continue
+        minimums, rates = versions[version]
+        band = bisect.bisect_right(minimums, amount) - 1
+        if band >= 0:
+            return rates[band]
+    return None
+
+
+def band_rate(schedules, currency, payment_method, on, amount):
+    rate = scheduled_rate(schedules, currency, payment_method, on, amount)
+    return DEFAULT_FEE_RATE if rate is None else rate
+
+
+def schedule_changed():
+    """Make every process reload its fee schedule."""
+    fee_schedule.invalidate()
+    fragments.bump(GENERATION_KEY)
+
+
+def _round_half_up(numerator, denominator):
+    # Integer division rounding halves away from zero, like Decimal's ROUND_HALF_UP
+    return np.sign(numerator) * ((np.abs(numerator) + denominator // 2) // denominator)
+
+
+def compute_fees_batch(amounts, rates):
+    """
+    Contribution.compute_fees over whole arrays: (fees, investable) in cents as
+    int64 arrays, for amounts in cents and rates in thousandths of a percent.
+    Exact integer arithmetic, so it rounds exactly as the Decimal version does.
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    rates = np.asarray(rates, dtype=np.int64)
+    scale = 100 * 1000  # percent, and the rate's three decimal places
+    fees = _round_half_up(amounts * rates, scale)
+    investable = _round_half_up(amounts * (scale - rates), scale)
+    return fees, investable
+
+
+def _write_fees(updates):
+    """Write (fee_rate_percentage, fees, investable_amount, updated_at, pk) tuples."""
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(column)} = %s' for column in UPDATE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.executemany(f'UPDATE {quote(Contribution._meta.db_table)} SET {assignments} WHERE {quote("id")} = %s', updates)
+
+
+def _cents(values, places):
+    return np.fromiter((int(value.scaleb(places)) for value in values), dtype=np.int64, count=len(values))
+
+
+@dataclass
+class RecomputeResult:
+    rows: int = 0
+    changed: int = 0
+    overridden: int = 0
+    uncovered: int = 0
+    clients: int = 0
+    seconds: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.changed:,} of {self.rows:,} contributions changed across {self.clients:,} clients in {self.seconds:.2f}s; "
+            f"kept {self.overridden:,} rates given by hand and {self.uncovered:,} no schedule band covers"
+        )
+
+
+def recompute_fees(queryset, chunk_size=5000, dry_run=False):
+    """
+    Re-derive fee_rate_percentage, fees and investable_amount of the contributions
+    in `queryset` from the current schedule, a keyset chunk at a time. Rates given
+    by hand and contributions no schedule band covers keep the rate they have.
+    Rates come from the in-memory schedule and the money arithmetic runs over
+    NumPy arrays. Only changed rows are written, with one prepared UPDATE sent
+    through executemany (bulk_update's CASE statements cost more to build than to
+    run), and the affected clients' balances move by the difference in the same
+    transaction.
+    """
+    queryset = queryset.order_by('pk')
+    result = RecomputeResult()
+    started = time.perf_counter()
+    touched = set()
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.filter(pk__gt=last_pk).select_for_update(of=('self',)).values_list(*RECOMPUTE_FIELDS)[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            result.rows += len(rows)
+
+            schedules = fee_schedule.snapshot()
+            rates = []
+            kept = np.zeros(len(rows), dtype=bool)
+            for index, row in enumerate(rows):
+                if row[9]:
+                    result.overridden += 1
+                    rate = None
+                else:
+                    rate = scheduled_rate(schedules, row[2], row[5], row[3], row[4])
+                    result.uncovered += rate is None
+                if rate is None:
+                    # Left exactly as stored; the stored rate only fills the arrays
+                    kept[index] = True
+                    rate = row[6] if row[6] is not None else Decimal(0)
+                rates.append(rate)
+            fees, investable = compute_fees_batch(_cents([row[4] for row in rows], 2), _cents(rates, 3))
+            old_rates = [row[6] for row in rows]
+            old_fees = _cents([row[7] or Decimal(0) for row in rows], 2)
+            old_investable = _cents([row[8] or Decimal(0) for row in rows], 2)
+            changed = np.flatnonzero(~kept & (
+                (fees != old_fees) | (investable != old_investable)
+                | np.array([old != new for old, new in zip(old_rates, rates)])
+            ))
+
+            updates = []
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            entries = []
+            deltas = defaultdict(int)
+            for index in changed.tolist():
+                pk, client_id = rows[index][:2]
+                updates.append((rates[index], Decimal(int(fees[index])).scaleb(-2), Decimal(int(investable[index])).scaleb(-2), now, pk))
+                difference = int(investable[index] - old_investable[index])
+                deltas[client_id] += difference
+                if difference:
+                    # A fee entry is what the contribution loses before investing, so it moves opposite to investable
+                    entries.append(LedgerEntry(
+                        client_id=client_id, entry_date=rows[index][3], kind='fee',
+                        amount=Decimal(-difference).scaleb(-2), contribution_id=pk,
+                    ))
+            result.changed += len(updates)
+            touched.update(deltas)
+            if not dry_run and updates:
+                _write_fees(updates)
+                ClientBalance.apply_many({
+                    client_id: (0, Decimal(delta).scaleb(-2), 0) for client_id, delta in deltas.items() if delta
+                })
+                LedgerEntry.append(entries)
+
+    if not dry_run and touched:
+        # These writes send no post_save, so drop what the signals would have
+        for client_id in touched:
+            summary_cache.invalidate(client_id)
+        fragments.bump('contributions')
+    result.clients = len(touched)
+    result.seconds = time.perf_counter() - started
+    return result
+
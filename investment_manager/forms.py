@@ -135,11 +135,6 @@ class CreateContributionForm(forms.ModelForm):
         label="", 
         widget=forms.Select(attrs={'class': 'form-control'})
     )
-    fee_rate_percentage = forms.DecimalField(
-        required=True, 
-        label="", 
-        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Fee Rate Percentage'})
-    )
     description = forms.CharField(
         required=False, 
         label="", 
@@ -156,7 +151,8 @@ class CreateContributionForm(forms.ModelForm):
 
     class Meta:
         model = Contribution
-        exclude = ("client", "manager", "created_at", "fees", "investable_amount")
+        # The fee rate comes from the fee schedule when the contribution is saved
+        exclude = ("client", "manager", "created_at", "fee_rate_percentage", "fees", "investable_amount")
 
 
 class CreateInvestmentForm(forms.ModelForm):
@@ -204,3 +200,23 @@ class CreateInvestmentForm(forms.ModelForm):
         exclude = ("client", "manager", "created_at", "maturity_date", "expected_current_value", "status")
 
     
+
+
+class ImportForm(forms.Form):
+    dataset = forms.ChoiceField(
+        choices=[('clients', 'Clients'), ('contributions', 'Contributions')],
+        required=True,
+        label="",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    file = forms.FileField(
+        required=True,
+        label="",
+        help_text='<span class="form-text text-muted"><small>CSV or XLSX with a header row of field names. Contributions identify the client by a <code>client_nrc</code> column.</small></span>',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Validate only (dry run)",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Client, Contribution, Investment
+from .routers import on_primary
+
+
+logger = logging.getLogger(__name__)
+
+# Models whose row count and latest updated_at version each dataset's pages
+DATASETS = {
+    'clients': Client,
+    'contributions': Contribution,
+    'investments': Investment,
+}
+# Pages built from a dataset also show client names, so client writes stale all of them
+DEPENDENCIES = {
+    'clients': ('clients',),
+    'contributions': ('contributions', 'clients'),
+    'investments': ('investments', 'clients'),
+}
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+TABLE_RECHECK_SECONDS = 5
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def generation(dataset):
+    """
+    Write counter for a dataset, bumped by signals on every save and delete. With
+    it a version moves the moment a write commits, before updated_at could be
+    read back. If the key is lost it restarts from the clock, so an old value is
+    never reused.
+    """
+    key = f'fragment-generation:{dataset}'
+    try:
+        cache = _cache()
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        return cache.get(key) or 0
+    except Exception:
+        logger.warning("Fragment cache unavailable, versions fall back to timestamps only", exc_info=True)
+        return 0
+
+
+def bump(dataset):
+    key = f'fragment-generation:{dataset}'
+    try:
+        cache = _cache()
+        if not cache.add(key, int(time.time() * 1000), timeout=None):
+            cache.incr(key)
+    except Exception:
+        logger.warning("Could not bump fragment generation for %s", dataset, exc_info=True)
+
+
+class TableStamp:
+    """
+    Row count and latest updated_at of the table an in-process copy was loaded
+    from. moved() compares them with the database at most every
+    TABLE_RECHECK_SECONDS, so the copy also follows writes whose counter bump
+    never reached this process: a per-process cache, or a lost key.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._stamp = None
+        self._checked = 0.0
+
+    def loaded(self, count, latest):
+        self._stamp = (count, latest)
+        self._checked = time.monotonic()
+
+    def moved(self):
+        if time.monotonic() - self._checked < getattr(settings, 'TABLE_RECHECK_SECONDS', TABLE_RECHECK_SECONDS):
+            return False
+        self._checked = time.monotonic()
+        with on_primary():
+            stamp = self.model.objects.aggregate(count=Count('pk'), latest=Max('updated_at'))
+        return (stamp['count'], stamp['latest']) != self._stamp
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    etag: str
+    last_modified: datetime
+
+
+def data_version(dataset):
+    """
+    ETag and Last-Modified for a dataset. One COUNT and MAX(updated_at) query per
+    table, plus the write counters. The count moves on deletes and updated_at on
+    edits, so writes from processes whose counter bumps never arrive (another
+    cache, a bulk job) still change the version.
+    """
+    parts = []
+    stamps = []
+    for name in DEPENDENCIES[dataset]:
+        stamp = DATASETS[name].objects.aggregate(count=Count('pk'), latest=Max('updated_at'))
+        if stamp['latest']:
+            stamps.append(stamp['latest'])
+        parts.append(f"{name}:{generation(name)}:{stamp['count']}:{stamp['latest']}")
+    if dataset == 'investments':
+        # Current values are computed for today, so the page changes at midnight even without writes
+        today = date.today()
+        parts.append(today.isoformat())
+        stamps.append(timezone.make_aware(datetime.combine(today, dt_time.min)))
+
+    last_modified = max(stamps) if stamps else timezone.make_aware(datetime(2000, 1, 1))
+    return DataVersion(
+        etag=hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest(),
+        last_modified=last_modified,
+    )
+
+
+def _stamp(response, version):
+    if response.status_code == 200:
+        response.headers.setdefault('ETag', quote_etag(version.etag))
+        response.headers.setdefault('Last-Modified', http_date(version.last_modified.timestamp()))
+        # Browsers may keep the body but must revalidate it each time, which costs a 304
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_on(dataset):
+    """
+    Answer GET/HEAD with 304 Not Modified when the client already holds the current
+    version of `dataset`, and stamp fresh responses with ETag and Last-Modified.
+    The version is left on request.data_version for render_fragment. Works on sync
+    and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                request.data_version = version = await sync_to_async(data_version)(dataset)
+                not_modified = get_conditional_response(request, etag=quote_etag(version.etag), last_modified=int(version.last_modified.timestamp()))
+                if not_modified is not None:
+                    return not_modified
+                return _stamp(await view(request, *args, **kwargs), version)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            request.data_version = version = data_version(dataset)
+            not_modified = get_conditional_response(request, etag=quote_etag(version.etag), last_modified=int(version.last_modified.timestamp()))
+            if not_modified is not None:
+                return not_modified
+            return _stamp(view(request, *args, **kwargs), version)
+        return wrapper
+    return decorator
+
+
+def _fragment_key(request, template_name):
+    return f'fragment:{template_name}:{request.data_version.etag}'
+
+
+def _cache_call(method, *args):
+    try:
+        return getattr(_cache(), method)(*args)
+    except Exception:
+        logger.warning("Fragment cache %s failed", method, exc_info=True)
+        return None
+
+
+def render_fragment(request, template_name, get_context):
+    """
+    Rendered HTML of a request-independent partial, from the fragment cache when
+    this data version was rendered before. Old versions are never read again and
+    age out of the cache. Must run under conditional_on, which sets the version.
+    """
+    key = _fragment_key(request, template_name)
+    html = _cache_call('get', key)
+    if html is None:
+        html = render_to_string(template_name, get_context())
+        _cache_call('set', key, html, FRAGMENT_TIMEOUT)
+    return HttpResponse(html)
+
+
+async def arender_fragment(request, template_name, get_context):
+    """render_fragment for async views; get_context is a coroutine function."""
+    key = _fragment_key(request, template_name)
+    html = await sync_to_async(_cache_call)('get', key)
+    if html is None:
+        context = await get_context()
+        html = await sync_to_async(render_to_string)(template_name, context)
+        await sync_to_async(_cache_call)('set', key, html, FRAGMENT_TIMEOUT)
+    return HttpResponse(html)
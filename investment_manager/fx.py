@@ -0,0 +1,205 @@
+"""
+Currency conversion for consolidated reporting.
+
+Totals are kept per currency and converted into settings.REPORTING_CURRENCY with
+the FxRate table. Single amounts use rate_table, an in-process copy of the table
+with as-of lookups; totals over many rows convert in SQL with rate_expression(),
+which joins each row to the rate in force on its own date.
+"""
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+
+from . import fragments
+from .models import FxRate
+from .routers import on_primary
+from .valuation import CENT
+
+
+logger = logging.getLogger(__name__)
+
+ONE = Decimal('1')
+ZERO = Decimal('0.00')
+RATE_PLACES = Decimal('1e-10')  # FxRate.rate decimal_places
+GENERATION_KEY = 'fx-rates'  # write counter shared through the fragment cache so every process reloads
+
+
+def reporting_currency():
+    return getattr(settings, 'REPORTING_CURRENCY', 'usd').lower()
+
+
+class RateTable:
+    """
+    Every FxRate row held in memory as sorted per-pair series, so an as-of lookup
+    is a bisect rather than a query. Reloaded when the shared write counter moves,
+    which load_rates and the FxRate signals bump, or when the table's row count or
+    latest updated_at has moved, which is checked every few seconds.
+    """
+
+    def __init__(self):
+        self._series = None
+        self._generation = None
+        self._stamp = fragments.TableStamp(FxRate)
+        self._lock = threading.Lock()
+
+    def _current(self):
+        generation = fragments.generation(GENERATION_KEY)
+        with self._lock:
+            if self._series is None or generation != self._generation or self._stamp.moved():
+                series = defaultdict(lambda: ([], []))
+                count, latest = 0, None
+                rows = FxRate.objects.order_by('currency', 'quote_currency', 'rate_date')
+                # Held until the table changes, so never loaded from a lagging replica
+                with on_primary():
+                    for currency, quote, rate_date, rate, updated_at in rows.values_list('currency', 'quote_currency', 'rate_date', 'rate', 'updated_at'):
+                        ordinals, rates = series[(currency, quote)]
+                        ordinals.append(rate_date.toordinal())
+                        rates.append(rate)
+                        count += 1
+                        latest = updated_at if latest is None else max(latest, updated_at)
+                self._series, self._generation = dict(series), generation
+                self._stamp.loaded(count, latest)
+            return self._series
+
+    def rate(self, currency, on, quote=None):
+        """Units of `quote` per unit of `currency` in force on date `on`, or None if no rate is known yet."""
+        quote = quote or reporting_currency()
+        if currency == quote:
+            return ONE
+        ordinals, rates = self._current().get((currency, quote), ((), ()))
+        index = bisect.bisect_right(ordinals, on.toordinal()) - 1
+        return rates[index] if index >= 0 else None
+
+    def invalidate(self):
+        with self._lock:
+            self._series = None
+
+
+rate_table = RateTable()
+
+
+def rates_changed():
+    """Make every process reload its rate table."""
+    rate_table.invalidate()
+    fragments.bump(GENERATION_KEY)
+
+
+def load_rates(rows, batch_size=1000):
+    """
+    Upsert (rate_date, currency, quote_currency, rate) tuples. The inverse of each
+    pair is stored too, unless the rows give it for that date, so conversions in
+    either direction are a single lookup. Returns the number of rows written.
+    """
+    rates = {}
+    for rate_date, currency, quote, rate in rows:
+        rates[(currency.lower(), quote.lower(), rate_date)] = Decimal(rate)
+    for (currency, quote, rate_date), rate in list(rates.items()):
+        if rate and (quote, currency, rate_date) not in rates:
+            rates[(quote, currency, rate_date)] = (ONE / rate).quantize(RATE_PLACES, rounding=ROUND_HALF_UP)
+
+    objects = [
+        FxRate(rate_date=rate_date, currency=currency, quote_currency=quote, rate=rate)
+        for (currency, quote, rate_date), rate in rates.items()
+    ]
+    with transaction.atomic():
+        FxRate.objects.bulk_create(
+            objects,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['currency', 'quote_currency', 'rate_date'],
+            update_fields=['rate', 'updated_at'],
+        )
+    # bulk_create sends no post_save
+    rates_changed()
+    transaction.on_commit(rates_changed)
+    return len(objects)
+
+
+def rate_expression(currency, on, quote=None):
+    """
+    Database expression for the rate converting a row's `currency` into `quote` on
+    `on`, both field names of the outer query (on may also be a date). Reads the
+    latest FxRate at or before that date through the unique_fx_rate index;
+    NULL when there is none.
+    """
+    quote = quote or reporting_currency()
+    as_of = OuterRef(on) if isinstance(on, str) else on
+    latest = (
+        FxRate.objects
+        .filter(currency=OuterRef(currency), quote_currency=quote, rate_date__lte=as_of)
+        .order_by('-rate_date')
+        .values('rate')[:1]
+    )
+    return Case(
+        When(**{currency: quote}, then=Value(ONE)),
+        default=Subquery(latest),
+        output_field=DecimalField(max_digits=20, decimal_places=10),
+    )
+
+
+def consolidated_totals(queryset, amounts, currency, on, quote=None, group_by=(), counts=()):
+    """
+    Sum the `amounts` fields of queryset per currency, and in `quote` with each row
+    converted at the rate for its own `on` date, in one grouped query.
+
+    Returns a list of {**group, 'by_currency': {currency: {field: total}},
+    'consolidated': {field: total}, 'missing_rates': rows}, one per distinct
+    `group_by` value (a single entry when group_by is empty). `counts` fields are
+    summed across currencies unconverted and added to each group. Rows without a
+    rate are left out of the consolidated totals and counted in missing_rates.
+    """
+    quote = quote or reporting_currency()
+    group_by = tuple(group_by)
+    rows = (
+        queryset
+        .annotate(fx_rate=rate_expression(currency, on, quote))
+        .values(*group_by, currency)
+        .annotate(
+            fx_missing=Count('pk', filter=Q(fx_rate__isnull=True)),
+            **{f'total_{field}': Sum(field) for field in amounts},
+            **{f'converted_{field}': Sum(F(field) * F('fx_rate')) for field in amounts},
+            **{f'count_{field}': Sum(field) for field in counts},
+        )
+        .order_by(*group_by, currency)
+    )
+
+    groups = {}
+    for row in rows:
+        key = tuple(row[name] for name in group_by)
+        group = groups.setdefault(key, {
+            **{name: row[name] for name in group_by},
+            **dict.fromkeys(counts, 0),
+            'by_currency': {},
+            'consolidated': dict.fromkeys(amounts, ZERO),
+            'missing_rates': 0,
+        })
+        group['by_currency'][row[currency]] = {
+            field: Decimal(row[f'total_{field}'] or 0).quantize(CENT) for field in amounts
+        }
+        group['missing_rates'] += row['fx_missing']
+        for field in counts:
+            group[field] += row[f'count_{field}'] or 0
+        for field in amounts:
+            group['consolidated'][field] += Decimal(row[f'converted_{field}'] or 0)
+    for group in groups.values():
+        group['consolidated'] = {
+            field: total.quantize(CENT, rounding=ROUND_HALF_UP) for field, total in group['consolidated'].items()
+        }
+        if group['missing_rates']:
+            logger.warning("No %s rate for %d rows of %s", quote.upper(), group['missing_rates'], queryset.model.__name__)
+    return list(groups.values())
+
+
+def consolidate(amounts, currency, on, quote=None):
+    """Convert a dict of amounts in `currency` at the rate for `on`; None if that rate is unknown."""
+    quote = quote or reporting_currency()
+    rate = rate_table.rate(currency, on, quote)
+    if rate is None:
+        return None
+    return {name: (amount * rate).quantize(CENT, rounding=ROUND_HALF_UP) for name, amount in amounts.items()}
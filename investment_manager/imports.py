@@ -0,0 +1,244 @@
+import csv
+import io
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.shortcuts import render
+from openpyxl import load_workbook
+
+from .fees import band_rate, fee_schedule
+from .forms import ImportForm
+from .models import Client, ClientBalance, Contribution, LedgerEntry
+from .summaries import summary_cache
+
+
+LOOKUP_CHUNK = 1000  # values per IN (...) clause when checking the database
+
+CLIENT_FIELDS = (
+    'full_name', 'email', 'phone', 'city', 'date_of_birth', 'client_nrc', 'date_of_joining', 'risk_level',
+    'contribution_type', 'contribution_frequency', 'financial_goal', 'target_amount', 'expected_contribution',
+    'currency',
+)
+CONTRIBUTION_FIELDS = ('date', 'contribution_amount', 'payment_method', 'fee_rate_percentage', 'description')
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    rows: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def __str__(self):
+        action = "would be imported" if self.dry_run else "imported"
+        return f"{self.created} of {self.rows} rows {action}, {len(self.errors)} rejected"
+
+
+def _normalize_header(header):
+    return str(header or '').strip().lower().replace(' ', '_')
+
+
+def _normalize_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return repr(value)  # keep 1000.1 from turning into 1000.10000000000002 digits
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def read_rows(uploaded_file):
+    """Yield (row_number, {header: value}) from a CSV or XLSX upload, skipping blank lines."""
+    name = getattr(uploaded_file, 'name', '') or ''
+    if name.lower().endswith('.xlsx'):
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        rows = csv.reader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+
+    headers = None
+    for row_number, values in enumerate(rows, start=1):
+        values = [_normalize_cell(value) for value in values]
+        if headers is None:
+            headers = [_normalize_header(value) for value in values]
+            continue
+        if not any(value != '' for value in values):
+            continue
+        yield row_number, dict(zip(headers, values))
+
+
+def _choice_value(model_field, value):
+    # Accept either the stored value or its label, case-insensitively ("Mobile Money" -> "mobile_money")
+    lookup = {}
+    for stored, label in model_field.choices:
+        lookup[str(stored).lower()] = stored
+        lookup[str(label).lower()] = stored
+    return lookup.get(str(value).lower(), value)
+
+
+def _clean_fields(model, row, names):
+    """Run each model field's own to_python/validators over the row. Raises one ValidationError listing every bad field."""
+    cleaned, problems = {}, []
+    for name in names:
+        model_field = model._meta.get_field(name)
+        value = row.get(name, '')
+        if value == '' and model_field.null:
+            value = None
+        elif model_field.choices and value != '':
+            value = _choice_value(model_field, value)
+        try:
+            cleaned[name] = model_field.clean(value, None)
+        except ValidationError as e:
+            problems.append(f"{name}: {' '.join(e.messages)}")
+    if problems:
+        raise ValidationError('; '.join(problems))
+    return cleaned
+
+
+def _existing_values(queryset, field_name, values):
+    """Set-based membership check: one IN (...) query per chunk instead of one query per row."""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        found.update(queryset.filter(**{f'{field_name}__in': chunk}).values_list(field_name, flat=True))
+    return found
+
+
+def import_clients(rows, manager, batch_size=500, dry_run=False):
+    report = ImportReport(dry_run=dry_run)
+    candidates = []
+    for row_number, row in rows:
+        report.rows += 1
+        if row.get('contribution_type', '').lower() in ('lump_sum', 'lump sum'):
+            row['contribution_frequency'] = 'once_off'  # mirrors Client.save, which bulk_create skips
+        try:
+            cleaned = _clean_fields(Client, row, CLIENT_FIELDS)
+        except ValidationError as e:
+            report.add_error(row_number, e.messages[0])
+            continue
+        candidates.append((row_number, Client(manager=manager, **cleaned)))
+
+    taken_emails = _existing_values(Client.objects.all(), 'email', {client.email for _, client in candidates})
+    taken_nrcs = _existing_values(Client.objects.all(), 'client_nrc', {client.client_nrc for _, client in candidates})
+
+    valid = []
+    for row_number, client in candidates:
+        if client.email in taken_emails:
+            report.add_error(row_number, f"email: {client.email} is already registered")
+        elif client.client_nrc in taken_nrcs:
+            report.add_error(row_number, f"client_nrc: {client.client_nrc} is already registered")
+        else:
+            valid.append(client)
+        # Later rows repeating this email/NRC are duplicates within the file
+        taken_emails.add(client.email)
+        taken_nrcs.add(client.client_nrc)
+
+    report.errors.sort()
+    report.created = len(valid)
+    if valid and not dry_run:
+        with transaction.atomic():
+            created = Client.objects.bulk_create(valid, batch_size=batch_size)
+            ClientBalance.objects.bulk_create([ClientBalance(client=client) for client in created], batch_size=batch_size)
+    return report
+
+
+def import_contributions(rows, manager, batch_size=500, dry_run=False):
+    report = ImportReport(dry_run=dry_run)
+    parsed = []
+    for row_number, row in rows:
+        report.rows += 1
+        try:
+            cleaned = _clean_fields(Contribution, row, CONTRIBUTION_FIELDS)
+        except ValidationError as e:
+            report.add_error(row_number, e.messages[0])
+            continue
+        parsed.append((row_number, row.get('client_nrc', ''), cleaned))
+
+    nrcs = {nrc for _, nrc, _ in parsed}
+    clients = {}
+    for start in range(0, len(nrcs), LOOKUP_CHUNK):
+        chunk = list(nrcs)[start:start + LOOKUP_CHUNK]
+        clients.update(
+            (nrc, (client_id, currency))
+            for nrc, client_id, currency in Client.objects.filter(client_nrc__in=chunk).values_list('client_nrc', 'id', 'currency')
+        )
+
+    valid = []
+    schedules = fee_schedule.snapshot()
+    for row_number, nrc, cleaned in parsed:
+        if nrc not in clients:
+            report.add_error(row_number, f"client_nrc: no client with NRC '{nrc}'")
+            continue
+        client_id, currency = clients[nrc]
+        contribution = Contribution(client_id=client_id, manager=manager, **cleaned)
+        # bulk_create skips Contribution.save, so derive the rate and fees the same way here
+        if contribution.fee_rate_percentage is None:
+            contribution.fee_rate_percentage = band_rate(
+                schedules, currency, contribution.payment_method, contribution.date, contribution.contribution_amount
+            )
+        else:
+            contribution.fee_rate_overridden = True
+        contribution.fees, contribution.investable_amount = Contribution.compute_fees(
+            contribution.contribution_amount, contribution.fee_rate_percentage
+        )
+        valid.append(contribution)
+
+    report.errors.sort()
+    report.created = len(valid)
+    if valid and not dry_run:
+        # (contributed, investable, invested) per client, for one batched balance UPDATE
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for contribution in valid:
+            deltas[contribution.client_id][0] += contribution.contribution_amount
+            deltas[contribution.client_id][1] += contribution.investable_amount
+        with transaction.atomic():
+            created = Contribution.objects.bulk_create(valid, batch_size=batch_size)
+            LedgerEntry.append([
+                entry
+                for contribution in created
+                for entry in LedgerEntry.for_contribution(
+                    contribution.pk, contribution.client_id, contribution.date,
+                    contribution.contribution_amount, contribution.investable_amount,
+                )
+            ], batch_size=batch_size)
+            ClientBalance.apply_many(deltas)
+        # bulk_create sends no post_save, so drop the cached summaries here
+        for client_id in deltas:
+            summary_cache.invalidate(client_id)
+    return report
+
+
+IMPORTERS = {
+    'clients': import_clients,
+    'contributions': import_contributions,
+}
+
+
+@login_required
+def import_data(request):
+    report = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            importer = IMPORTERS[form.cleaned_data['dataset']]
+            report = importer(
+                read_rows(form.cleaned_data['file']),
+                request.user,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            if report.errors:
+                messages.error(request, str(report))
+            else:
+                messages.success(request, str(report))
+    else:
+        form = ImportForm()
+    return render(request, 'investment_manager/import_data.html', {'form': form, 'report': report})
@@ -0,0 +1,151 @@
+"""
+Point-in-time client balances from the append-only LedgerEntry table.
+
+checkpoint_ledger writes a LedgerCheckpoint per client holding their totals per
+kind on a date, so a balance as of any later date is one checkpoint row plus the
+entries appended since, rather than a scan of the client's whole history.
+"""
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import LedgerCheckpoint, LedgerEntry
+from .valuation import CENT
+
+
+ZERO = Decimal('0.00')
+# LedgerEntry kind -> LedgerCheckpoint / LedgerBalance total
+KIND_TOTALS = {
+    'contribution': 'contributed',
+    'fee': 'fees',
+    'allocation': 'invested',
+    'maturity': 'matured',
+}
+# Entries recorded less than this long ago may still have lower-id neighbours in
+# uncommitted transactions, so a checkpoint leaves them to the tail
+SETTLE_SECONDS = 60
+
+
+@dataclass
+class LedgerBalance:
+    client_id: int
+    as_of: date
+    contributed: Decimal = ZERO
+    fees: Decimal = ZERO
+    invested: Decimal = ZERO
+    matured: Decimal = ZERO
+    checkpoint_date: date = None
+    tail_entries: int = 0
+
+    @property
+    def available(self):
+        """Same rule as ClientBalance.available: investable contributions less allocations."""
+        return self.contributed - self.fees - self.invested
+
+    def as_dict(self):
+        return {
+            'client_id': self.client_id,
+            'as_of': self.as_of,
+            'contributed': self.contributed,
+            'fees': self.fees,
+            'invested': self.invested,
+            'matured': self.matured,
+            'available': self.available,
+            'checkpoint_date': self.checkpoint_date,
+            'tail_entries': self.tail_entries,
+        }
+
+
+def balance_as_of(client_id, as_of=None):
+    """
+    The client's ledger totals over entries dated up to `as_of` (default today):
+    the latest checkpoint on or before that date, plus the entries it does not
+    cover. Two indexed queries whatever the length of the history.
+    """
+    as_of = as_of or date.today()
+    checkpoint = (
+        LedgerCheckpoint.objects
+        .filter(client_id=client_id, checkpoint_date__lte=as_of)
+        .order_by('-checkpoint_date')
+        .first()
+    )
+    balance = LedgerBalance(client_id=client_id, as_of=as_of)
+    entries = LedgerEntry.objects.filter(client_id=client_id, entry_date__lte=as_of)
+    if checkpoint:
+        balance.checkpoint_date = checkpoint.checkpoint_date
+        for name in KIND_TOTALS.values():
+            setattr(balance, name, getattr(checkpoint, name))
+        # Dated after the checkpoint, or appended after it was taken (backdated edits)
+        entries = entries.filter(Q(entry_date__gt=checkpoint.checkpoint_date) | Q(id__gt=checkpoint.last_entry_id))
+
+    for kind, total, count in entries.values('kind').annotate(total=Sum('amount'), count=Count('id')).values_list('kind', 'total', 'count'):
+        name = KIND_TOTALS[kind]
+        setattr(balance, name, getattr(balance, name) + Decimal(total or 0).quantize(CENT))
+        balance.tail_entries += count
+    return balance
+
+
+@dataclass
+class CheckpointResult:
+    checkpoint_date: date
+    last_entry_id: int = 0
+    clients: int = 0
+    entries: int = 0
+    carried_from: date = None
+    seconds: float = 0.0
+
+    def __str__(self):
+        source = f"carried from {self.carried_from:%d/%m/%Y}" if self.carried_from else "from the full ledger"
+        return (
+            f"Ledger checkpoint {self.checkpoint_date:%d/%m/%Y}: {self.clients:,} clients, "
+            f"{self.entries:,} entries folded in {source} in {self.seconds:.2f}s"
+        )
+
+
+@transaction.atomic
+def build_checkpoints(checkpoint_date=None, settle_seconds=SETTLE_SECONDS, batch_size=1000):
+    """
+    Write every client's checkpoint for checkpoint_date (default yesterday). Starts
+    from the previous checkpoint run and folds in only the entries it did not
+    cover, so a daily run reads a day's worth of entries, not the whole ledger.
+    Rewrites the rows for checkpoint_date if it has already been taken.
+    """
+    checkpoint_date = checkpoint_date or date.today() - timedelta(days=1)
+    started = time.perf_counter()
+    previous_date = LedgerCheckpoint.objects.filter(checkpoint_date__lt=checkpoint_date).aggregate(latest=Max('checkpoint_date'))['latest']
+
+    totals = defaultdict(lambda: dict.fromkeys(KIND_TOTALS.values(), ZERO))
+    previous_last_id = 0
+    if previous_date:
+        for checkpoint in LedgerCheckpoint.objects.filter(checkpoint_date=previous_date):
+            previous_last_id = max(previous_last_id, checkpoint.last_entry_id)
+            totals[checkpoint.client_id] = {name: getattr(checkpoint, name) for name in KIND_TOTALS.values()}
+
+    settled = timezone.now() - timedelta(seconds=settle_seconds)
+    # Walks the primary key backwards and stops at the first settled entry
+    last_entry_id = LedgerEntry.objects.filter(recorded_at__lt=settled).order_by('-id').values_list('id', flat=True).first() or 0
+    last_entry_id = max(last_entry_id, previous_last_id)
+
+    entries = LedgerEntry.objects.filter(entry_date__lte=checkpoint_date, id__lte=last_entry_id)
+    if previous_date:
+        entries = entries.filter(Q(entry_date__gt=previous_date) | Q(id__gt=previous_last_id))
+    result = CheckpointResult(checkpoint_date=checkpoint_date, last_entry_id=last_entry_id, carried_from=previous_date)
+    rows = entries.values('client_id', 'kind').annotate(total=Sum('amount'), count=Count('id'))
+    for client_id, kind, total, count in rows.values_list('client_id', 'kind', 'total', 'count'):
+        totals[client_id][KIND_TOTALS[kind]] += Decimal(total or 0).quantize(CENT)
+        result.entries += count
+
+    LedgerCheckpoint.objects.filter(checkpoint_date=checkpoint_date).delete()
+    LedgerCheckpoint.objects.bulk_create([
+        LedgerCheckpoint(client_id=client_id, checkpoint_date=checkpoint_date, last_entry_id=last_entry_id, **values)
+        for client_id, values in totals.items()
+    ], batch_size=batch_size)
+    result.clients = len(totals)
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.query_plans import check_plans, core_queries
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the core view and report queries and fail if any full-scans a large table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000, help="Only flag sequential scans of tables at least this big")
+        parser.add_argument('--show-plans', action='store_true', help="Print every plan, not just the flagged ones")
+
+    def handle(self, *args, **options):
+        if options['show_plans']:
+            for name, queryset in core_queries():
+                self.stdout.write(f"-- {name}\n{queryset.explain()}\n")
+
+        findings = check_plans(min_rows=options['min_rows'])
+        for name, table, rows, plan in findings:
+            self.stdout.write(self.style.WARNING(f"{name}: sequential scan on {table} (~{rows:,} rows)\n{plan}\n"))
+        if findings:
+            raise CommandError(f"{len(findings)} core queries fall back to sequential scans")
+        self.stdout.write(self.style.SUCCESS(f"No sequential scans on tables with {options['min_rows']:,}+ rows"))
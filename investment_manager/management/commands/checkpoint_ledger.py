@@ -0,0 +1,15 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investment_manager.ledger import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Record every client's ledger totals on a date, so as-of balances read only the entries after it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Checkpoint date (YYYY-MM-DD), defaults to yesterday")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(str(build_checkpoints(options['date']))))
@@ -0,0 +1,16 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investment_manager.maturities import complete_matured
+
+
+class Command(BaseCommand):
+    help = "Mark active investments past their maturity date as completed, with their final values (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Treat this day (YYYY-MM-DD) as today")
+
+    def handle(self, *args, **options):
+        rows = complete_matured(options['date'])
+        self.stdout.write(self.style.SUCCESS(f"{rows:,} investments marked completed"))
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.imports import IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import clients or contributions from a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help="CSV or XLSX file with a header row")
+        parser.add_argument('--manager', required=True, help="Username recorded as the manager of imported rows")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk_create statement")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without inserting")
+
+    def handle(self, *args, **options):
+        try:
+            manager = User.objects.get(username=options['manager'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['manager']}'")
+
+        with open(options['path'], 'rb') as handle:
+            report = IMPORTERS[options['dataset']](
+                read_rows(handle),
+                manager,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+
+        for row_number, message in report.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+        style = self.style.WARNING if report.errors else self.style.SUCCESS
+        self.stdout.write(style(str(report)))
@@ -0,0 +1,52 @@
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.fx import load_rates, reporting_currency
+from investment_manager.imports import read_rows
+
+
+def _parse_date(value):
+    # XLSX cells arrive as datetimes, CSV cells as YYYY-MM-DD text
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+class Command(BaseCommand):
+    help = (
+        "Load daily exchange rates from a CSV or XLSX file with date, currency and rate columns "
+        "(and optionally quote_currency, else the reporting currency). Existing rates for the same day are replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or XLSX file with a header row")
+        parser.add_argument('--quote', help="Quote currency for rows without a quote_currency column")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without saving")
+
+    def handle(self, *args, **options):
+        quote = (options['quote'] or reporting_currency()).lower()
+        rates, errors = [], 0
+        with open(options['path'], 'rb') as handle:
+            for row_number, row in read_rows(handle):
+                try:
+                    rate_date = _parse_date(row['date'])
+                    rate = Decimal(str(row['rate']))
+                    if rate <= 0:
+                        raise ValueError("rate must be positive")
+                    rates.append((rate_date, str(row['currency']), str(row.get('quote_currency') or quote), rate))
+                except KeyError as e:
+                    raise CommandError(f"Missing column {e}")
+                except (ValueError, InvalidOperation) as e:
+                    errors += 1
+                    self.stderr.write(f"Row {row_number}: {e}")
+
+        if options['dry_run']:
+            written = 0
+        else:
+            written = load_rates(rates)
+        style = self.style.WARNING if errors else self.style.SUCCESS
+        self.stdout.write(style(f"{len(rates)} rates read, {written} rows written (inverses included), {errors} rejected"))
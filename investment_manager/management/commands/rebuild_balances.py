@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.balances import find_mismatches, rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Verify or rebuild the per-client balance ledger from contributions and investments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Only report drifted balances, exit non-zero if any")
+        parser.add_argument('--client', type=int, action='append', dest='clients', help="Limit to a client id (repeatable)")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = find_mismatches(options['clients'])
+            for expected, current in mismatches:
+                stored = current.available if current else 'missing'
+                self.stdout.write(f"Client {expected.client_id}: available {stored}, expected {expected.available}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} client balance(s) out of date")
+            self.stdout.write(self.style.SUCCESS("All client balances match"))
+            return
+
+        fixed = rebuild_balances(options['clients'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {fixed} client balance(s)"))
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.fees import recompute_fees
+from investment_manager.models import Contribution
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-derive fee rates, fees and investable amounts of existing contributions from the current fee schedule, "
+        "adjusting client balances by the difference. Run after correcting a schedule. Rates given by hand and "
+        "contributions dated before any schedule band applies are left as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="Only contributions dated on or after (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Only contributions dated on or before (YYYY-MM-DD)")
+        parser.add_argument('--all', action='store_true', help="Every contribution, when no --from/--to is given")
+        parser.add_argument('--client', type=int, action='append', dest='clients', help="Limit to a client id (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Contributions read and locked per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without saving")
+
+    def handle(self, *args, **options):
+        if not (options['date_from'] or options['date_to'] or options['all']):
+            raise CommandError("Give the dates to recompute with --from/--to, or --all for every contribution")
+        queryset = Contribution.objects.all()
+        if options['date_from']:
+            queryset = queryset.filter(date__gte=options['date_from'])
+        if options['date_to']:
+            queryset = queryset.filter(date__lte=options['date_to'])
+        if options['clients']:
+            queryset = queryset.filter(client_id__in=options['clients'])
+
+        result = recompute_fees(queryset, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        prefix = "Dry run: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{result}"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from investment_manager.revaluation import revaluation_stats, revalue_investments, revalue_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute expected_current_value and status for investments that are out of date. "
+        "Safe to run from cron: completed investments with a final valuation and anything valued today are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Revalue every investment, not just the pending ones")
+        parser.add_argument('--dry-run', action='store_true', help="Print how many investments are pending and exit")
+        parser.add_argument('--workers', type=int, default=1, help="Processes used to revalue partitions in parallel")
+        parser.add_argument('--partition-size', type=int, default=20000, help="Investments handed to a worker at a time")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Investments loaded and revalued per chunk")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk_update statement")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            stats = revaluation_stats()
+            self.stdout.write(' '.join(f"{key}={value}" for key, value in stats.items()))
+            return
+
+        if options['all']:
+            result = revalue_investments(chunk_size=options['chunk_size'], batch_size=options['batch_size'])
+        else:
+            result = revalue_pending(
+                workers=options['workers'],
+                partition_size=options['partition_size'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(str(result)))
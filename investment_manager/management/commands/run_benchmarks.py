@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.benchmarks import run_benchmarks, write_results
+
+
+class Command(BaseCommand):
+    help = "Time every view in urls.py, the model save paths and the revaluation jobs, and write the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='seed_manager_0', help="Username the views are requested as")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per view and save path; the median is reported")
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--skip-jobs', action='store_true', help="Leave out the bulk revaluation jobs, which write to the database")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"No user named '{options['user']}'")
+        try:
+            report = run_benchmarks(user, repeat=options['repeat'], include_jobs=not options['skip_jobs'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        for section, results in report['results'].items():
+            self.stdout.write(section)
+            for name, result in results.items():
+                self.stdout.write(f"  {name:<36} {result['median_ms']:>10.1f} ms  {result['queries']:>5} queries")
+        write_results(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
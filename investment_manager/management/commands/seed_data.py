@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Insert synthetic clients, contributions and investments for benchmarking, with balances kept consistent"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--contributions', type=int, default=20000)
+        parser.add_argument('--investments', type=int, default=5000)
+        parser.add_argument('--managers', type=int, default=5, help="Seed managers to spread clients across")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, help="Random seed, for a reproducible data set")
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1:
+            raise CommandError("--clients must be at least 1")
+        try:
+            counts = seed(
+                clients=options['clients'],
+                contributions=options['contributions'],
+                investments=options['investments'],
+                managers=options['managers'],
+                batch_size=options['batch_size'],
+                seed_value=options['seed'],
+                log=lambda message: self.stdout.write(f"  {message}"),
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['clients']:,} clients, {counts['contributions']:,} contributions, {counts['investments']:,} investments"
+        ))
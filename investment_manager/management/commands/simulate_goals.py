@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from investment_manager.models import Client
+from investment_manager.routers import reads_from_replica
+from investment_manager.simulations import (
+    DEFAULT_HORIZON_MONTHS, DEFAULT_PATHS, DEFAULT_SEED, PARTITION_SIZE, attainment_by, simulate_goals,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Estimate every client's probability of reaching their target amount within a horizon by Monte Carlo "
+        "simulation, reusing cached results for clients whose money has not moved"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', type=int, default=DEFAULT_PATHS, help="Scenarios per client")
+        parser.add_argument('--horizon-months', type=int, default=DEFAULT_HORIZON_MONTHS, help="Months ahead the target must be reached by")
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed for the shared scenarios")
+        parser.add_argument('--workers', type=int, default=1, help="Processes simulating partitions in parallel")
+        parser.add_argument('--partition-size', type=int, default=PARTITION_SIZE, help="Clients handed to a worker at a time")
+        parser.add_argument('--client', type=int, action='append', help="Only this client id (repeatable)")
+        parser.add_argument('--by', nargs='+', default=['risk_level', 'financial_goal'], help="Client fields to summarise by")
+
+    @reads_from_replica
+    def handle(self, *args, **options):
+        clients = Client.objects.all()
+        if options['client']:
+            clients = clients.filter(pk__in=options['client'])
+        result = simulate_goals(
+            clients,
+            paths=options['paths'],
+            horizon_months=options['horizon_months'],
+            seed=options['seed'],
+            workers=options['workers'],
+            partition_size=options['partition_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(str(result)))
+        for group in attainment_by(result, *options['by']):
+            labels = ' / '.join(str(group[name]) for name in options['by'])
+            self.stdout.write(f"{labels}: {group['probability']:.1%} across {group['clients']:,} clients")
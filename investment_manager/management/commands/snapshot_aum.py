@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investment_manager.aum import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Record the daily assets-under-management rollups, folding in only rows changed since the last snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Snapshot date (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--full', action='store_true', help="Recompute every group from the raw tables")
+
+    def handle(self, *args, **options):
+        run = build_snapshot(options['date'], full=options['full'])
+        mode = "full rebuild" if run.full_rebuild else "incremental"
+        self.stdout.write(self.style.SUCCESS(
+            f"{run} ({mode}): {run.groups_recomputed} groups recomputed, {run.groups_carried} carried forward"
+        ))
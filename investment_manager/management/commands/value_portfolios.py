@@ -0,0 +1,58 @@
+import csv
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_manager.portfolios import filter_investments, iter_investment_values, value_portfolios
+from investment_manager.routers import reads_from_replica
+
+
+CLIENT_COLUMNS = ('client_id', 'full_name', 'currency', 'investments', 'active', 'invested', 'value')
+INVESTMENT_COLUMNS = ('investment_id', 'client_id', 'invested', 'value', 'status')
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every client's portfolio value as of a date to CSV, with the same compounding and maturity "
+        "rules as a save but without changing any investment"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, required=True, help="Valuation date (YYYY-MM-DD)")
+        parser.add_argument('--output', help="CSV file to write, defaults to standard output")
+        parser.add_argument('--investments', action='store_true', help="One row per investment instead of per client")
+        parser.add_argument('--client', help="Only this client id")
+        parser.add_argument('--manager', help="Only clients of this manager id")
+        parser.add_argument('--currency', help="Only clients in this currency")
+        parser.add_argument('--risk-level', help="Only clients with this risk level")
+        parser.add_argument('--investment-type', help="Only investments of this type")
+
+    @reads_from_replica
+    def handle(self, *args, **options):
+        try:
+            queryset = filter_investments(options)
+        except ValueError as e:
+            raise CommandError(f"Invalid filter: {e}")
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            if options['investments']:
+                writer.writerow(INVESTMENT_COLUMNS)
+                writer.writerows(iter_investment_values(options['date'], queryset))
+                return
+            report = value_portfolios(options['date'], queryset)
+            writer.writerow(CLIENT_COLUMNS)
+            writer.writerows([row[column] for column in CLIENT_COLUMNS] for row in report.clients)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(str(report)))
+        for currency, amounts in report.by_currency.items():
+            self.stderr.write(f"{currency.upper()}: invested {amounts['invested']:,.2f}, value {amounts['value']:,.2f}")
+        if report.missing_rates:
+            self.stderr.write(self.style.WARNING(f"No {report.quote.upper()} rate for {', '.join(report.missing_rates).upper()}"))
+        else:
+            self.stderr.write(f"Consolidated {report.quote.upper()}: value {report.consolidated['value']:,.2f}")
@@ -0,0 +1,96 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import valuation
+from .expressions import compounded_value
+from .models import Investment
+
+
+CALENDAR_FIELDS = (
+    'id', 'client_id', 'client__full_name', 'client__currency', 'investment_type',
+    'investment_amount', 'start_date', 'maturity_date', 'maturity_value',
+)
+COMPLETION_FIELDS = ('status', 'expected_current_value', 'last_valued_at', 'updated_at')
+VALUATION_FIELDS = ('id', 'start_date', 'maturity_date', 'investment_amount', 'expected_annual_growth_rate_percentage')
+
+
+def active_investments():
+    # status='active' must stay a literal filter so the planner can use the partial
+    # investment_active_maturity_idx (maturity_date WHERE status = 'active')
+    return Investment.objects.filter(status='active')
+
+
+def calendar_bounds(today=None):
+    """(today, end of this week (Sunday), end of this month)."""
+    today = today or date.today()
+    week_end = today + timedelta(days=6 - today.weekday())
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    return today, week_end, month_end
+
+
+def maturity_calendar(today=None):
+    """
+    Active investments maturing today, this week and this month, plus any past
+    maturity still waiting for complete_matured. One range scan of the partial
+    index. A row can appear in several buckets. 'this_month' holds every upcoming
+    row except, when the week runs into next month, those in 'this_week' past
+    the month end.
+    """
+    today, week_end, month_end = calendar_bounds(today)
+    end = max(week_end, month_end)  # the week can run into next month
+    rows = list(
+        active_investments()
+        .filter(maturity_date__lte=end)
+        .annotate(maturity_value=compounded_value(end))  # growth stops at maturity, which is <= end
+        .order_by('maturity_date', 'id')
+        .values(*CALENDAR_FIELDS)
+    )
+    labels = dict(Investment._meta.get_field('investment_type').choices)
+    for row in rows:
+        row['investment_type_display'] = labels.get(row['investment_type'], row['investment_type'])
+    return {
+        'overdue': [row for row in rows if row['maturity_date'] < today],
+        'today': [row for row in rows if row['maturity_date'] == today],
+        'this_week': [row for row in rows if today <= row['maturity_date'] <= week_end],
+        'this_month': [row for row in rows if today <= row['maturity_date'] <= month_end],
+    }
+
+
+def complete_matured(today=None, chunk_size=5000):
+    """
+    Mark every active investment whose maturity_date has passed as completed, with
+    its final value at maturity from the valuation kernel, as Investment.save
+    stores it. Uses the same rule as Investment.save: matured means
+    today > maturity_date. Reads and locks a keyset chunk at a time and writes it
+    with one prepared UPDATE through executemany. Returns the rows changed.
+    """
+    today = today or date.today()
+    queryset = active_investments().filter(maturity_date__lt=today).order_by('pk')
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(column)} = %s' for column in COMPLETION_FIELDS)
+    sql = f'UPDATE {quote(Investment._meta.db_table)} SET {assignments} WHERE {quote("id")} = %s'
+    rows = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(queryset.filter(pk__gt=last_pk).select_for_update().values_list(*VALUATION_FIELDS)[:chunk_size])
+            if not chunk:
+                return rows
+            last_pk = chunk[-1][0]
+            ids, starts, maturities, amounts, rates = zip(*chunk)
+            values = valuation.cents_batch(
+                np.fromiter((int(amount.scaleb(2)) for amount in amounts), dtype=np.int64, count=len(amounts)),
+                np.fromiter((int(rate.scaleb(3)) for rate in rates), dtype=np.int64, count=len(rates)),
+                valuation.ordinals(maturities) - valuation.ordinals(starts),
+            )
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, [
+                    ('completed', Decimal(value).scaleb(-2), now, now, pk) for pk, value in zip(ids, values.tolist())
+                ])
+            rows += len(chunk)
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:48
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def populate_balances(apps, schema_editor):
+    Client = apps.get_model('investment_manager', 'Client')
+    ClientBalance = apps.get_model('investment_manager', 'ClientBalance')
+    Contribution = apps.get_model('investment_manager', 'Contribution')
+    Investment = apps.get_model('investment_manager', 'Investment')
+
+    contributed = {
+        row['client_id']: row
+        for row in Contribution.objects.values('client_id').annotate(
+            contributed=models.Sum('contribution_amount'),
+            investable=models.Sum('investable_amount'),
+        )
+    }
+    invested = dict(
+        Investment.objects.values('client_id').annotate(total=models.Sum('investment_amount')).values_list('client_id', 'total')
+    )
+    balances = []
+    for client_id in Client.objects.values_list('id', flat=True).iterator():
+        row = contributed.get(client_id, {})
+        total_investable = row.get('investable') or Decimal('0.00')
+        total_invested = invested.get(client_id) or Decimal('0.00')
+        balances.append(ClientBalance(
+            client_id=client_id,
+            total_contributed=row.get('contributed') or Decimal('0.00'),
+            total_investable=total_investable,
+            total_invested=total_invested,
+            available=total_investable - total_invested,
+        ))
+    ClientBalance.objects.bulk_create(balances, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0017_rename_name_client_full_name_alter_client_manager_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientBalance',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='investment_manager.client')),
+                ('total_contributed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total_investable', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total_invested', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('available', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0018_clientbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investment',
+            name='last_valued_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
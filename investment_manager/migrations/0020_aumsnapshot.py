@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0019_investment_last_valued_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AumSnapshotRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(unique=True)),
+                ('watermark', models.DateTimeField()),
+                ('groups_recomputed', models.IntegerField(default=0)),
+                ('groups_carried', models.IntegerField(default=0)),
+                ('full_rebuild', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AumSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('investment_type', models.CharField(max_length=50)),
+                ('currency', models.CharField(max_length=3)),
+                ('risk_level', models.CharField(max_length=10)),
+                ('investment_count', models.IntegerField(default=0)),
+                ('invested_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('current_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='aumsnapshot',
+            constraint=models.UniqueConstraint(fields=('snapshot_date', 'investment_type', 'currency', 'risk_level', 'manager'), name='unique_aum_snapshot_group'),
+        ),
+    ]
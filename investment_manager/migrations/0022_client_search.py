@@ -0,0 +1,83 @@
+from django.db import migrations
+
+
+SEARCH_COLUMNS = ('full_name', 'email', 'phone', 'client_nrc')
+
+# Matches the UPPER("col"::text) LIKE expressions Django emits for icontains/istartswith
+POSTGRES_FORWARD = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f'CREATE INDEX IF NOT EXISTS client_{column}_trgm_idx ON investment_manager_client USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+    for column in SEARCH_COLUMNS
+] + [
+    # Plain btree with pattern ops answers short prefixes that trigrams cannot (under three characters)
+    f'CREATE INDEX IF NOT EXISTS client_{column}_prefix_idx ON investment_manager_client ((UPPER("{column}"::text)) text_pattern_ops)'
+    for column in SEARCH_COLUMNS
+]
+POSTGRES_REVERSE = [
+    f'DROP INDEX IF EXISTS client_{column}_{kind}_idx'
+    for column in SEARCH_COLUMNS
+    for kind in ('trgm', 'prefix')
+]
+
+# External-content FTS5 table over the client columns, kept in step by triggers.
+# '@' '.' '+' stay inside tokens so emails and phone numbers match as typed.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE investment_manager_client_fts USING fts5(
+        full_name, email, phone, client_nrc,
+        content='investment_manager_client', content_rowid='id',
+        tokenize="unicode61 tokenchars '@.+'", prefix='2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER investment_manager_client_fts_insert AFTER INSERT ON investment_manager_client BEGIN
+        INSERT INTO investment_manager_client_fts(rowid, full_name, email, phone, client_nrc)
+        VALUES (new.id, new.full_name, new.email, new.phone, new.client_nrc);
+    END
+    """,
+    """
+    CREATE TRIGGER investment_manager_client_fts_delete AFTER DELETE ON investment_manager_client BEGIN
+        INSERT INTO investment_manager_client_fts(investment_manager_client_fts, rowid, full_name, email, phone, client_nrc)
+        VALUES ('delete', old.id, old.full_name, old.email, old.phone, old.client_nrc);
+    END
+    """,
+    """
+    CREATE TRIGGER investment_manager_client_fts_update AFTER UPDATE ON investment_manager_client BEGIN
+        INSERT INTO investment_manager_client_fts(investment_manager_client_fts, rowid, full_name, email, phone, client_nrc)
+        VALUES ('delete', old.id, old.full_name, old.email, old.phone, old.client_nrc);
+        INSERT INTO investment_manager_client_fts(rowid, full_name, email, phone, client_nrc)
+        VALUES (new.id, new.full_name, new.email, new.phone, new.client_nrc);
+    END
+    """,
+    "INSERT INTO investment_manager_client_fts(investment_manager_client_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS investment_manager_client_fts_insert",
+    "DROP TRIGGER IF EXISTS investment_manager_client_fts_delete",
+    "DROP TRIGGER IF EXISTS investment_manager_client_fts_update",
+    "DROP TABLE IF EXISTS investment_manager_client_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def create_search_indexes(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def drop_search_indexes(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0021_hot_filter_indexes'),
+    ]
+
+    operations = [
+        # Other backends keep the plain icontains search without extra indexes
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
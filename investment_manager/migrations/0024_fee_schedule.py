@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 00:28
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0023_fxrate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField()),
+                ('currency', models.CharField(blank=True, choices=[('usd', 'USD'), ('zmw', 'ZMW')], max_length=3)),
+                ('payment_method', models.CharField(blank=True, choices=[('cash', 'Cash'), ('ddacc', 'DDACC'), ('mobile_money', 'Mobile Money'), ('bank_transfer', 'Bank Transfer'), ('cheque', 'Cheque')], max_length=50)),
+                ('min_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('fee_rate_percentage', models.DecimalField(decimal_places=3, max_digits=5)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='contribution',
+            name='fee_rate_percentage',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=5, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='feeschedule',
+            constraint=models.UniqueConstraint(fields=('currency', 'payment_method', 'effective_from', 'min_amount'), name='unique_fee_band'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.0.6 on 2026-10-18 00:52
+
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+
+
+@lru_cache(maxsize=65536)
+def growth_factor(rate, days):
+    # A copy of valuation.growth_factor as of this migration, so later kernel changes don't alter the backfill
+    return (Decimal('1') + rate / 100) ** (Decimal(days) / Decimal('365.25'))
+
+
+def maturity_value(amount, rate, days):
+    return (amount * growth_factor(rate, days)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def backfill_entries(apps, schema_editor):
+    Contribution = apps.get_model('investment_manager', 'Contribution')
+    Investment = apps.get_model('investment_manager', 'Investment')
+    LedgerEntry = apps.get_model('investment_manager', 'LedgerEntry')
+
+    entries = []
+
+    def add(**kwargs):
+        if kwargs['amount']:
+            entries.append(LedgerEntry(**kwargs))
+        if len(entries) >= 5000:
+            LedgerEntry.objects.bulk_create(entries)
+            entries.clear()
+
+    contributions = Contribution.objects.order_by('pk').values_list('id', 'client_id', 'date', 'contribution_amount', 'investable_amount')
+    for pk, client_id, on, amount, investable in contributions.iterator(chunk_size=5000):
+        add(client_id=client_id, entry_date=on, kind='contribution', amount=amount, contribution_id=pk)
+        add(client_id=client_id, entry_date=on, kind='fee', amount=amount - (investable or 0), contribution_id=pk)
+
+    investments = Investment.objects.order_by('pk').values_list(
+        'id', 'client_id', 'start_date', 'maturity_date', 'investment_duration',
+        'investment_amount', 'expected_annual_growth_rate_percentage',
+    )
+    for pk, client_id, start, maturity, duration, amount, rate in investments.iterator(chunk_size=5000):
+        maturity = maturity or start + relativedelta(months=duration)
+        add(client_id=client_id, entry_date=start, kind='allocation', amount=amount, investment_id=pk)
+        add(client_id=client_id, entry_date=maturity, kind='maturity', amount=maturity_value(amount, rate, (maturity - start).days), investment_id=pk)
+    LedgerEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0024_fee_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkpoint_date', models.DateField()),
+                ('last_entry_id', models.BigIntegerField()),
+                ('contributed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('fees', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('invested', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('matured', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='investment_manager.client')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('kind', models.CharField(choices=[('contribution', 'Contribution'), ('fee', 'Fee'), ('allocation', 'Allocation'), ('maturity', 'Maturity')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='investment_manager.client')),
+                ('contribution', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='investment_manager.contribution')),
+                ('investment', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='investment_manager.investment')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ledgercheckpoint',
+            constraint=models.UniqueConstraint(fields=('client', 'checkpoint_date'), name='unique_ledger_checkpoint'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['client', 'entry_date'], name='ledger_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['client', 'id'], name='ledger_client_entry_idx'),
+        ),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def mark_existing_rates_overridden(apps, schema_editor):
+    # Until now the form required a typed rate, so every existing one was given by hand
+    Contribution = apps.get_model('investment_manager', 'Contribution')
+    Contribution.objects.update(fee_rate_overridden=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0025_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='fee_rate_overridden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_rates_overridden, migrations.RunPython.noop),
+    ]
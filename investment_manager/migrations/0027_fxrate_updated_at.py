@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0026_contribution_fee_rate_overridden'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fxrate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
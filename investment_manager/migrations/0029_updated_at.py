@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:00
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+client_search = import_module('investment_manager.migrations.0022_client_search')
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite adds the client column by rebuilding the table, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in client_search.SQLITE_REVERSE[:3] + client_search.SQLITE_FORWARD[1:]:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0028_feeschedule_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='contribution',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='investment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['updated_at'], name='client_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['updated_at'], name='contribution_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(fields=['updated_at'], name='investment_updated_idx'),
+        ),
+    ]
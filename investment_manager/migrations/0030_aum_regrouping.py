@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_manager', '0029_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aumsnapshotrun',
+            name='contribution_rows',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='aumsnapshotrun',
+            name='investment_rows',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='regrouped_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['regrouped_at'], name='client_regrouped_idx'),
+        ),
+    ]
@@ -1,11 +1,19 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from dateutil.relativedelta import relativedelta
 from datetime import date
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from . import valuation
+from .expressions import compounded_value, valuation_status
+from .routers import on_primary
+from .valuation import CENT
+
+
+# Client columns that place its rows in an AUM snapshot group
+GROUP_FIELDS = ('currency', 'risk_level', 'manager_id')
 
 
 # Create your models here.
@@ -70,6 +78,18 @@ class Client(models.Model):
     )
     manager = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bulk writers set it themselves; fragments.data_version reads its maximum
+    updated_at = models.DateTimeField(auto_now=True)
+    # When rows last left one of this client's AUM groups, which an incremental snapshot can't see
+    regrouped_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['manager', 'created_at'], name='client_manager_created_idx'),
+            models.Index(fields=['created_at'], name='client_created_idx'),
+            models.Index(fields=['updated_at'], name='client_updated_idx'),
+            models.Index(fields=['regrouped_at'], name='client_regrouped_idx'),
+        ]
 
     def format_target(self):
         return f"{self.target_amount:,.2f}"
@@ -86,16 +106,105 @@ class Client(models.Model):
     def save(self, *args, **kwargs):
         if self.contribution_type == 'lump_sum':
             self.contribution_frequency = 'once_off'
+        if self.pk:
+            previous = Client.objects.filter(pk=self.pk).values(*GROUP_FIELDS).first()
+            if previous and any(getattr(self, field) != previous[field] for field in GROUP_FIELDS):
+                self.regrouped_at = timezone.now()
         super(Client, self).save(*args, **kwargs)
+        ClientBalance.objects.get_or_create(client=self)
+
+    @classmethod
+    def mark_regrouped(cls, client_id):
+        """Record that rows left one of the client's AUM groups, so the next snapshot is rebuilt in full."""
+        cls.objects.filter(pk=client_id).update(regrouped_at=timezone.now())
+
+    def get_balance(self):
+        # Always read the row fresh: a cached self.balance goes stale as soon as a contribution is saved
+        return ClientBalance.objects.get_or_create(client=self)[0]
 
     def total_contributions(self):
-        return self.contribution_set.aggregate(total=models.Sum('investable_amount'))['total'] or 0
+        return self.get_balance().total_investable
     
     def total_investments(self):
-        return self.investment_set.aggregate(total=models.Sum('investment_amount'))['total'] or 0
+        return self.get_balance().total_invested
     
     def amount_left_for_investment(self):
-        return self.total_contributions() - self.total_investments()
+        return self.get_balance().available
+
+
+class ClientBalance(models.Model):
+    """
+    Running per-client totals, kept in step with Contribution.save and Investment.save
+    so balance checks never have to aggregate the client's full history.
+    Use the rebuild_balances command to verify or rebuild from the raw tables.
+    """
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    total_contributed = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_investable = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_invested = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    available = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_fees(self):
+        return self.total_contributed - self.total_investable
+
+    @classmethod
+    def apply(cls, client_id, contributed=0, investable=0, invested=0):
+        # Single UPDATE with F() expressions so concurrent writers never lose an increment
+        cls.objects.get_or_create(client_id=client_id)
+        cls.objects.filter(client_id=client_id).update(
+            total_contributed=models.F('total_contributed') + contributed,
+            total_investable=models.F('total_investable') + investable,
+            total_invested=models.F('total_invested') + invested,
+            available=models.F('available') + investable - invested,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def apply_many(cls, deltas):
+        """
+        apply() for many clients at once, for bulk jobs where an UPDATE statement per
+        client dominates: deltas maps client_id to (contributed, investable, invested).
+        Sends one prepared UPDATE through executemany.
+        """
+        if not deltas:
+            return
+        existing = set(cls.objects.filter(client_id__in=list(deltas)).values_list('client_id', flat=True))
+        cls.objects.bulk_create([cls(client_id=client_id) for client_id in deltas if client_id not in existing])
+        quote = connection.ops.quote_name
+        columns = ['total_contributed', 'total_investable', 'total_invested']
+        assignments = ', '.join(f'{quote(column)} = {quote(column)} + %s' for column in columns)
+        sql = (
+            f'UPDATE {quote(cls._meta.db_table)} SET {assignments}, '
+            f'{quote("available")} = {quote("available")} + %s - %s, {quote("updated_at")} = %s '
+            f'WHERE {quote("client_id")} = %s'
+        )
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                (contributed, investable, invested, investable, invested, now, client_id)
+                for client_id, (contributed, investable, invested) in deltas.items()
+            ])
+
+    @classmethod
+    def lock(cls, *client_ids):
+        """
+        Lock the balance rows of the given clients (SELECT ... FOR UPDATE) until the
+        surrounding transaction ends. Rows are locked in client order so two writers
+        touching the same pair of clients cannot deadlock.
+        """
+        client_ids = sorted(set(client_ids))
+        for client_id in client_ids:
+            cls.objects.get_or_create(client_id=client_id)
+        return {balance.client_id: balance for balance in cls.objects.select_for_update().filter(client_id__in=client_ids).order_by('client_id')}
+
+    def __str__(self):
+        return f"{self.client} ({self.client.currency.upper()} {self.available:,.2f} available)"
+
+
+# Contribution columns the fee schedule band depends on
+FEE_INPUTS = ('client_id', 'date', 'contribution_amount', 'payment_method')
 
 
 class Contribution(models.Model):
@@ -113,25 +222,104 @@ class Contribution(models.Model):
             ('cheque', 'Cheque')
         ]
     )
-    fee_rate_percentage = models.DecimalField(max_digits=5, decimal_places=3, null=True, blank=True, default=Decimal('3.000'))
+    # Left empty, save() takes the rate from the fee schedule; a value given here overrides it
+    fee_rate_percentage = models.DecimalField(max_digits=5, decimal_places=3, null=True, blank=True)
+    # Set by save() when the rate was given rather than looked up; recompute_fees leaves these rates alone
+    fee_rate_overridden = models.BooleanField(default=False)
     fees = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     investable_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     manager = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)
     description = models.TextField(null=True, blank=True)  # Optional field for additional context
+    # Bulk writers set it themselves; fragments.data_version reads its maximum
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'date'], name='contribution_client_date_idx'),
+            models.Index(fields=['manager', 'created_at'], name='contribution_manager_idx'),
+            models.Index(fields=['created_at'], name='contribution_created_idx'),
+            models.Index(fields=['updated_at'], name='contribution_updated_idx'),
+        ]
 
     def get_manager_full_name(self):
         return f"{self.manager.first_name} {self.manager.last_name}"
 
+    @staticmethod
+    def compute_fees(contribution_amount, fee_rate_percentage):
+        """Return (fees, investable_amount) rounded to the stored 2dp."""
+        fees = contribution_amount * Decimal(fee_rate_percentage) / 100
+        # Round here so the balance ledger adds exactly what the table holds
+        return (
+            fees.quantize(CENT, rounding=ROUND_HALF_UP),
+            (contribution_amount - fees).quantize(CENT, rounding=ROUND_HALF_UP),
+        )
+
     def save(self, *args, **kwargs):
-        self.fees = self.contribution_amount * Decimal(self.fee_rate_percentage) / 100
-        self.investable_amount = self.contribution_amount - self.fees
-        super(Contribution, self).save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Contribution.objects.filter(pk=self.pk).values(*FEE_INPUTS, 'investable_amount', 'fee_rate_percentage').first()
+            if (previous and not self.fee_rate_overridden and self.fee_rate_percentage == previous['fee_rate_percentage']
+                    and any(getattr(self, name) != previous[name] for name in FEE_INPUTS)):
+                # A looked-up rate follows the amount, date or method into its new band
+                self.fee_rate_percentage = None
+            if self.fee_rate_percentage is None:
+                from .fees import fee_schedule  # fees.py imports this module
+                self.fee_rate_percentage = fee_schedule.rate_for(self)
+                self.fee_rate_overridden = False
+            elif previous is None or self.fee_rate_percentage != previous['fee_rate_percentage']:
+                self.fee_rate_overridden = True
+            self.fees, self.investable_amount = self.compute_fees(self.contribution_amount, self.fee_rate_percentage)
+            self._previous_client_id = previous['client_id'] if previous else None  # for the post_save receivers
+            super(Contribution, self).save(*args, **kwargs)
+            entries = []
+            if previous:
+                if previous['client_id'] != self.client_id:
+                    Client.mark_regrouped(previous['client_id'])
+                ClientBalance.apply(previous['client_id'], -previous['contribution_amount'], -previous['investable_amount'])
+                entries += LedgerEntry.for_contribution(
+                    self.pk, previous['client_id'], previous['date'], previous['contribution_amount'], previous['investable_amount'], sign=-1
+                )
+            ClientBalance.apply(self.client_id, self.contribution_amount, self.investable_amount)
+            entries += LedgerEntry.for_contribution(self.pk, self.client_id, self.date, self.contribution_amount, self.investable_amount)
+            LedgerEntry.append(entries)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = Contribution.objects.filter(pk=self.pk).values('client_id', 'date', 'contribution_amount', 'investable_amount').get()
+            LedgerEntry.append(LedgerEntry.for_contribution(
+                self.pk, stored['client_id'], stored['date'], stored['contribution_amount'], stored['investable_amount'], sign=-1
+            ))
+            result = super(Contribution, self).delete(*args, **kwargs)
+            ClientBalance.apply(stored['client_id'], -stored['contribution_amount'], -stored['investable_amount'])
+        return result
 
     def __str__(self) -> str:
         return f"{self.client.currency.upper()} {self.contribution_amount:,.2f} Received On: {self.date:%d/%m/%Y}"
 
 
+class InvestmentQuerySet(models.QuerySet):
+
+    def with_current_value(self, as_of=None):
+        """
+        Annotate current_value and current_status computed in SQL for `as_of`
+        (default today), so listings and totals are up to date without a
+        revaluation pass over the stored expected_current_value.
+        """
+        as_of = as_of or date.today()
+        return self.annotate(
+            current_value=compounded_value(as_of),
+            current_status=valuation_status(as_of),
+        )
+
+
+# Investment columns behind its ledger entries
+LEDGER_FIELDS = ('client_id', 'start_date', 'maturity_date', 'investment_amount', 'expected_annual_growth_rate_percentage')
+
+
 class Investment(models.Model):
+    objects = InvestmentQuerySet.as_manager()
+
     manager = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
@@ -164,15 +352,50 @@ class Investment(models.Model):
     expected_current_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     description = models.TextField(null=True, blank=True)  # Optional field for additional context
     status = models.CharField(max_length=20, choices=[('active', 'Active'), ('completed', 'Completed')], default='active')
+    last_valued_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Bulk writers set it themselves; fragments.data_version reads its maximum
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'maturity_date'], name='investment_status_maturity_idx'),
+            # Only active investments are revalued or matured, and they are a small slice of all history
+            models.Index(fields=['maturity_date'], condition=models.Q(status='active'), name='investment_active_maturity_idx'),
+            models.Index(fields=['client', 'start_date'], name='investment_client_start_idx'),
+            models.Index(fields=['manager', 'created_at'], name='investment_manager_idx'),
+            models.Index(fields=['created_at'], name='investment_created_idx'),
+            models.Index(fields=['last_valued_at'], name='investment_last_valued_idx'),
+            models.Index(fields=['updated_at'], name='investment_updated_idx'),
+        ]
 
     def get_manager_full_name(self):
         return f"{self.manager.first_name} {self.manager.last_name}"
 
+    def over_allocation_error(self, amount_left):
+        return ValidationError(
+            f"The investment amount of {self.client.currency.upper()} {self.investment_amount:.2f} exceeds the amount left for investment for the client ({self.client.currency.upper()} {amount_left:.2f})"
+        )
+
+    def draws_more(self, previous):
+        """
+        Whether saving takes more of the client's balance than the stored row
+        `previous` did. Re-saves that don't are allowed even when the client is
+        already over-allocated, e.g. after a contribution was deleted.
+        """
+        return previous is None or previous['client_id'] != self.client_id or self.investment_amount > previous['investment_amount']
+
     def clean(self):
-        if self.client.amount_left_for_investment() < self.investment_amount:
-            raise ValidationError(
-                f"The investment amount of {self.client.currency.upper()} {self.investment_amount:.2f} exceeds the amount left for investment for the client ({self.client.currency.upper()} {self.client.amount_left_for_investment():.2f})"
-            )
+        # Early feedback for forms only: the binding check runs against the locked balance row in save().
+        # Read from the primary, since a lagging replica would pass allocations the primary then rejects
+        with on_primary():
+            previous = Investment.objects.filter(pk=self.pk).values('client_id', 'investment_amount').first() if self.pk else None
+            if not self.draws_more(previous):
+                return
+            amount_left = self.client.amount_left_for_investment()
+        if previous and previous['client_id'] == self.client_id:
+            amount_left += previous['investment_amount']
+        if amount_left < self.investment_amount:
+            raise self.over_allocation_error(amount_left)
 
     def save(self, *args, validate=True, **kwargs):
         if not self.maturity_date:
@@ -182,20 +405,241 @@ class Investment(models.Model):
             self.full_clean()  # Validate the model instance
 
         # Calculate the expected current value based on the elapsed time
-        if date.today() > self.maturity_date:
-            days_elapsed = (self.maturity_date - self.start_date).days
-        else:
-            days_elapsed = (date.today() - self.start_date).days
-        years_elapsed = Decimal(days_elapsed) / Decimal('365.25')  # Approximate number of days in a year including leap years
-        self.expected_current_value = self.investment_amount * (Decimal('1') + self.expected_annual_growth_rate_percentage / 100) ** years_elapsed
+        days_elapsed = valuation.elapsed_days(self.start_date, self.maturity_date)
+        self.expected_current_value = valuation.value(
+            self.investment_amount, self.expected_annual_growth_rate_percentage, days_elapsed
+        )  # rounded to cents as stored, so a second save still passes full_clean
 
         # Update status based on maturity date
         if date.today() > self.maturity_date:
             self.status = 'completed'
         else:
             self.status = 'active'
+        self.last_valued_at = timezone.now()
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Investment.objects.filter(pk=self.pk).values(*LEDGER_FIELDS, 'investment_type').first()
+            # Lock only this client's balance row: concurrent allocations for the same client
+            # queue here and re-check against committed totals, other clients are unaffected
+            balances = ClientBalance.lock(self.client_id, *([previous['client_id']] if previous else []))
+            if self.draws_more(previous):
+                amount_left = balances[self.client_id].available
+                if previous and previous['client_id'] == self.client_id:
+                    amount_left += previous['investment_amount']
+                if amount_left < self.investment_amount:
+                    raise self.over_allocation_error(amount_left)
+
+            self._previous_client_id = previous['client_id'] if previous else None  # for the post_save receivers
+            super(Investment, self).save(*args, **kwargs)
+            entries = []
+            if previous:
+                if (previous['client_id'], previous['investment_type']) != (self.client_id, self.investment_type):
+                    Client.mark_regrouped(previous['client_id'])
+                ClientBalance.apply(previous['client_id'], invested=-previous['investment_amount'])
+                entries += self.ledger_entries(previous, sign=-1)
+            ClientBalance.apply(self.client_id, invested=self.investment_amount)
+            entries += self.ledger_entries({field: getattr(self, field) for field in LEDGER_FIELDS})
+            LedgerEntry.append(entries)
 
-        super(Investment, self).save(*args, **kwargs)
+    def ledger_entries(self, values, sign=1):
+        return LedgerEntry.for_investment(
+            self.pk, values['client_id'], values['start_date'], values['maturity_date'],
+            values['investment_amount'], values['expected_annual_growth_rate_percentage'], sign=sign,
+        )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = Investment.objects.filter(pk=self.pk).values(*LEDGER_FIELDS).get()
+            LedgerEntry.append(self.ledger_entries(stored, sign=-1))
+            result = super(Investment, self).delete(*args, **kwargs)
+            ClientBalance.apply(stored['client_id'], invested=-stored['investment_amount'])
+        return result
 
     def __str__(self) -> str:
-        return f"{self.client.currency.upper()} {self.investment_amount:.2f} Invested On: {self.start_date:%d/%m/%Y}"
\ No newline at end of file
+        return f"{self.client.currency.upper()} {self.investment_amount:.2f} Invested On: {self.start_date:%d/%m/%Y}"
+
+class AumSnapshot(models.Model):
+    """
+    Assets under management on snapshot_date for one (investment_type, currency,
+    risk_level, manager) group, where manager is the client's manager.
+    Uninvested client funds, and what matured investments paid out, are rolled
+    up under investment_type 'cash'. Filled incrementally by the snapshot_aum command.
+    """
+    snapshot_date = models.DateField()
+    investment_type = models.CharField(max_length=50)
+    currency = models.CharField(max_length=3)
+    risk_level = models.CharField(max_length=10)
+    manager = models.ForeignKey(User, on_delete=models.CASCADE)
+    investment_count = models.IntegerField(default=0)
+    invested_amount = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    current_value = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['snapshot_date', 'investment_type', 'currency', 'risk_level', 'manager'],
+                name='unique_aum_snapshot_group',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_date:%d/%m/%Y} {self.investment_type} {self.currency.upper()} {self.current_value:,.2f}"
+
+
+class AumSnapshotRun(models.Model):
+    """Bookkeeping for snapshot_aum: rows written after `watermark` are folded into the next snapshot."""
+    snapshot_date = models.DateField(unique=True)
+    watermark = models.DateTimeField()
+    groups_recomputed = models.IntegerField(default=0)
+    groups_carried = models.IntegerField(default=0)
+    full_rebuild = models.BooleanField(default=False)
+    # Rows created before the watermark; fewer of them next time means some were deleted
+    investment_rows = models.IntegerField(null=True)
+    contribution_rows = models.IntegerField(null=True)
+
+    def __str__(self):
+        return f"AUM snapshot {self.snapshot_date:%d/%m/%Y}"
+
+
+class FxRate(models.Model):
+    """
+    Closing exchange rate on rate_date: one unit of `currency` is worth `rate` units
+    of `quote_currency`. A day without a row uses the latest earlier rate. Loaded
+    by the load_fx_rates command, which also stores the inverse of every pair.
+    """
+    rate_date = models.DateField()
+    currency = models.CharField(max_length=3)
+    quote_currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    # With the row count, tells each process's rate table when to reload
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Also the index for as-of lookups: latest rate_date <= d for a currency pair
+            models.UniqueConstraint(fields=['currency', 'quote_currency', 'rate_date'], name='unique_fx_rate'),
+        ]
+
+    def __str__(self):
+        return f"{self.rate_date:%d/%m/%Y} 1 {self.currency.upper()} = {self.rate:,.6f} {self.quote_currency.upper()}"
+
+
+class FeeSchedule(models.Model):
+    """
+    One band of the contribution fee schedule: from effective_from, contributions of
+    at least min_amount in `currency` paid by `payment_method` are charged
+    fee_rate_percentage of the whole amount. A blank currency or payment method
+    applies to all. See fees.py for how the band for a contribution is chosen.
+    """
+    effective_from = models.DateField()
+    currency = models.CharField(max_length=3, blank=True, choices=Client._meta.get_field('currency').choices)
+    payment_method = models.CharField(max_length=50, blank=True, choices=Contribution._meta.get_field('payment_method').choices)
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    fee_rate_percentage = models.DecimalField(max_digits=5, decimal_places=3)
+    # With the row count, tells each process's schedule table when to reload
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['currency', 'payment_method', 'effective_from', 'min_amount'],
+                name='unique_fee_band',
+            ),
+        ]
+
+    def __str__(self):
+        currency = self.currency.upper() or 'Any currency'
+        method = self.get_payment_method_display() or 'any method'
+        return f"{currency}, {method}, from {self.effective_from:%d/%m/%Y}: {self.fee_rate_percentage}% from {self.min_amount:,.2f}"
+
+
+class LedgerEntry(models.Model):
+    """
+    One money movement for a client, never updated or deleted. Editing or deleting
+    a contribution or investment appends entries reversing the old amounts, dated
+    like the originals (netted into a single difference when the date is kept).
+    Amounts are positive for the movement their kind names:
+    'fee' is what a contribution loses before it can be invested (contribution
+    minus investable amount), 'maturity' the value an allocation grows to by its
+    maturity date. Point-in-time balances come from ledger.balance_as_of.
+    """
+    KINDS = [
+        ('contribution', 'Contribution'),
+        ('fee', 'Fee'),
+        ('allocation', 'Allocation'),
+        ('maturity', 'Maturity'),
+    ]
+
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    entry_date = models.DateField()
+    kind = models.CharField(max_length=20, choices=KINDS)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    # Sources may be deleted later; the entries stay as they were
+    contribution = models.ForeignKey(Contribution, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    investment = models.ForeignKey(Investment, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'entry_date'], name='ledger_client_date_idx'),
+            # The as-of tail also picks up entries recorded after the checkpoint was taken
+            models.Index(fields=['client', 'id'], name='ledger_client_entry_idx'),
+        ]
+
+    @classmethod
+    def for_contribution(cls, contribution_id, client_id, on, amount, investable, sign=1):
+        return [
+            cls(client_id=client_id, entry_date=on, kind='contribution', amount=sign * amount, contribution_id=contribution_id),
+            cls(client_id=client_id, entry_date=on, kind='fee', amount=sign * (amount - investable), contribution_id=contribution_id),
+        ]
+
+    @classmethod
+    def for_investment(cls, investment_id, client_id, start_date, maturity_date, amount, rate, sign=1):
+        final_value = valuation.value(amount, rate, (maturity_date - start_date).days)
+        return [
+            cls(client_id=client_id, entry_date=start_date, kind='allocation', amount=sign * amount, investment_id=investment_id),
+            cls(client_id=client_id, entry_date=maturity_date, kind='maturity', amount=sign * final_value, investment_id=investment_id),
+        ]
+
+    @classmethod
+    def append(cls, entries, batch_size=1000):
+        """
+        Insert entries, first netting those for the same movement, so re-saving a
+        row without changing its money appends nothing.
+        """
+        netted = {}
+        for entry in entries:
+            key = (entry.client_id, entry.entry_date, entry.kind, entry.contribution_id, entry.investment_id)
+            if key in netted:
+                netted[key].amount += entry.amount
+            else:
+                netted[key] = entry
+        return cls.objects.bulk_create([entry for entry in netted.values() if entry.amount], batch_size=batch_size)
+
+    def __str__(self):
+        return f"{self.entry_date:%d/%m/%Y} {self.get_kind_display()} {self.amount:,.2f}"
+
+
+class LedgerCheckpoint(models.Model):
+    """
+    A client's ledger totals on checkpoint_date, over the entries dated up to then
+    with ids up to last_entry_id. Entries appended later, even backdated ones,
+    have higher ids and are read on top. Written by the checkpoint_ledger command.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    checkpoint_date = models.DateField()
+    last_entry_id = models.BigIntegerField()
+    contributed = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    fees = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    invested = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    matured = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'checkpoint_date'], name='unique_ledger_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} at {self.checkpoint_date:%d/%m/%Y}"
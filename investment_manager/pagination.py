@@ -0,0 +1,55 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(value, pk):
+    payload = json.dumps([value, pk], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(pk)
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+
+
+def parse_page_size(raw):
+    try:
+        page_size = int(raw or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError("page_size must be an integer")
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, sort_field, descending=False, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for one page of a values() queryset ordered by
+    (sort_field, pk). Pages are located with a WHERE on the last seen key rather
+    than OFFSET, so fetching page N costs the same as fetching page 1.
+    sort_field must be non-nullable.
+    """
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{sort_field}__{op}': value}) | Q(**{sort_field: value, f'pk__{op}': pk})
+        )
+
+    prefix = '-' if descending else ''
+    rows = list(queryset.order_by(f'{prefix}{sort_field}', f'{prefix}pk')[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[sort_field], last['id'])
+    return rows, next_cursor
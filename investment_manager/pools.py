@@ -0,0 +1,25 @@
+"""
+Process pools for the bulk jobs. Workers are forked explicitly, whatever the
+platform's default start method, so they start with Django set up and the job's
+modules imported: a spawned worker would import the models before django.setup().
+Each worker closes the database connections it inherited before running
+anything, so no two processes ever share a socket.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def _close_inherited_connections():
+    connections.close_all()
+
+
+def process_pool(workers):
+    """A ProcessPoolExecutor of `workers` forked processes. Closes the parent's connections first."""
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_close_inherited_connections,
+    )
@@ -0,0 +1,189 @@
+"""
+Portfolio values as of any date, for quarter-end and audit reporting.
+
+expected_current_value only reflects the day an investment was last saved or
+revalued. Here every investment started by the as-of date is valued with the
+same kernel and maturity cap as Investment.save, a keyset chunk at a time over
+NumPy columns, and summed per client in integer cents. Nothing is written.
+"""
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db import connections
+from django.db.models import BigIntegerField, CharField, F
+from django.db.models.functions import Cast, Round
+
+from . import fx, valuation
+from .models import Client, Investment
+
+
+CHUNK_SIZE = 20000
+VALUATION_COLUMNS = ('id', 'client_id', 'start_text', 'maturity_text', 'investment_duration', 'amount_cents', 'rate_milli')
+# Query parameter -> (lookup, parser), as in exports.EXPORTS
+FILTERS = {
+    'client': ('client_id', int),
+    'manager': ('client__manager_id', int),
+    'currency': ('client__currency', str),
+    'risk_level': ('client__risk_level', str),
+    'investment_type': ('investment_type', str),
+}
+
+
+def filter_investments(params):
+    """Investments narrowed by the FILTERS present in `params`. Raises ValueError on malformed values."""
+    lookups = {}
+    for param, (lookup, parse) in FILTERS.items():
+        value = params.get(param)
+        if value:
+            lookups[lookup] = parse(value)
+    return Investment.objects.filter(**lookups)
+
+
+def _dollars(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def value_chunks(as_of, queryset=None, chunk_size=CHUNK_SIZE, exact=True):
+    """
+    Yield a dict of NumPy columns per keyset chunk of the investments started by
+    `as_of`: id, client_id, invested and value (both in cents) and matured.
+    Rows are read straight from the cursor, since building a Decimal and a date
+    per value costs more than valuing it.
+    """
+    queryset = (queryset if queryset is not None else Investment.objects.all()).filter(start_date__lte=as_of).order_by('pk')
+    queryset = queryset.annotate(
+        # Text dates and integer money skip the per-value converters; NumPy parses the columns in bulk
+        start_text=Cast('start_date', CharField()),
+        maturity_text=Cast('maturity_date', CharField()),
+        amount_cents=Cast(Round(F('investment_amount') * 100), BigIntegerField()),
+        rate_milli=Cast(Round(F('expected_annual_growth_rate_percentage') * 1000), BigIntegerField()),
+    )
+    connection = connections[queryset.db]
+    last_pk = 0
+    while True:
+        chunk = queryset.filter(pk__gt=last_pk).values_list(*VALUATION_COLUMNS)[:chunk_size]
+        with connection.cursor() as cursor:
+            cursor.execute(*chunk.query.sql_with_params())
+            rows = cursor.fetchall()
+            # The SQL lists model fields before annotations whatever the values_list order
+            columns = dict(zip([column[0] for column in cursor.description], zip(*rows)))
+        if not rows:
+            return
+        ids = np.array(columns['id'], dtype=np.int64)
+        last_pk = int(ids.max())
+        starts = valuation.ordinals(columns['start_text'])
+        maturities = valuation.ordinals(columns['maturity_text'])
+        for index in np.flatnonzero(maturities == valuation.NO_DATE).tolist():
+            start = date.fromordinal(int(starts[index]))
+            maturities[index] = (start + relativedelta(months=columns['investment_duration'][index])).toordinal()
+        days, matured = valuation.elapsed_days_batch(starts, maturities, as_of)
+        invested = np.array(columns['amount_cents'], dtype=np.int64)
+        yield {
+            'id': ids,
+            'client_id': np.array(columns['client_id'], dtype=np.int64),
+            'invested': invested,
+            'value': valuation.cents_batch(invested, np.array(columns['rate_milli'], dtype=np.int64), days, exact=exact),
+            'matured': matured,
+        }
+
+
+def iter_investment_values(as_of, queryset=None, chunk_size=CHUNK_SIZE):
+    """(investment id, client id, invested, value, status) per investment, valued as of `as_of`."""
+    for chunk in value_chunks(as_of, queryset, chunk_size):
+        for pk, client_id, invested, value, matured in zip(
+            chunk['id'].tolist(), chunk['client_id'].tolist(), chunk['invested'].tolist(),
+            chunk['value'].tolist(), chunk['matured'].tolist(),
+        ):
+            yield pk, client_id, _dollars(invested), _dollars(value), 'completed' if matured else 'active'
+
+
+@dataclass
+class PortfolioReport:
+    as_of: date
+    quote: str
+    clients: list = field(default_factory=list)
+    by_currency: dict = field(default_factory=dict)
+    consolidated: dict = field(default_factory=dict)
+    missing_rates: list = field(default_factory=list)
+    investments: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self):
+        return {
+            'as_of': self.as_of,
+            'reporting_currency': self.quote,
+            'investments': self.investments,
+            'clients': self.clients,
+            'by_currency': self.by_currency,
+            'consolidated': self.consolidated,
+            'missing_rates': self.missing_rates,
+        }
+
+    def __str__(self):
+        return (
+            f"{self.investments:,} investments across {len(self.clients):,} clients "
+            f"valued as of {self.as_of:%d/%m/%Y} in {self.seconds:.2f}s"
+        )
+
+
+def value_portfolios(as_of, queryset=None, chunk_size=CHUNK_SIZE, quote=None):
+    """
+    Every client's portfolio as of `as_of`: investment count, active count, amount
+    invested and value, with totals per currency and in the reporting currency at
+    the rates in force on that date. Currencies without a rate are listed in
+    missing_rates and left out of the consolidated totals.
+    """
+    started = time.perf_counter()
+    quote = quote or fx.reporting_currency()
+    report = PortfolioReport(as_of=as_of, quote=quote)
+    # client id -> [investments, active, invested cents, value cents]
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for chunk in value_chunks(as_of, queryset, chunk_size):
+        client_ids, positions = np.unique(chunk['client_id'], return_inverse=True)
+        columns = [np.ones(len(positions), dtype=np.int64), (~chunk['matured']).astype(np.int64), chunk['invested'], chunk['value']]
+        sums = np.zeros((len(columns), len(client_ids)), dtype=np.int64)
+        for row, column in enumerate(columns):
+            np.add.at(sums[row], positions, column)
+        for client_id, client_sums in zip(client_ids.tolist(), sums.T.tolist()):
+            client_totals = totals[client_id]
+            for index, amount in enumerate(client_sums):
+                client_totals[index] += amount
+        report.investments += len(positions)
+
+    if not totals:
+        report.seconds = time.perf_counter() - started
+        return report
+    queryset = queryset if queryset is not None else Investment.objects.all()
+    clients = Client.objects.filter(id__in=queryset.filter(start_date__lte=as_of).values('client_id'))
+    currency_cents = defaultdict(lambda: [0, 0])
+    for client_id, full_name, currency in clients.order_by('id').values_list('id', 'full_name', 'currency'):
+        count, active, invested, value = totals[client_id]
+        report.clients.append({
+            'client_id': client_id,
+            'full_name': full_name,
+            'currency': currency,
+            'investments': count,
+            'active': active,
+            'invested': _dollars(invested),
+            'value': _dollars(value),
+        })
+        currency_cents[currency][0] += invested
+        currency_cents[currency][1] += value
+
+    report.consolidated = {'invested': fx.ZERO, 'value': fx.ZERO}
+    for currency, (invested, value) in sorted(currency_cents.items()):
+        amounts = {'invested': _dollars(invested), 'value': _dollars(value)}
+        report.by_currency[currency] = amounts
+        converted = fx.consolidate(amounts, currency, as_of, quote)
+        if converted is None:
+            report.missing_rates.append(currency)
+            continue
+        for name, amount in converted.items():
+            report.consolidated[name] += amount
+    report.seconds = time.perf_counter() - started
+    return report
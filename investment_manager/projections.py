@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import F, Sum
+
+from .fees import band_rate, fee_schedule
+from .models import Client, ClientBalance, Investment
+
+
+PERIODS_PER_YEAR = {
+    'monthly': 12,
+    'quarterly': 4,
+    'semi-annual': 2,
+    'annual': 1,
+    'once_off': 0,
+}
+DEFAULT_HORIZON_MONTHS = 600  # 50 years
+
+
+@dataclass
+class ProjectionResult:
+    client_ids: np.ndarray
+    start_balance: np.ndarray
+    annual_rate: np.ndarray
+    contribution: np.ndarray  # net of fees, per contribution period
+    periods_per_year: np.ndarray
+    target: np.ndarray
+    goal_months: np.ndarray  # months from today until the target is reached, -1 if not within the horizon
+    yearly_balances: np.ndarray  # shape (clients, years + 1), balance at each anniversary
+    today: date
+
+    def goal_date(self, index):
+        months = int(self.goal_months[index])
+        return None if months < 0 else self.today + relativedelta(months=months)
+
+    def rows(self):
+        """One dict per client, in the order the clients were loaded."""
+        for index, client_id in enumerate(self.client_ids.tolist()):
+            yield {
+                'client_id': client_id,
+                'start_balance': self.start_balance[index],
+                'annual_rate': self.annual_rate[index],
+                'contribution': self.contribution[index],
+                'periods_per_year': int(self.periods_per_year[index]),
+                'target': self.target[index],
+                'goal_date': self.goal_date(index),
+                'yearly_balances': self.yearly_balances[index],
+            }
+
+
+def load_inputs(clients, as_of):
+    """Pull every input the projection needs with a few grouped queries, independent of book size."""
+    rows = list(clients.order_by('pk').values_list(
+        'id', 'target_amount', 'expected_contribution', 'contribution_frequency', 'currency',
+    ))
+    client_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    target = np.array([row[1] for row in rows], dtype=np.float64)
+    expected = np.array([row[2] for row in rows], dtype=np.float64)
+    periods = np.array([PERIODS_PER_YEAR.get(row[3], 0) for row in rows], dtype=np.int64)
+
+    available = dict(ClientBalance.objects.filter(client__in=clients).values_list('client_id', 'available'))
+    portfolios = {
+        row['client_id']: row
+        for row in Investment.objects.filter(client__in=clients, maturity_date__gte=as_of)
+        .with_current_value(as_of)
+        .values('client_id')
+        .annotate(
+            value=Sum('current_value'),
+            invested=Sum('investment_amount'),
+            weighted=Sum(F('investment_amount') * F('expected_annual_growth_rate_percentage')),
+        )
+    }
+    # Matured investments stop growing but their value still counts towards the goal
+    matured = dict(
+        Investment.objects.filter(client__in=clients, maturity_date__lt=as_of)
+        .with_current_value(as_of)
+        .values('client_id')
+        .annotate(value=Sum('current_value'))
+        .values_list('client_id', 'value')
+    )
+
+    start_balance = np.zeros(len(rows))
+    annual_rate = np.zeros(len(rows))
+    for index, client_id in enumerate(client_ids.tolist()):
+        portfolio = portfolios.get(client_id)
+        start_balance[index] = float(available.get(client_id) or 0) + float(matured.get(client_id) or 0)
+        if portfolio:
+            start_balance[index] += float(portfolio['value'] or 0)
+            if portfolio['invested']:
+                annual_rate[index] = float(portfolio['weighted']) / float(portfolio['invested'])
+
+    # Payment method is not known ahead of time, so use the schedule's any-method band
+    schedules = fee_schedule.snapshot()
+    fee_rates = np.array([float(band_rate(schedules, row[4], '', as_of, row[2])) for row in rows], dtype=np.float64)
+    net_contribution = expected * (1 - fee_rates / 100)
+    return client_ids, start_balance, annual_rate, net_contribution, periods, target
+
+
+def project_balances(start_balance, annual_rate, contribution, periods_per_year, target, horizon_months=DEFAULT_HORIZON_MONTHS):
+    """
+    Step every client forward one month at a time as whole arrays: grow the balance
+    at the monthly equivalent of its weighted annual rate, then add the net
+    contribution in months that fall on the client's schedule.
+    Returns (goal_months, yearly_balances).
+    """
+    monthly_growth = np.power(1 + annual_rate / 100, 1 / 12)
+    # Months between contributions; 0 means no further contributions (once-off)
+    interval = np.where(periods_per_year > 0, 12 // np.maximum(periods_per_year, 1), 0)
+
+    balance = start_balance.astype(np.float64).copy()
+    goal_months = np.where(balance >= target, 0, -1)
+    yearly = np.empty((len(balance), horizon_months // 12 + 1))
+    yearly[:, 0] = balance
+
+    for month in range(1, horizon_months + 1):
+        balance *= monthly_growth
+        due = (interval > 0) & (month % np.maximum(interval, 1) == 0)
+        balance += np.where(due, contribution, 0.0)
+        reached = (goal_months < 0) & (balance >= target)
+        goal_months[reached] = month
+        if month % 12 == 0:
+            yearly[:, month // 12] = balance
+    return goal_months, yearly
+
+
+def project_clients(clients=None, as_of=None, horizon_months=DEFAULT_HORIZON_MONTHS):
+    as_of = as_of or date.today()
+    if clients is None:
+        clients = Client.objects.all()
+    client_ids, start_balance, annual_rate, contribution, periods, target = load_inputs(clients, as_of)
+    goal_months, yearly = project_balances(start_balance, annual_rate, contribution, periods, target, horizon_months)
+    return ProjectionResult(
+        client_ids=client_ids,
+        start_balance=start_balance,
+        annual_rate=annual_rate,
+        contribution=contribution,
+        periods_per_year=periods,
+        target=target,
+        goal_months=goal_months,
+        yearly_balances=yearly,
+        today=as_of,
+    )
@@ -0,0 +1,65 @@
+import re
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Client, Contribution, Investment
+from .revaluation import pending_revaluation
+
+
+def core_queries(today=None):
+    """(name, queryset) pairs for the filters the views, reports and jobs lean on."""
+    today = today or date.today()
+    client_id = Client.objects.order_by('pk').values_list('pk', flat=True).first() or 0
+    manager_id = Client.objects.order_by('pk').values_list('manager_id', flat=True).first() or 0
+    since = timezone.make_aware(datetime.combine(today - timedelta(days=7), time.min))
+
+    return [
+        ('client contributions by date', Contribution.objects.filter(client_id=client_id).order_by('date')),
+        ('client investments by start date', Investment.objects.filter(client_id=client_id).order_by('start_date')),
+        ('active investments maturing this month', Investment.objects.filter(status='active', maturity_date__range=(today, today + timedelta(days=31)))),
+        ('completed investments by maturity', Investment.objects.filter(status='completed', maturity_date__lt=today)),
+        ('active investments pending revaluation', pending_revaluation(today).filter(status='active')),
+        ('manager clients, newest first', Client.objects.filter(manager_id=manager_id).order_by('-created_at')[:50]),
+        ('manager contributions, newest first', Contribution.objects.filter(manager_id=manager_id).order_by('-created_at')[:50]),
+        ('manager investments, newest first', Investment.objects.filter(manager_id=manager_id).order_by('-created_at')[:50]),
+        ('contributions created since', Contribution.objects.filter(created_at__gte=since).only('id')),
+        ('investments revalued since', Investment.objects.filter(last_valued_at__gte=since).only('id')),
+    ]
+
+
+def table_sizes():
+    """Approximate row counts: planner statistics on PostgreSQL, COUNT(*) elsewhere."""
+    tables = {model._meta.db_table: model for model in (Client, Contribution, Investment)}
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s)", [list(tables)])
+            return dict(cursor.fetchall())
+    return {table: model.objects.count() for table, model in tables.items()}
+
+
+def sequential_scans(plan):
+    """Tables read with a full scan according to an EXPLAIN plan."""
+    if connection.vendor == 'postgresql':
+        return set(re.findall(r'Seq Scan on (\w+)', plan))
+    if connection.vendor == 'sqlite':
+        # SEARCH is an index lookup; SCAN walks the whole table (or a whole index)
+        return set(re.findall(r'\bSCAN (\w+)', plan))
+    return set()  # other backends' plans are not inspected
+
+
+def check_plans(min_rows=10000, today=None):
+    """
+    EXPLAIN every core query and return (name, table, rows, plan) for each full
+    scan of a table holding at least `min_rows` rows. Small tables are ignored:
+    the planner rightly prefers a sequential scan there.
+    """
+    sizes = table_sizes()
+    findings = []
+    for name, queryset in core_queries(today):
+        plan = queryset.explain()
+        for table in sequential_scans(plan):
+            if sizes.get(table, 0) >= min_rows:
+                findings.append((name, table, sizes[table], plan))
+    return findings
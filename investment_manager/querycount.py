@@ -0,0 +1,90 @@
+import logging
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """execute_wrapper hook that counts statements without needing DEBUG=True."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryCountMiddleware:
+    """
+    Count the queries each request runs on any database, expose them in an
+    X-Query-Count header and log a warning when a view goes over
+    QUERY_COUNT_WARNING_THRESHOLD.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_COUNT_WARNING_THRESHOLD', 50)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        return self.report(request, response, counter)
+
+    async def __acall__(self, request):
+        # The async ORM runs queries on the request's thread-sensitive worker thread,
+        # so the wrapper has to be installed on that thread's connection
+        counter = QueryCounter()
+        await sync_to_async(self._install)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self._uninstall)(counter)
+        return self.report(request, response, counter)
+
+    @staticmethod
+    def _install(counter):
+        for alias in connections:
+            connections[alias].execute_wrappers.append(counter)
+
+    @staticmethod
+    def _uninstall(counter):
+        for alias in connections:
+            connections[alias].execute_wrappers.remove(counter)
+
+    def report(self, request, response, counter):
+        response['X-Query-Count'] = str(counter.count)
+        if counter.count > self.threshold:
+            logger.warning("%s %s ran %d queries (threshold %d)", request.method, request.path, counter.count, self.threshold)
+        return response
+
+
+@contextmanager
+def assert_max_queries(budget, using='default'):
+    """
+    Fail if the block runs more than `budget` queries. Unlike assertNumQueries this
+    is an upper bound, so tests can pin a view to a fixed budget that must not grow
+    with the number of rows rendered.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context.captured_queries)
+    if executed > budget:
+        statements = '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, start=1))
+        raise AssertionError(f"{executed} queries executed, budget was {budget}:\n{statements}")
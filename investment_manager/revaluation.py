@@ -0,0 +1,156 @@
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import valuation
+from .models import Investment
+from .pools import process_pool
+
+
+UPDATE_FIELDS = ['maturity_date', 'expected_current_value', 'status', 'last_valued_at', 'updated_at']
+REVALUATION_FIELDS = (
+    'id',
+    'start_date',
+    'maturity_date',
+    'investment_duration',
+    'investment_amount',
+    'expected_annual_growth_rate_percentage',
+)
+
+
+@dataclass
+class RevaluationResult:
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return f"{self.rows:,} investments revalued in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+
+
+def iter_investment_chunks(queryset, chunk_size):
+    """Yield lists of investments ordered by pk, one keyset page at a time."""
+    queryset = queryset.only(*REVALUATION_FIELDS).order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def revalue_chunk(investments, today=None, exact=True):
+    """
+    Compute expected_current_value and status for a chunk of investments in one
+    batched pass of the valuation kernel, with the same rounding as Investment.save.
+    """
+    today = today or date.today()
+    valued_at = timezone.now()
+    for investment in investments:
+        if not investment.maturity_date:
+            investment.maturity_date = investment.start_date + relativedelta(months=investment.investment_duration)
+
+    days_elapsed, matured = valuation.elapsed_days_batch(
+        valuation.ordinals([i.start_date for i in investments]),
+        valuation.ordinals([i.maturity_date for i in investments]),
+        today,
+    )
+
+    values = valuation.value_batch(
+        (i.investment_amount for i in investments),
+        (i.expected_annual_growth_rate_percentage for i in investments),
+        days_elapsed,
+        exact=exact,
+    )
+    for investment, value, is_matured in zip(investments, values, matured.tolist()):
+        investment.expected_current_value = value
+        investment.status = 'completed' if is_matured else 'active'
+        investment.last_valued_at = investment.updated_at = valued_at
+    return investments
+
+
+def revalue_investments(queryset=None, chunk_size=2000, batch_size=500, today=None):
+    """Revalue investments in chunks and write them back with batched bulk_update."""
+    if queryset is None:
+        queryset = Investment.objects.all()
+
+    result = RevaluationResult()
+    started = time.perf_counter()
+    for chunk in iter_investment_chunks(queryset, chunk_size):
+        revalue_chunk(chunk, today=today)
+        Investment.objects.bulk_update(chunk, UPDATE_FIELDS, batch_size=batch_size)
+        result.rows += len(chunk)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def pending_revaluation(today=None):
+    """
+    Investments whose stored value is out of date. A completed investment valued
+    after its maturity date holds its final value and is skipped for good, and
+    anything already valued today is current, so the nightly set tracks the
+    active book rather than all history.
+    """
+    today = today or date.today()
+    final = Q(status='completed', last_valued_at__date__gt=F('maturity_date'))
+    current = Q(last_valued_at__gte=_start_of_day(today))
+    return Investment.objects.exclude(final).exclude(current)
+
+
+def revaluation_stats(today=None):
+    today = today or date.today()
+    investments = Investment.objects.all()
+    return {
+        'total': investments.count(),
+        'active': investments.filter(status='active').count(),
+        'final': investments.filter(status='completed', last_valued_at__date__gt=F('maturity_date')).count(),
+        'valued_today': investments.filter(last_valued_at__gte=_start_of_day(today)).count(),
+        'pending': pending_revaluation(today).count(),
+    }
+
+
+def partition_pending(today=None, partition_size=20000):
+    """Split the pending set into contiguous (first_pk, last_pk) ranges for the worker pool."""
+    ids = list(pending_revaluation(today).order_by('pk').values_list('pk', flat=True))
+    return [(ids[i], ids[min(i + partition_size, len(ids)) - 1]) for i in range(0, len(ids), partition_size)]
+
+
+def _revalue_partition(bounds, today_ordinal, chunk_size, batch_size):
+    today = date.fromordinal(today_ordinal)
+    first_pk, last_pk = bounds
+    queryset = pending_revaluation(today).filter(pk__gte=first_pk, pk__lte=last_pk)
+    return revalue_investments(queryset, chunk_size=chunk_size, batch_size=batch_size, today=today).rows
+
+
+def revalue_pending(workers=1, partition_size=20000, chunk_size=2000, batch_size=500, today=None):
+    """Revalue only the investments that need it, spread over a process pool when workers > 1."""
+    today = today or date.today()
+    result = RevaluationResult()
+    started = time.perf_counter()
+
+    partitions = partition_pending(today, partition_size)
+    if workers > 1 and len(partitions) > 1:
+        with process_pool(workers) as pool:
+            futures = [
+                pool.submit(_revalue_partition, bounds, today.toordinal(), chunk_size, batch_size)
+                for bounds in partitions
+            ]
+            result.rows = sum(future.result() for future in futures)
+    else:
+        for bounds in partitions:
+            result.rows += _revalue_partition(bounds, today.toordinal(), chunk_size, batch_size)
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,160 @@
+"""
+Read-replica routing.
+
+Reads go to the database named by settings.REPLICA_DATABASE_ALIAS only inside
+reads_from_replica(), which marks read-only views, exports and analytics, and
+only while nothing needs the primary's latest state:
+
+- the current request has already written,
+- a transaction is open on the primary,
+- on_primary() is active, as around the balance checks in Investment.clean(),
+- the browser wrote within the last REPLICA_PIN_SECONDS (ReplicaPinMiddleware),
+  so a user sees their own writes despite replication lag.
+
+Writes always go to the primary. With no replica alias set every query goes to
+'default', as before.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = 'replica_pin'
+DEFAULT_PIN_SECONDS = 10
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_primary_only = ContextVar('primary_only', default=False)
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """Routing state for one request, shared with any threads its async views hand work to."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+@contextmanager
+def _flag(var):
+    token = var.set(True)
+    try:
+        yield
+    finally:
+        var.reset(token)
+
+
+def _flagging(var, func):
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _flag(var):
+                return await func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _flag(var):
+                return func(*args, **kwargs)
+    return wrapper
+
+
+def reads_from_replica(func=None):
+    """Let reads go to the replica: as a decorator on a (sync or async) view, or as a context manager."""
+    return _flag(_replica_reads) if func is None else _flagging(_replica_reads, func)
+
+
+def on_primary(func=None):
+    """Keep reads on the primary, even inside reads_from_replica(). Decorator or context manager."""
+    return _flag(_primary_only) if func is None else _flagging(_primary_only, func)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if not alias or not _replica_reads.get() or _primary_only.get():
+            return None
+        state = _request_state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the primary's rows, so objects from either may be related
+        return True
+
+
+class ReplicaPinMiddleware:
+    """
+    Track whether a request writes and, if it did, pin that browser's reads to the
+    primary for REPLICA_PIN_SECONDS with a cookie holding the pin's expiry.
+    A cookie needs no shared state between processes, and a forged one only
+    sends that browser's reads to the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_alias():
+            return self.get_response(request)
+        state = RequestState(pinned=self.pinned(request))
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        if not replica_alias():
+            return await self.get_response(request)
+        state = RequestState(pinned=self.pinned(request))
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(response, state)
+
+    @staticmethod
+    def pinned(request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    @staticmethod
+    def pin(response, state):
+        if state.wrote:
+            seconds = pin_seconds()
+            response.set_cookie(PIN_COOKIE, f'{time.time() + seconds:.0f}', max_age=seconds, httponly=True, samesite='Lax')
+        return response
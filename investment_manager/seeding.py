@@ -0,0 +1,176 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_DOWN
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from .models import CENT, Client, ClientBalance, Contribution, Investment, LEDGER_FIELDS, LedgerEntry
+from .revaluation import revalue_chunk
+
+
+FIRST_NAMES = ('Chanda', 'Mwila', 'Bwalya', 'Mutale', 'Natasha', 'Kondwani', 'Thandiwe', 'Lungowe', 'Musonda', 'Chipo', 'Tiwonge', 'Mapalo')
+LAST_NAMES = ('Banda', 'Phiri', 'Mwale', 'Tembo', 'Zulu', 'Lungu', 'Mulenga', 'Sakala', 'Ngoma', 'Chola', 'Mhango', 'Daka')
+CITIES = ('Lusaka', 'Ndola', 'Kitwe', 'Livingstone', 'Kabwe', 'Chipata', 'Solwezi', 'Kasama')
+
+
+def _choices(model, name):
+    return [value for value, _ in model._meta.get_field(name).choices]
+
+
+def seed_managers(count, rng=random):
+    managers = []
+    for index in range(count):
+        manager, created = User.objects.get_or_create(
+            username=f'seed_manager_{index}',
+            defaults={'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES)},
+        )
+        if created:
+            manager.set_unusable_password()
+            manager.save()
+        managers.append(manager)
+    return managers
+
+
+def _random_date(rng, start, end):
+    return start + timedelta(days=rng.randint(0, max((end - start).days, 0)))
+
+
+def _create_contributions(batch, batch_size):
+    created = Contribution.objects.bulk_create(batch, batch_size=batch_size)
+    LedgerEntry.append([
+        entry
+        for contribution in created
+        for entry in LedgerEntry.for_contribution(
+            contribution.pk, contribution.client_id, contribution.date,
+            contribution.contribution_amount, contribution.investable_amount,
+        )
+    ], batch_size=batch_size)
+
+
+def _create_investments(batch, today, batch_size):
+    created = Investment.objects.bulk_create(revalue_chunk(batch, today), batch_size=batch_size)
+    LedgerEntry.append([
+        entry
+        for investment in created
+        for entry in investment.ledger_entries({field: getattr(investment, field) for field in LEDGER_FIELDS})
+    ], batch_size=batch_size)
+    return len(created)
+
+
+def seed(clients=1000, contributions=20000, investments=5000, managers=5, batch_size=5000, seed_value=None, log=None):
+    """
+    Insert a synthetic book: clients with valid, unique NRCs and emails; contributions
+    with fees derived like Contribution.save; investments that never exceed a
+    client's investable funds, valued like Investment.save. Balances are written
+    alongside so the ledger matches. Returns the counts inserted.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed_value)
+    today = date.today()
+
+    staff = seed_managers(managers, rng)
+    offset = (Client.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+    if offset + clients > 1000000:
+        raise ValueError("NRC serials only allow 999,999 seeded clients")
+
+    risk_levels = _choices(Client, 'risk_level')
+    frequencies = [value for value in _choices(Client, 'contribution_frequency') if value != 'once_off']
+    goals = _choices(Client, 'financial_goal')
+    payment_methods = _choices(Contribution, 'payment_method')
+    investment_types = _choices(Investment, 'investment_type')
+
+    with transaction.atomic():
+        new_clients = []
+        for index in range(offset, offset + clients):
+            lump_sum = rng.random() < 0.2
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            new_clients.append(Client(
+                full_name=f"{first} {last}",
+                email=f"{first.lower()}.{last.lower()}.{index}@example.com",
+                phone=f"09{rng.randint(60000000, 79999999)}",
+                city=rng.choice(CITIES),
+                date_of_birth=_random_date(rng, date(1950, 1, 1), date(2004, 12, 31)),
+                client_nrc=f"{index:06d}/{rng.randint(10, 99)}/{rng.randint(1, 3)}",
+                date_of_joining=_random_date(rng, date(2015, 1, 1), today - timedelta(days=30)),
+                risk_level=rng.choice(risk_levels),
+                contribution_type='lump_sum' if lump_sum else 'regular_contribution',
+                contribution_frequency='once_off' if lump_sum else rng.choice(frequencies),
+                financial_goal=rng.choice(goals),
+                target_amount=Decimal(rng.randrange(10000, 2000000, 500)),
+                expected_contribution=Decimal(rng.randrange(100, 20000, 50)),
+                currency='usd' if rng.random() < 0.25 else 'zmw',
+                manager=rng.choice(staff),
+            ))
+        new_clients = Client.objects.bulk_create(new_clients, batch_size=batch_size)
+        log(f"{len(new_clients):,} clients")
+
+        # Running totals per client, in Decimal so the balances match the rows to the cent
+        contributed = [Decimal('0.00')] * len(new_clients)
+        investable = [Decimal('0.00')] * len(new_clients)
+        invested = [Decimal('0.00')] * len(new_clients)
+
+        batch = []
+        for _ in range(contributions):
+            position = rng.randrange(len(new_clients))
+            client = new_clients[position]
+            contribution = Contribution(
+                client=client,
+                manager=client.manager,
+                date=_random_date(rng, client.date_of_joining, today),
+                contribution_amount=Decimal(rng.randrange(100, 50000)) + Decimal(rng.randrange(100)) / 100,
+                payment_method=rng.choice(payment_methods),
+                fee_rate_percentage=Decimal(rng.choice(('1.500', '2.000', '2.500', '3.000'))),
+                fee_rate_overridden=True,  # not from the schedule, so recompute_fees leaves it
+            )
+            contribution.fees, contribution.investable_amount = Contribution.compute_fees(
+                contribution.contribution_amount, contribution.fee_rate_percentage
+            )
+            contributed[position] += contribution.contribution_amount
+            investable[position] += contribution.investable_amount
+            batch.append(contribution)
+            if len(batch) >= batch_size:
+                _create_contributions(batch, batch_size)
+                batch = []
+        _create_contributions(batch, batch_size)
+        log(f"{contributions:,} contributions")
+
+        batch = []
+        created_investments = 0
+        for _ in range(investments):
+            position = rng.randrange(len(new_clients))
+            room = investable[position] - invested[position]
+            if room < 100:
+                continue
+            client = new_clients[position]
+            amount = (Decimal(rng.uniform(0.1, 0.8)) * room).quantize(CENT, rounding=ROUND_DOWN)
+            batch.append(Investment(
+                client=client,
+                manager=client.manager,
+                investment_duration=rng.choice((3, 6, 12, 24, 36, 60)),
+                start_date=_random_date(rng, client.date_of_joining, today),
+                investment_type=rng.choice(investment_types),
+                investment_amount=amount,
+                expected_annual_growth_rate_percentage=Decimal(rng.randrange(3000, 28000)) / 1000,
+            ))
+            invested[position] += amount
+            if len(batch) >= batch_size:
+                created_investments += _create_investments(batch, today, batch_size)
+                batch = []
+        if batch:
+            created_investments += _create_investments(batch, today, batch_size)
+        log(f"{created_investments:,} investments")
+
+        ClientBalance.objects.bulk_create([
+            ClientBalance(
+                client=client,
+                total_contributed=contributed[position],
+                total_investable=investable[position],
+                total_invested=invested[position],
+                available=investable[position] - invested[position],
+            )
+            for position, client in enumerate(new_clients)
+        ], batch_size=batch_size, ignore_conflicts=True)
+
+    return {'clients': len(new_clients), 'contributions': contributions, 'investments': created_investments}
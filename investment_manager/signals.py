@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import fees, fragments, fx
+from .models import Client, Contribution, FeeSchedule, FxRate, Investment
+from .summaries import summary_cache
+
+
+@receiver(post_save, sender=Contribution)
+@receiver(post_delete, sender=Contribution)
+@receiver(post_save, sender=Investment)
+@receiver(post_delete, sender=Investment)
+def invalidate_client_summary(sender, instance, **kwargs):
+    # A row moved to another client changes the totals of the client it left too
+    client_ids = {instance.client_id, getattr(instance, '_previous_client_id', None)} - {None}
+
+    def invalidate():
+        for client_id in client_ids:
+            summary_cache.invalidate(client_id)
+
+    invalidate()
+    # Again once the write is visible, in case a reader re-cached the old totals in between
+    transaction.on_commit(invalidate)
+
+
+FRAGMENT_DATASETS = {Client: 'clients', Contribution: 'contributions', Investment: 'investments'}
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Contribution)
+@receiver(post_delete, sender=Contribution)
+@receiver(post_save, sender=Investment)
+@receiver(post_delete, sender=Investment)
+def bump_fragment_generation(sender, instance, **kwargs):
+    dataset = FRAGMENT_DATASETS[sender]
+    fragments.bump(dataset)
+    # Again after commit: a reader between the two could have cached a render of the uncommitted state
+    transaction.on_commit(lambda: fragments.bump(dataset))
+
+
+@receiver(post_save, sender=FxRate)
+@receiver(post_delete, sender=FxRate)
+def reload_fx_rates(sender, instance, **kwargs):
+    fx.rates_changed()
+    transaction.on_commit(fx.rates_changed)
+
+
+@receiver(post_save, sender=FeeSchedule)
+@receiver(post_delete, sender=FeeSchedule)
+def reload_fee_schedule(sender, instance, **kwargs):
+    fees.schedule_changed()
+    transaction.on_commit(fees.schedule_changed)
@@ -0,0 +1,252 @@
+"""
+Monte Carlo estimate of each client's chance of reaching target_amount.
+
+Every investment type is a market factor with its own yearly volatility, scaled
+for the client by RISK_VOLATILITY[risk_level]. A client's portfolio keeps its
+current mix of types (contributions are invested pro rata) and each type grows
+at the client's own expected rate for it, so a month's log return for every
+client on every path is drift + loadings @ shocks: one matrix product per month
+across the whole partition. The schedule of net contributions and the starting
+balance are the deterministic projection's (projections.load_inputs).
+
+Every partition draws the same scenarios from `seed`, so a client's result does
+not depend on which clients it was simulated with. Results are cached per client
+under a key holding the client's last ledger entry id, which any change to their
+contributions or investments moves, including the bulk paths that send no signals.
+"""
+import hashlib
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import repeat
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Max, Sum
+
+from . import fees, fragments
+from .models import Client, Investment, LedgerEntry
+from .pools import process_pool
+from .projections import load_inputs
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = 1000
+DEFAULT_HORIZON_MONTHS = 120
+DEFAULT_SEED = 24
+PARTITION_SIZE = 500
+# Yearly volatility of each investment type's returns, in percent, for a medium-risk client
+TYPE_VOLATILITY = {
+    'fd': 0.5,
+    'bond': 4.0,
+    't_bill': 1.0,
+    'abc_bf': 9.0,
+    'abc_ef': 18.0,
+    'abc_mmf': 1.0,
+    'abc_usdf': 6.0,
+    'abc_usd_hyf': 10.0,
+    'abc_zmw_hyf': 12.0,
+    'mpile_bf': 9.0,
+    'mpile_gf': 7.0,
+    'mpile_hydf': 10.0,
+    'mpile_lef': 20.0,
+    'mpile_mmf': 1.0,
+    'mpile_osef': 16.0,
+    'mpile_pf': 12.0,
+}
+DEFAULT_TYPE_VOLATILITY = 10.0
+RISK_VOLATILITY = {'low': 0.6, 'medium': 1.0, 'high': 1.5}
+INVESTMENT_TYPES = [value for value, _ in Investment._meta.get_field('investment_type').choices]
+QUANTILES = (10, 50, 90)
+CACHE_VERSION = 1  # bump when the model changes so stale results are not served
+
+
+@dataclass
+class SimulationInputs:
+    client_ids: np.ndarray
+    start_balance: np.ndarray
+    contribution: np.ndarray  # net of fees, per contribution period
+    periods_per_year: np.ndarray
+    target: np.ndarray
+    drift: np.ndarray  # monthly log-return drift per client
+    loadings: np.ndarray  # (clients, types) monthly volatility of each type's shock
+
+    def partition(self, start, stop):
+        return SimulationInputs(*(getattr(self, name)[start:stop] for name in self.__dataclass_fields__))
+
+    def __len__(self):
+        return len(self.client_ids)
+
+
+def load_simulation_inputs(clients, as_of):
+    """The projection inputs plus each client's mix of investment types, with a few grouped queries."""
+    client_ids, start_balance, _, contribution, periods, target = load_inputs(clients, as_of)
+    positions = {client_id: index for index, client_id in enumerate(client_ids.tolist())}
+    types = {investment_type: index for index, investment_type in enumerate(INVESTMENT_TYPES)}
+
+    values = np.zeros((len(client_ids), len(types)))
+    rates = np.zeros((len(client_ids), len(types)))
+    holdings = (
+        Investment.objects.filter(client__in=clients, maturity_date__gte=as_of)
+        .with_current_value(as_of)
+        .values('client_id', 'investment_type')
+        .annotate(
+            value=Sum('current_value'),
+            invested=Sum('investment_amount'),
+            weighted=Sum(F('investment_amount') * F('expected_annual_growth_rate_percentage')),
+        )
+    )
+    for row in holdings:
+        if row['investment_type'] not in types or not row['invested']:
+            continue
+        index, column = positions[row['client_id']], types[row['investment_type']]
+        values[index, column] = float(row['value'] or 0)
+        rates[index, column] = float(row['weighted']) / float(row['invested'])
+
+    totals = values.sum(axis=1, keepdims=True)
+    weights = np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+    risk = dict(clients.values_list('id', 'risk_level'))
+    risk_scale = np.array([RISK_VOLATILITY.get(risk.get(client_id), 1.0) for client_id in client_ids.tolist()])
+    volatility = np.array([TYPE_VOLATILITY.get(name, DEFAULT_TYPE_VOLATILITY) for name in INVESTMENT_TYPES]) / 100
+
+    loadings = weights * volatility[np.newaxis, :] * risk_scale[:, np.newaxis] / np.sqrt(12)
+    # Mean growth matches the deterministic projection; the variance term keeps it from drifting upwards
+    drift = (weights * np.log1p(rates / 100)).sum(axis=1) / 12 - 0.5 * (loadings ** 2).sum(axis=1)
+    return SimulationInputs(client_ids, start_balance, contribution, periods, target, drift, loadings)
+
+
+def simulate(inputs, paths=DEFAULT_PATHS, horizon_months=DEFAULT_HORIZON_MONTHS, seed=DEFAULT_SEED):
+    """
+    Run `paths` scenarios for every client in `inputs` as (clients, paths) arrays.
+    Returns (probability of reaching the target within the horizon, quantiles of
+    the final balance with shape (clients, len(QUANTILES))).
+    """
+    rng = np.random.default_rng(seed)
+    interval = np.where(inputs.periods_per_year > 0, 12 // np.maximum(inputs.periods_per_year, 1), 0)
+    target = inputs.target[:, np.newaxis]
+
+    balance = np.repeat(inputs.start_balance.astype(np.float64)[:, np.newaxis], paths, axis=1)
+    reached = balance >= target
+    for month in range(1, horizon_months + 1):
+        shocks = rng.standard_normal((inputs.loadings.shape[1], paths))
+        balance *= np.exp(inputs.drift[:, np.newaxis] + inputs.loadings @ shocks)
+        due = (interval > 0) & (month % np.maximum(interval, 1) == 0)
+        balance += np.where(due, inputs.contribution, 0.0)[:, np.newaxis]
+        reached |= balance >= target
+    return reached.mean(axis=1), np.percentile(balance, QUANTILES, axis=1).T
+
+
+@dataclass
+class SimulationResult:
+    as_of: date
+    paths: int
+    horizon_months: int
+    clients: dict = field(default_factory=dict)  # client id -> result row
+    simulated: int = 0
+    cached: int = 0
+    seconds: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{len(self.clients):,} clients, {self.simulated:,} simulated and {self.cached:,} from cache, "
+            f"{self.paths:,} paths over {self.horizon_months} months in {self.seconds:.2f}s"
+        )
+
+
+def _cache():
+    return caches[getattr(settings, 'SIMULATION_CACHE_ALIAS', 'default')]
+
+
+def _cache_keys(clients, as_of, paths, horizon_months, seed):
+    """
+    Cache key per client id. Besides the run parameters it holds everything the
+    result depends on: the client's last ledger entry, its latest investment
+    write (a type or rate edit moves no money), the fields the model reads and
+    the fee schedule's write counter.
+    """
+    versions = dict(
+        LedgerEntry.objects.filter(client__in=clients).values('client_id').annotate(last=Max('id')).values_list('client_id', 'last')
+    )
+    edited = dict(
+        Investment.objects.filter(client__in=clients).values('client_id').annotate(last=Max('updated_at')).values_list('client_id', 'last')
+    )
+    schedule = fragments.generation(fees.GENERATION_KEY)
+    keys = {}
+    fields = ('id', 'risk_level', 'target_amount', 'expected_contribution', 'contribution_frequency', 'currency')
+    for client_id, *values in clients.values_list(*fields):
+        parts = (CACHE_VERSION, as_of, paths, horizon_months, seed, schedule, versions.get(client_id, 0), edited.get(client_id), *values)
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        keys[client_id] = f'goal-simulation:{client_id}:{digest}'
+    return keys
+
+
+def _cache_call(method, *args):
+    try:
+        return getattr(_cache(), method)(*args)
+    except Exception:
+        logger.warning("Simulation cache unavailable on %s, simulating without it", method, exc_info=True)
+        return {} if method == 'get_many' else None
+
+
+def simulate_goals(clients=None, as_of=None, paths=DEFAULT_PATHS, horizon_months=DEFAULT_HORIZON_MONTHS,
+                   seed=DEFAULT_SEED, workers=1, partition_size=PARTITION_SIZE):
+    """
+    Goal-attainment probability and final-balance quantiles for every client in
+    `clients` (default all). Cached results are reused; the rest are simulated in
+    partitions of partition_size clients, spread over a process pool when workers > 1.
+    """
+    started = time.perf_counter()
+    as_of = as_of or date.today()
+    if clients is None:
+        clients = Client.objects.all()
+    result = SimulationResult(as_of=as_of, paths=paths, horizon_months=horizon_months)
+
+    keys = _cache_keys(clients, as_of, paths, horizon_months, seed)
+    cached = _cache_call('get_many', list(keys.values())) or {}
+    for client_id, key in keys.items():
+        if key in cached:
+            result.clients[client_id] = cached[key]
+    result.cached = len(result.clients)
+
+    missing = [client_id for client_id in keys if client_id not in result.clients]
+    if missing:
+        inputs = load_simulation_inputs(clients if not result.cached else Client.objects.filter(pk__in=missing), as_of)
+        partitions = [inputs.partition(start, start + partition_size) for start in range(0, len(inputs), partition_size)]
+        if workers > 1 and len(partitions) > 1:
+            with process_pool(workers) as pool:
+                outcomes = list(pool.map(simulate, partitions, repeat(paths), repeat(horizon_months), repeat(seed)))
+        else:
+            outcomes = [simulate(partition, paths, horizon_months, seed) for partition in partitions]
+
+        fresh = {}
+        for partition, (probability, quantiles) in zip(partitions, outcomes):
+            for index, client_id in enumerate(partition.client_ids.tolist()):
+                row = {
+                    'probability': float(probability[index]),
+                    **{f'p{quantile}': float(value) for quantile, value in zip(QUANTILES, quantiles[index])},
+                    'target': float(partition.target[index]),
+                }
+                result.clients[client_id] = row
+                fresh[keys[client_id]] = row
+        result.simulated = len(fresh)
+        # Keys hold the valuation date, so nothing is worth keeping past midnight
+        expires = datetime.combine(as_of + timedelta(days=1), dt_time.min) - datetime.now()
+        _cache_call('set_many', fresh, max(int(expires.total_seconds()), 1))
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def attainment_by(result, *dimensions):
+    """Mean goal probability and client count per combination of Client fields, e.g. ('risk_level', 'financial_goal')."""
+    groups = defaultdict(list)
+    for row in Client.objects.filter(pk__in=list(result.clients)).values('id', *dimensions):
+        groups[tuple(row[name] for name in dimensions)].append(result.clients[row['id']]['probability'])
+    return [
+        {**dict(zip(dimensions, key)), 'clients': len(values), 'probability': sum(values) / len(values)}
+        for key, values in sorted(groups.items())
+    ]
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Sum
+
+from . import fx
+from .models import Contribution, Investment
+from .routers import on_primary
+
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+REPORTED_AMOUNTS = ('total_contributed', 'total_fees', 'total_invested', 'available', 'current_value')
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU used when the shared cache backend is unavailable."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value, timeout=None):
+        # timeout is accepted for API parity with Django's cache; bounded size does the evicting
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+CONTRIBUTION_TOTALS = {
+    'count': Count('id'),
+    'contributed': Sum('contribution_amount'),
+    'fees': Sum('fees'),
+    'investable': Sum('investable_amount'),
+}
+INVESTMENT_TOTALS = {
+    'count': Count('id'),
+    'invested': Sum('investment_amount'),
+    'current_value': Sum('current_value'),
+}
+
+
+@on_primary
+def compute_summary(client_id, as_of=None):
+    """
+    Totals for one client's page: one aggregate over contributions, one over investments.
+    Read from the primary: the result is cached until the next write, so a lagging
+    replica's totals would outlive the invalidation.
+    """
+    as_of = as_of or date.today()
+    contributions = Contribution.objects.filter(client_id=client_id).aggregate(**CONTRIBUTION_TOTALS)
+    investments = Investment.objects.filter(client_id=client_id).with_current_value(as_of).aggregate(**INVESTMENT_TOTALS)
+    return _summary(contributions, investments)
+
+
+@on_primary
+async def acompute_summary(client_id, as_of=None):
+    """
+    compute_summary for async views. gather only interleaves the awaits: the two
+    aggregates still run one after another on the request's database thread.
+    """
+    as_of = as_of or date.today()
+    contributions, investments = await asyncio.gather(
+        Contribution.objects.filter(client_id=client_id).aaggregate(**CONTRIBUTION_TOTALS),
+        Investment.objects.filter(client_id=client_id).with_current_value(as_of).aaggregate(**INVESTMENT_TOTALS),
+    )
+    return _summary(contributions, investments)
+
+
+def _summary(contributions, investments):
+    investable = contributions['investable'] or ZERO
+    invested = investments['invested'] or ZERO
+    return {
+        'contribution_count': contributions['count'],
+        'total_contributed': contributions['contributed'] or ZERO,
+        'total_fees': contributions['fees'] or ZERO,
+        'total_investable': investable,
+        'investment_count': investments['count'],
+        'total_invested': invested,
+        'current_value': investments['current_value'] or ZERO,
+        'available': investable - invested,
+    }
+
+
+def reporting_summary(summary, currency, as_of=None):
+    """
+    A client summary's amounts converted into the reporting currency at the as-of
+    rate, for display beside the client-currency figures: {'currency', 'totals'},
+    with totals None while no rate is loaded, or None for reporting-currency clients.
+    Converted on read from the in-memory rate table, so cached summaries never hold
+    a stale rate.
+    """
+    quote = fx.reporting_currency()
+    if currency == quote:
+        return None
+    amounts = {name: summary[name] for name in REPORTED_AMOUNTS}
+    return {'currency': quote, 'totals': fx.consolidate(amounts, currency, as_of or date.today(), quote)}
+
+
+class ClientSummaryCache:
+    """
+    Per-client summaries stored in Django's cache, with an LRU fallback if the backend
+    errors. Keys carry the valuation date so current_value never outlives the day it
+    was computed for; writes invalidate precisely through signals (see signals.py).
+    """
+
+    key_prefix = 'client-summary'
+
+    def __init__(self, alias='default', fallback_size=1024):
+        self.alias = alias
+        self.fallback = LRUCache(fallback_size)
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'fallbacks': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def key(self, client_id, as_of):
+        return f'{self.key_prefix}:{client_id}:{as_of.isoformat()}'
+
+    def _backend_call(self, method, *args):
+        try:
+            return getattr(caches[self.alias], method)(*args)
+        except Exception:
+            logger.warning("Cache backend '%s' failed on %s, using in-process LRU", self.alias, method, exc_info=True)
+            self._count('fallbacks')
+            return getattr(self.fallback, method)(*args)
+
+    def get(self, client_id, as_of=None):
+        as_of = as_of or date.today()
+        key = self.key(client_id, as_of)
+        summary = self._backend_call('get', key)
+        if summary is not None:
+            self._count('hits')
+            return summary
+
+        self._count('misses')
+        summary = compute_summary(client_id, as_of)
+        # Expire at midnight, when the valuation date (and so the key) rolls over
+        expires = datetime.combine(as_of + timedelta(days=1), time.min) - datetime.now()
+        self._backend_call('set', key, summary, max(int(expires.total_seconds()), 1))
+        return summary
+
+    async def _abackend_call(self, method, *args):
+        try:
+            return await getattr(caches[self.alias], f'a{method}')(*args)
+        except Exception:
+            logger.warning("Cache backend '%s' failed on %s, using in-process LRU", self.alias, method, exc_info=True)
+            self._count('fallbacks')
+            return getattr(self.fallback, method)(*args)
+
+    async def aget(self, client_id, as_of=None):
+        """get() for async views: same keys and expiry, computed with acompute_summary."""
+        as_of = as_of or date.today()
+        key = self.key(client_id, as_of)
+        summary = await self._abackend_call('get', key)
+        if summary is not None:
+            self._count('hits')
+            return summary
+
+        self._count('misses')
+        summary = await acompute_summary(client_id, as_of)
+        expires = datetime.combine(as_of + timedelta(days=1), time.min) - datetime.now()
+        await self._abackend_call('set', key, summary, max(int(expires.total_seconds()), 1))
+        return summary
+
+    def invalidate(self, client_id, as_of=None):
+        key = self.key(client_id, as_of or date.today())
+        self._backend_call('delete', key)
+        self.fallback.delete(key)
+        self._count('invalidations')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['fallback_entries'] = len(self.fallback)
+        return stats
+
+
+summary_cache = ClientSummaryCache(
+    alias=getattr(settings, 'CLIENT_SUMMARY_CACHE_ALIAS', 'default'),
+    fallback_size=getattr(settings, 'CLIENT_SUMMARY_LRU_SIZE', 1024),
+)
@@ -1,3 +1,1484 @@
-from django.test import TestCase
+import csv
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from decimal import Decimal, ROUND_HALF_UP
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from openpyxl import load_workbook
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import async_views, aum, benchmarks, fees, fx, imports, ledger, maturities, portfolios, projections, query_plans, revaluation, search, seeding, simulations, valuation
+from .balances import find_mismatches
+from .checks import check_shared_cache, check_shared_cache_deploy
+from .models import AumSnapshot, Client, ClientBalance, Contribution, FeeSchedule, FxRate, Investment, LedgerCheckpoint, LedgerEntry
+from .querycount import assert_max_queries
+from .revaluation import revalue_chunk
+from .routers import PIN_COOKIE, ReplicaPinMiddleware, on_primary, reads_from_replica
+from .summaries import summary_cache
+
+
+def create_client(manager, index=0, **kwargs):
+    fields = {
+        'full_name': f"Client {index}",
+        'email': f"client{index}@example.com",
+        'phone': '0970000000',
+        'city': 'Lusaka',
+        'date_of_birth': date(1990, 1, 1),
+        'client_nrc': f"{index:06d}/11/1",
+        'date_of_joining': date(2023, 1, 1),
+        'risk_level': 'medium',
+        'contribution_type': 'regular_contribution',
+        'contribution_frequency': 'monthly',
+        'financial_goal': 'retirement',
+        'target_amount': Decimal('100000.00'),
+        'expected_contribution': Decimal('1000.00'),
+        'currency': 'zmw',
+        'manager': manager,
+    }
+    fields.update(kwargs)
+    return Client.objects.create(**fields)
+
+
+def create_contribution(client, amount='1000.00', **kwargs):
+    contribution = Contribution(
+        client=client,
+        manager=client.manager,
+        date=kwargs.pop('date', date(2023, 1, 1)),
+        contribution_amount=Decimal(amount),
+        payment_method='bank_transfer',
+        **kwargs
+    )
+    contribution.save()
+    return contribution
+
+
+def create_investment(client, amount='500.00', **kwargs):
+    investment = Investment(
+        client=client,
+        manager=client.manager,
+        investment_duration=kwargs.pop('investment_duration', 12),
+        start_date=kwargs.pop('start_date', date(2023, 2, 1)),
+        investment_type='fd',
+        investment_amount=Decimal(amount),
+        expected_annual_growth_rate_percentage=kwargs.pop('expected_annual_growth_rate_percentage', Decimal('10.000')),
+        **kwargs
+    )
+    investment.save()
+    return investment
+
+
+# The app's routes plus the async read views under /async/, whichever ASYNC_READ_VIEWS selects
+urlpatterns = [
+    path('', include('LISP.urls')),
+    path('async/client/', async_views.all_client_data),
+    path('async/contribution/', async_views.all_contribution_data),
+    path('async/investment/', async_views.all_investment_data),
+    path('async/individual/client/<int:pk>/', async_views.individual_client_data),
+    path('async/individual/contributions/<int:pk>/', async_views.individual_contribution_data),
+    path('async/individual/investments/<int:pk>/', async_views.individual_investment_data),
+]
+
+
+class RevaluationTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '100000.00')
+
+    def stored(self):
+        return {
+            row[0]: row[1:]
+            for row in Investment.objects.values_list('pk', 'maturity_date', 'expected_current_value', 'status')
+        }
+
+    def test_bulk_revaluation_matches_save_across_chunks(self):
+        for index in range(7):
+            create_investment(self.customer, f'{1000 + index * 250}.00', start_date=date.today() - timedelta(days=150 * index),
+                              investment_duration=12, expected_annual_growth_rate_percentage=Decimal(f'{5 + index}.250'))
+        saved = self.stored()
+        self.assertEqual({status for _, _, status in saved.values()}, {'active', 'completed'})
+        Investment.objects.update(maturity_date=None, expected_current_value=None, status='active', last_valued_at=None)
+
+        result = revaluation.revalue_investments(chunk_size=3, batch_size=2)
+        self.assertEqual(result.rows, 7)
+        self.assertEqual(self.stored(), saved)
+        self.assertFalse(Investment.objects.filter(last_valued_at__isnull=True).exists())
+
+    def test_command_revalues_everything_with_all(self):
+        create_investment(self.customer, start_date=date(2023, 2, 1))
+        Investment.objects.update(expected_current_value=None)
+        output = StringIO()
+        call_command('revalue_investments', '--all', '--chunk-size', '1', stdout=output)
+        self.assertIn("1 investments revalued", output.getvalue())
+        self.assertIsNotNone(Investment.objects.get().expected_current_value)
+
+
+class ClientBalanceTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        fees.fee_schedule.invalidate()  # 3% default fee
+
+    def balance(self):
+        balance = ClientBalance.objects.get(client=self.customer)
+        return (balance.total_contributed, balance.total_investable, balance.total_invested, balance.available)
+
+    def test_saves_and_deletes_move_the_balance_by_their_delta(self):
+        contribution = create_contribution(self.customer, '1000.00')
+        self.assertEqual(self.balance(), (Decimal('1000.00'), Decimal('970.00'), Decimal('0.00'), Decimal('970.00')))
+        contribution.contribution_amount = Decimal('2000.00')
+        contribution.save()
+        self.assertEqual(self.balance(), (Decimal('2000.00'), Decimal('1940.00'), Decimal('0.00'), Decimal('1940.00')))
+
+        investment = create_investment(self.customer, '500.00')
+        self.assertEqual(self.balance()[2:], (Decimal('500.00'), Decimal('1440.00')))
+        investment.investment_amount = Decimal('700.00')
+        investment.save()
+        self.assertEqual(self.balance()[2:], (Decimal('700.00'), Decimal('1240.00')))
+
+        investment.delete()
+        self.assertEqual(self.balance()[2:], (Decimal('0.00'), Decimal('1940.00')))
+        contribution.delete()
+        self.assertEqual(self.balance(), (Decimal('0.00'),) * 4)
+
+    def test_rebuild_balances_verifies_and_repairs_drift(self):
+        create_contribution(self.customer, '1000.00')
+        ClientBalance.objects.update(available=Decimal('5.00'))
+        output = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 client balance(s) out of date"):
+            call_command('rebuild_balances', '--verify', stdout=output)
+        self.assertIn(f"Client {self.customer.pk}: available 5.00, expected 970.00", output.getvalue())
+
+        call_command('rebuild_balances', stdout=output)
+        self.assertEqual(self.balance()[3], Decimal('970.00'))
+        call_command('rebuild_balances', '--verify', stdout=output)
+        self.assertIn("All client balances match", output.getvalue())
+
+
+@override_settings(TABLE_RECHECK_SECONDS=3600)  # the timed table stamp checks would otherwise land in a budget
+class QueryBudgetTests(TestCase):
+    """List and detail views must run a fixed number of queries however many rows they render."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password', first_name='Jane', last_name='Banda')
+        self.client.force_login(self.manager)
+        # The FX rate table loads once per process, not per page, so keep it out of the budgets
+        fx.rate_table.invalidate()
+        fx.rate_table.rate('zmw', date.today())
+
+    def add_rows(self, count, offset=0):
+        clients = []
+        for index in range(offset, offset + count):
+            client = create_client(self.manager, index)
+            create_contribution(client)
+            create_investment(client)
+            clients.append(client)
+        return clients
+
+    def assert_constant_queries(self, url, budget):
+        self.add_rows(2)
+        with assert_max_queries(budget) as small:
+            self.client.get(url)
+        self.add_rows(10, offset=2)
+        with assert_max_queries(budget) as large:
+            self.client.get(url)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    # Session, user and the listing itself, plus one COUNT/MAX() lookup per table for the ETag
+    def test_client_list(self):
+        self.assert_constant_queries(reverse('client'), 4)
+
+    def test_contribution_list(self):
+        self.assert_constant_queries(reverse('client_contribution'), 5)
+
+    def test_investment_list(self):
+        self.assert_constant_queries(reverse('client_investment'), 5)
+
+    def test_individual_pages(self):
+        client = self.add_rows(1)[0]
+        for _ in range(5):
+            create_contribution(client)
+        for name in ('individual_client', 'individual_contributions', 'individual_investments'):
+            with assert_max_queries(5):
+                self.client.get(reverse(name, args=[client.id]))
+
+    def test_middleware_reports_query_count(self):
+        response = self.client.get(reverse('client'))
+        self.assertTrue(response['X-Query-Count'].isdigit())
+
+    def test_budget_helper_fails_over_budget(self):
+        self.add_rows(3)
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                for contribution in Contribution.objects.all():
+                    str(contribution)
+
+
+class AllocationTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '1000.00', fee_rate_percentage=Decimal('0.000'))
+
+    def test_stale_form_check_cannot_over_allocate(self):
+        first = Investment(client=self.customer, manager=self.manager, investment_duration=12, start_date=date(2023, 2, 1),
+                           investment_type='fd', investment_amount=Decimal('700.00'), expected_annual_growth_rate_percentage=Decimal('10.000'))
+        second = Investment(client=self.customer, manager=self.manager, investment_duration=12, start_date=date(2023, 2, 1),
+                            investment_type='fd', investment_amount=Decimal('700.00'), expected_annual_growth_rate_percentage=Decimal('10.000'))
+        # Both pass validation against the same balance, as two simultaneous form posts would
+        first.full_clean()
+        second.full_clean()
+        first.save(validate=False)
+        with self.assertRaises(ValidationError):
+            second.save(validate=False)
+        self.assertEqual(ClientBalance.objects.get(client=self.customer).available, Decimal('300.00'))
+        self.assertEqual(Investment.objects.filter(client=self.customer).count(), 1)
+
+    def test_editing_counts_the_previous_amount_as_available(self):
+        investment = create_investment(self.customer, '800.00')
+        investment.investment_amount = Decimal('1000.00')
+        investment.save()
+        self.assertEqual(ClientBalance.objects.get(client=self.customer).available, Decimal('0.00'))
+
+    def test_resaving_an_over_allocated_client_investment(self):
+        investment = create_investment(self.customer, '800.00')
+        Contribution.objects.get(client=self.customer).delete()
+        self.assertEqual(ClientBalance.objects.get(client=self.customer).available, Decimal('-800.00'))
+
+        investment.description = 'Rolled over'
+        investment.save()
+        investment.save(validate=False)
+        investment.investment_amount = Decimal('500.00')
+        investment.save()
+        self.assertEqual(ClientBalance.objects.get(client=self.customer).available, Decimal('-500.00'))
+
+        investment.investment_amount = Decimal('600.00')
+        with self.assertRaises(ValidationError):
+            investment.save(validate=False)
+        self.assertEqual(Investment.objects.get(pk=investment.pk).investment_amount, Decimal('500.00'))
+
+
+class ConcurrentAllocationTests(TransactionTestCase):
+    """Many threads allocating from one client's balance at once must never over-allocate it."""
+
+    threads = 8
+    attempts_per_thread = 6
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '10000.00', fee_rate_percentage=Decimal('0.000'))
+
+    def allocate(self, results, barrier):
+        barrier.wait()
+        try:
+            for _ in range(self.attempts_per_thread):
+                while True:
+                    # A fresh instance per attempt: a rolled-back insert leaves its pk on the old one
+                    investment = Investment(
+                        client_id=self.customer.pk, manager=self.manager, investment_duration=12, start_date=date(2023, 2, 1),
+                        investment_type='fd', investment_amount=Decimal('250.00'), expected_annual_growth_rate_percentage=Decimal('10.000'),
+                    )
+                    try:
+                        investment.save()
+                        results.append('allocated')
+                        break
+                    except ValidationError:
+                        results.append('rejected')
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting on the row lock; retry the transaction
+                        time.sleep(random.uniform(0.001, 0.01))
+        finally:
+            connections.close_all()
+
+    def test_parallel_allocations(self):
+        results = []
+        barrier = threading.Barrier(self.threads)
+        workers = [threading.Thread(target=self.allocate, args=(results, barrier)) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        balance = ClientBalance.objects.get(client=self.customer)
+        invested = sum(Investment.objects.filter(client=self.customer).values_list('investment_amount', flat=True))
+        self.assertEqual(results.count('allocated'), 40)  # 10000 / 250
+        self.assertEqual(results.count('rejected'), self.threads * self.attempts_per_thread - 40)
+        self.assertEqual(invested, Decimal('10000.00'))
+        self.assertEqual(balance.total_invested, invested)
+        self.assertEqual(balance.available, Decimal('0.00'))
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager, 0)
+        self.other = create_client(self.manager, 1)
+
+    def test_csv_streams_the_filtered_rows(self):
+        create_contribution(self.customer, '100.00', date=date(2024, 1, 1))
+        kept = create_contribution(self.customer, '200.00', date=date(2024, 2, 1))
+        create_contribution(self.other, '300.00', date=date(2024, 2, 1))
+
+        response = self.client.get(reverse('export_data', args=['contributions']),
+                                   {'client': self.customer.pk, 'date_from': '2024-01-15'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="contributions_{date.today():%Y%m%d}.csv"')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:6], ['ID', 'Client ID', 'Client Name', 'Currency', 'Date', 'Contribution Amount'])
+        self.assertEqual([row[:6] for row in rows[1:]], [[str(kept.pk), str(self.customer.pk), 'Client 0', 'zmw', '2024-02-01', '200.00']])
+
+    def test_xlsx_holds_current_values(self):
+        create_contribution(self.customer, '1000.00')
+        investment = create_investment(self.customer, '500.00', start_date=date(2023, 2, 1))
+        Investment.objects.update(status='active', expected_current_value=None)  # stale until revalued
+
+        response = self.client.get(reverse('export_data', args=['investments']), {'format': 'xlsx'})
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        header, row = list(sheet.iter_rows(values_only=True))
+        record = dict(zip(header, row))
+        self.assertEqual(record['ID'], investment.pk)
+        self.assertEqual(record['Status'], 'completed')
+        self.assertEqual(Decimal(str(record['Current Value'])), investment.expected_current_value)
+        self.assertIsNone(record['Created At'].tzinfo)
+
+    def test_formulas_in_free_text_are_neutralised(self):
+        Client.objects.filter(pk=self.customer.pk).update(full_name='=HYPERLINK("http://example.com")', city='@SUM(A1)')
+        url = reverse('export_data', args=['clients'])
+
+        rows = list(csv.reader(StringIO(b''.join(self.client.get(url, {'client': self.customer.pk}).streaming_content).decode())))
+        record = dict(zip(rows[0], rows[1]))
+        self.assertEqual((record['Full Name'], record['City']), ('\'=HYPERLINK("http://example.com")', "'@SUM(A1)"))
+        self.assertEqual(record['Phone'], '0970000000')
+
+        response = self.client.get(url, {'client': self.customer.pk, 'format': 'xlsx'})
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        header = [cell.value for cell in sheet[1]]
+        name = sheet[2][header.index('Full Name')]
+        self.assertEqual((name.value, name.data_type), ('=HYPERLINK("http://example.com")', 's'))
+
+    def test_bad_requests(self):
+        url = reverse('export_data', args=['contributions'])
+        self.assertEqual(self.client.get(url, {'client': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_to': '01/02/2024'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'format': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_data', args=['passwords'])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.existing = create_client(self.manager, 0)
+        ClientBalance.objects.get_or_create(client=self.existing)
+        fees.fee_schedule.invalidate()
+
+    def client_row(self, index, **overrides):
+        row = {
+            'full_name': f"Imported {index}", 'email': f"imported{index}@example.com", 'phone': '0970000000',
+            'city': 'Ndola', 'date_of_birth': '1985-05-01', 'client_nrc': f"{index:06d}/22/1", 'date_of_joining': '2024-01-01',
+            'risk_level': 'Low', 'contribution_type': 'regular_contribution', 'contribution_frequency': 'monthly',
+            'financial_goal': 'retirement', 'target_amount': '50000', 'expected_contribution': '500', 'currency': 'ZMW',
+        }
+        row.update(overrides)
+        return row
+
+    def test_clients_are_deduplicated_against_the_database_and_the_file(self):
+        rows = enumerate([
+            self.client_row(1),
+            self.client_row(2, email=self.existing.email),
+            self.client_row(3, client_nrc=self.client_row(1)['client_nrc']),
+            self.client_row(4, date_of_birth='31/02/1985'),
+        ], start=2)
+        report = imports.import_clients(rows, self.manager)
+        self.assertEqual((report.rows, report.created), (4, 1))
+        self.assertEqual([row_number for row_number, _ in report.errors], [3, 4, 5])
+        imported = Client.objects.get(email='imported1@example.com')
+        self.assertEqual((imported.risk_level, imported.currency), ('low', 'zmw'))
+        self.assertTrue(ClientBalance.objects.filter(client=imported).exists())
+
+    def test_contributions_move_balances_once_per_client(self):
+        other = create_client(self.manager, 1)
+        rows = list(enumerate([
+            {'client_nrc': self.existing.client_nrc, 'date': '2024-01-01', 'contribution_amount': '1000.00', 'payment_method': 'Cash'},
+            {'client_nrc': self.existing.client_nrc, 'date': '2024-01-02', 'contribution_amount': '500.00', 'payment_method': 'cash'},
+            {'client_nrc': other.client_nrc, 'date': '2024-01-02', 'contribution_amount': '200.00', 'payment_method': 'cheque',
+             'fee_rate_percentage': '1.000'},
+            {'client_nrc': '999999/99/9', 'date': '2024-01-02', 'contribution_amount': '200.00', 'payment_method': 'cash'},
+            {'client_nrc': other.client_nrc, 'date': '2024-01-02', 'contribution_amount': 'lots', 'payment_method': 'cash'},
+        ], start=2))
+
+        self.assertEqual(str(imports.import_contributions(rows, self.manager, dry_run=True)), "3 of 5 rows would be imported, 2 rejected")
+        self.assertFalse(Contribution.objects.exists())
+
+        with CaptureQueriesContext(connections['default']) as queries, \
+                patch.object(fees.fragments, 'generation', wraps=fees.fragments.generation) as generation:
+            report = imports.import_contributions(rows, self.manager)
+        self.assertEqual([row_number for row_number, _ in report.errors], [5, 6])
+        self.assertEqual(generation.call_count, 1)  # one schedule snapshot, not a counter check per row
+        # Both clients' balances move in one executemany, logged as "2 times: UPDATE ..."
+        balance_updates = [query['sql'] for query in queries.captured_queries if f'UPDATE "{ClientBalance._meta.db_table}"' in query['sql']]
+        self.assertEqual(len(balance_updates), 1)
+        self.assertTrue(balance_updates[0].startswith('2 times'))
+
+        # 3% default fee for the looked-up rates; the given 1% is kept as an override
+        existing = ClientBalance.objects.get(client=self.existing)
+        self.assertEqual((existing.total_contributed, existing.total_investable), (Decimal('1500.00'), Decimal('1455.00')))
+        self.assertTrue(Contribution.objects.get(client=other).fee_rate_overridden)
+        self.assertEqual(ClientBalance.objects.get(client=other).available, Decimal('198.00'))
+        self.assertEqual(find_mismatches(), [])
+
+
+class PendingRevaluationTests(TestCase):
+
+    def setUp(self):
+        manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(manager)
+        create_contribution(self.customer, '10000.00')
+
+    def test_final_and_current_values_are_skipped(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        final = create_investment(self.customer, start_date=date(2023, 2, 1))  # matured 2024-02-01, valued since
+        current = create_investment(self.customer, start_date=date.today())
+        stale = create_investment(self.customer, start_date=date.today() - timedelta(days=30))
+        Investment.objects.filter(pk=stale.pk).update(last_valued_at=yesterday)
+        # Completed, but last valued while still running: its final value was never stored
+        unfinished = create_investment(self.customer, start_date=date(2023, 2, 1))
+        Investment.objects.filter(pk=unfinished.pk).update(last_valued_at=timezone.make_aware(datetime(2023, 6, 1)))
+
+        today = date.today()
+        self.assertEqual(set(revaluation.pending_revaluation(today).values_list('pk', flat=True)), {stale.pk, unfinished.pk})
+        self.assertEqual(revaluation.revaluation_stats(today),
+                         {'total': 4, 'active': 2, 'final': 1, 'valued_today': 2, 'pending': 2})
+        output = StringIO()
+        call_command('revalue_investments', '--dry-run', stdout=output)
+        self.assertEqual(output.getvalue().strip(), "total=4 active=2 final=1 valued_today=2 pending=2")
+        self.assertEqual(Investment.objects.get(pk=stale.pk).last_valued_at, yesterday)  # a dry run writes nothing
+
+        skipped = dict(Investment.objects.filter(pk__in=[final.pk, current.pk]).values_list('pk', 'last_valued_at'))
+        self.assertEqual(revaluation.revalue_pending(partition_size=1).rows, 2)
+        self.assertEqual(revaluation.revaluation_stats(today)['pending'], 0)
+        self.assertEqual(dict(Investment.objects.filter(pk__in=skipped).values_list('pk', 'last_valued_at')), skipped)
+
+
+class CurrentValueTests(TestCase):
+
+    def test_sql_values_match_the_python_kernel(self):
+        manager = User.objects.create_user('manager', password='password')
+        customer = create_client(manager)
+        create_contribution(customer, '10000000.00')
+        rng = random.Random(8)
+        for _ in range(60):
+            create_investment(customer, f'{rng.randint(100, 2000000) / 100:.2f}',
+                              start_date=date(2020, 1, 1) + timedelta(days=rng.randint(0, 1500)),
+                              investment_duration=rng.choice((3, 6, 12, 24, 60)),
+                              expected_annual_growth_rate_percentage=Decimal(rng.randint(0, 30000)) / 1000)
+
+        as_of = date(2024, 3, 15)
+        rows = Investment.objects.filter(start_date__lte=as_of).with_current_value(as_of).values(
+            'investment_amount', 'expected_annual_growth_rate_percentage', 'start_date', 'maturity_date', 'current_value', 'current_status',
+        )
+        self.assertGreater(len(rows), 40)
+        for row in rows:
+            days = (min(row['maturity_date'], as_of) - row['start_date']).days
+            expected = valuation.value(row['investment_amount'], row['expected_annual_growth_rate_percentage'], days)
+            self.assertEqual(row['current_value'], expected, row)
+            self.assertEqual(row['current_status'], 'completed' if row['maturity_date'] < as_of else 'active')
+
+
+class AumSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager, currency='usd')
+        create_contribution(self.customer, '1000.00')
+        fees.fee_schedule.invalidate()
+        self.addCleanup(fees.fee_schedule.invalidate)  # drop the bands about to be rolled back
+
+    def groups(self, day):
+        return {
+            (row.investment_type, row.currency, row.risk_level, row.manager_id): (row.investment_count, row.invested_amount, row.current_value)
+            for row in AumSnapshot.objects.filter(snapshot_date=day)
+        }
+
+    def test_incremental_matches_full_after_fee_recompute_and_maturity(self):
+        matured = create_investment(self.customer, '300.00', start_date=date(2023, 2, 1), investment_duration=12)
+        create_investment(self.customer, '200.00', start_date=date.today(), investment_duration=12)
+        Investment.objects.filter(pk=matured.pk).update(status='active')  # matured, not yet completed
+        aum.build_snapshot(date(2024, 1, 1), full=True)
+        self.assertEqual(self.groups(date(2024, 1, 1))[('fd', 'usd', 'medium', self.manager.pk)][0], 2)
+
+        FeeSchedule.objects.create(effective_from=date(2020, 1, 1), fee_rate_percentage=Decimal('1.000'))
+        self.assertEqual(fees.recompute_fees(Contribution.objects.all()).changed, 1)
+        self.assertEqual(maturities.complete_matured(), 1)
+        run = aum.build_snapshot(date(2024, 1, 2))
+        self.assertFalse(run.full_rebuild)
+        incremental = self.groups(date(2024, 1, 2))
+        aum.build_snapshot(date(2024, 1, 2), full=True)
+        self.assertEqual(incremental, self.groups(date(2024, 1, 2)))
+
+        # The matured investment's final value is back in cash, next to the 990.00 left after the new 1% fee
+        final_value = Investment.objects.get(pk=matured.pk).expected_current_value
+        self.assertEqual(incremental[('cash', 'usd', 'medium', self.manager.pk)][2], Decimal('990.00') - Decimal('500.00') + final_value)
+        self.assertEqual(incremental[('fd', 'usd', 'medium', self.manager.pk)][:2], (1, Decimal('200.00')))
+
+    def test_client_edits_and_deletions_are_not_carried_forward(self):
+        kept = create_investment(self.customer, '300.00', start_date=date.today(), investment_duration=12)
+        removed = create_investment(self.customer, '200.00', start_date=date.today(), investment_duration=12)
+        aum.build_snapshot(date(2024, 1, 1), full=True)
+
+        self.customer.full_name = 'Renamed'
+        self.customer.save()
+        self.assertFalse(aum.build_snapshot(date(2024, 1, 2)).full_rebuild)
+
+        removed.delete()
+        run = aum.build_snapshot(date(2024, 1, 3))
+        self.assertTrue(run.full_rebuild)
+        self.assertEqual(self.groups(date(2024, 1, 3))[('fd', 'usd', 'medium', self.manager.pk)][:2], (1, Decimal('300.00')))
+
+        self.customer.risk_level = 'high'
+        self.customer.save()
+        self.assertTrue(aum.build_snapshot(date(2024, 1, 4)).full_rebuild)
+        self.assertEqual({key[2] for key in self.groups(date(2024, 1, 4))}, {'high'})
+
+        kept.investment_type = 'bond'
+        kept.save()
+        self.assertTrue(aum.build_snapshot(date(2024, 1, 5)).full_rebuild)
+        self.assertEqual({key[0] for key in self.groups(date(2024, 1, 5))}, {'bond', 'cash'})
+        self.assertFalse(aum.build_snapshot(date(2024, 1, 6)).full_rebuild)
+
+    def test_dashboard_days_are_validated_and_clamped(self):
+        create_investment(self.customer, '300.00', start_date=date.today(), investment_duration=12)
+        aum.build_snapshot(date(2024, 1, 1), full=True)
+        self.assertEqual(
+            [row['investment_type_display'] for row in self.client.get(reverse('aum_dashboard')).context['by_type']],
+            ['Cash', 'Fixed Deposit'],
+        )
+        self.assertEqual(self.client.get(reverse('aum_dashboard'), {'days': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('aum_dashboard'), {'days': '10000000000'}).status_code, 200)
+        self.assertEqual(len(self.client.get(reverse('aum_dashboard'), {'days': '-5'}).context['trend']), 1)
+
+
+class SummaryCacheTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        caches['default'].clear()
+
+    def lookups(self):
+        stats = summary_cache.stats()
+        return stats['hits'], stats['misses']
+
+    def test_hit_until_save_or_delete(self):
+        contribution = create_contribution(self.customer, '1000.00', fee_rate_percentage=Decimal('0.000'))
+        hits, misses = self.lookups()
+        self.assertEqual(summary_cache.get(self.customer.pk)['total_contributed'], Decimal('1000.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(summary_cache.get(self.customer.pk)['total_contributed'], Decimal('1000.00'))
+
+        contribution.contribution_amount = Decimal('1500.00')
+        contribution.save()
+        self.assertEqual(summary_cache.get(self.customer.pk)['total_contributed'], Decimal('1500.00'))
+        contribution.delete()
+        self.assertEqual(summary_cache.get(self.customer.pk)['contribution_count'], 0)
+        self.assertEqual(self.lookups(), (hits + 1, misses + 3))
+
+    def test_moving_a_row_invalidates_both_clients(self):
+        other = create_client(self.manager, 1)
+        contribution = create_contribution(self.customer, '1000.00')
+        investment = create_investment(self.customer, '500.00')
+        create_contribution(other, '1000.00')
+        self.assertEqual(summary_cache.get(self.customer.pk)['contribution_count'], 1)
+        self.assertEqual(summary_cache.get(other.pk)['investment_count'], 0)
+
+        investment.client = other
+        investment.save()
+        self.assertEqual(summary_cache.get(self.customer.pk)['investment_count'], 0)
+        self.assertEqual(summary_cache.get(other.pk)['investment_count'], 1)
+
+        contribution.client = other
+        contribution.save()
+        self.assertEqual(summary_cache.get(self.customer.pk)['contribution_count'], 0)
+        self.assertEqual(summary_cache.get(other.pk)['contribution_count'], 2)
+
+    def test_private_cache_refused_with_several_workers(self):
+        self.assertEqual(check_shared_cache(None), [])
+        self.assertEqual([message.id for message in check_shared_cache_deploy(None)], ['investment_manager.W001'])
+        with override_settings(WEB_CONCURRENCY=4):
+            self.assertEqual([message.id for message in check_shared_cache(None)], ['investment_manager.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+        with override_settings(WEB_CONCURRENCY=4, CACHES=shared):
+            self.assertEqual(check_shared_cache(None) + check_shared_cache_deploy(None), [])
+
+
+@skipUnless(connections['default'].vendor == 'sqlite', "reads SQLite EXPLAIN QUERY PLAN output")
+class QueryPlanTests(TestCase):
+
+    def setUp(self):
+        manager = User.objects.create_user('manager', password='password')
+        customer = create_client(manager)
+        create_contribution(customer, '2000.00')
+        create_investment(customer)
+
+    def test_core_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', '--min-rows', '0', stdout=output)
+        self.assertIn("No sequential scans", output.getvalue())
+
+    def test_full_scans_are_found_in_the_plan(self):
+        unindexed = Client.objects.filter(city='Lusaka').explain()
+        indexed = Contribution.objects.filter(client_id=1).order_by('date').explain()
+        self.assertEqual(query_plans.sequential_scans(unindexed), {Client._meta.db_table})
+        self.assertEqual(query_plans.sequential_scans(indexed), set())
+
+    def test_full_scans_of_large_tables_are_reported(self):
+        unindexed = lambda today=None: [('clients by city', Client.objects.filter(city='Lusaka'))]
+        with patch.object(query_plans, 'core_queries', unindexed):
+            self.assertEqual(query_plans.check_plans(min_rows=2), [])
+            [(name, table, rows, plan)] = query_plans.check_plans(min_rows=1)
+            self.assertEqual((name, table, rows), ('clients by city', Client._meta.db_table, 1))
+
+            output = StringIO()
+            with self.assertRaisesMessage(CommandError, "1 core queries fall back to sequential scans"):
+                call_command('check_query_plans', '--min-rows', '1', stdout=output)
+        self.assertIn(f"clients by city: sequential scan on {Client._meta.db_table} (~1 rows)", output.getvalue())
+
+
+@override_settings(ROOT_URLCONF='investment_manager.tests')
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '1000.00')
+
+    def test_unchanged_pages_return_304(self):
+        for url in (reverse('client'), reverse('client_contribution'), reverse('api_contributions'), '/async/contribution/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repeat.status_code, 304)
+            repeat = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(repeat.status_code, 304)
+
+    def test_writes_change_the_version(self):
+        url = reverse('client_contribution')
+        etag = self.client.get(url)['ETag']
+        contribution = create_contribution(self.customer, '250.00')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        contribution.contribution_amount = Decimal('300.00')
+        contribution.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'300.00', response.content)
+
+        etag = response['ETag']
+        self.customer.full_name = 'Renamed Client'
+        self.customer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Renamed Client')
+
+    def test_writes_the_counter_missed_change_the_version(self):
+        # As from another process whose counter bumps went to its own cache
+        self.addCleanup(fees.fee_schedule.invalidate)
+        url = reverse('client_contribution')
+        extra = create_contribution(self.customer, '250.00')
+        etag = self.client.get(url)['ETag']
+        FeeSchedule.objects.create(effective_from=date(2020, 1, 1), fee_rate_percentage=Decimal('1.000'))
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other'}}):
+            fees.recompute_fees(Contribution.objects.all())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'990.00', response.content)
+
+        etag = response['ETag']
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {Contribution._meta.db_table} WHERE id = %s", [extra.pk])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_repeat_requests_skip_the_listing_query(self):
+        url = reverse('client_investment')
+        create_investment(self.customer)
+        self.client.get(url)
+        with assert_max_queries(4):  # session, user, two COUNT/MAX() lookups; the table comes from the fragment cache
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+class ListApiTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager, 0)
+        self.other = create_client(self.manager, 1)
+
+    def fetch_all(self, url, params):
+        rows, cursor = [], None
+        while True:
+            page = self.client.get(url, {**params, **({'cursor': cursor} if cursor else {})}).json()
+            rows.extend(page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return rows
+
+    def test_cursor_pages_follow_sort_and_filters(self):
+        # Equal amounts make the pk the tie-breaker across page boundaries
+        for day, amount in ((1, '300.00'), (2, '100.00'), (3, '300.00'), (4, '200.00'), (5, '300.00')):
+            create_contribution(self.customer, amount, date=date(2024, 1, day))
+        create_contribution(self.other, '900.00', date=date(2024, 1, 3))
+        url = reverse('api_contributions')
+
+        rows = self.fetch_all(url, {'sort': '-contribution_amount', 'page_size': 2, 'client': self.customer.pk})
+        expected = Contribution.objects.filter(client=self.customer).order_by('-contribution_amount', '-pk')
+        self.assertEqual([row['id'] for row in rows], list(expected.values_list('pk', flat=True)))
+
+        rows = self.fetch_all(url, {'sort': 'date', 'page_size': 1, 'date_from': '2024-01-03', 'date_to': '2024-01-04'})
+        self.assertEqual([(row['date'], row['client_id']) for row in rows],
+                         [('2024-01-03', self.customer.pk), ('2024-01-03', self.other.pk), ('2024-01-04', self.customer.pk)])
+
+    def test_malformed_parameters_are_rejected(self):
+        url = reverse('api_contributions')
+        for params in ({'client': 'abc'}, {'manager': '1.5'}, {'date_from': '2024-13-01'}, {'payment_method': 'gold'},
+                       {'currency': 'eur'}, {'sort': 'description'}, {'cursor': 'not-a-cursor'}, {'page_size': 'ten'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_investment_status_filters_and_sorts_on_current_status(self):
+        create_contribution(self.customer, '2000.00')
+        matured = create_investment(self.customer, start_date=date(2020, 1, 1))
+        running = create_investment(self.customer, start_date=date.today())
+        Investment.objects.update(status='active')  # not yet revalued
+        url = reverse('api_investments')
+
+        response = self.client.get(url, {'status': 'completed'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [matured.pk])
+        rows = self.fetch_all(url, {'sort': '-current_status', 'page_size': 1})
+        self.assertEqual([row['id'] for row in rows], [matured.pk, running.pk])
+        self.assertEqual(self.client.get(url, {'status': 'matured'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'sort': 'status'}).status_code, 400)
+
+
+@override_settings(ROOT_URLCONF='investment_manager.tests')
+class AsyncReadViewTests(TestCase):
+    """The async pages render the same data as their sync counterparts."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '1000.00')
+        create_contribution(self.customer, '500.00')
+        create_investment(self.customer, '400.00')
+
+    @staticmethod
+    def rendered(response, key):
+        if key is None:
+            return response.content  # list pages are served from the fragment cache once rendered
+        return response.context[key]
+
+    async def test_pages_match_sync_views(self):
+        await self.async_client.aforce_login(self.manager)
+        pages = [
+            ('client/', None),
+            ('contribution/', None),
+            ('investment/', None),
+            (f'individual/contributions/{self.customer.pk}/', 'total_amount_contributed'),
+            (f'individual/investments/{self.customer.pk}/', 'total_current_value'),
+            (f'individual/client/{self.customer.pk}/', 'summary'),
+        ]
+        for url, key in pages:
+            sync_response = await self.async_client.get(f'/{url}')
+            async_response = await self.async_client.get(f'/async/{url}')
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(self.rendered(async_response, key), self.rendered(sync_response, key))
+            self.assertTrue(async_response['X-Query-Count'].isdigit())
+
+    async def test_requires_login_and_existing_client(self):
+        response = await self.async_client.get('/async/client/')
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.manager)
+        response = await self.async_client.get('/async/individual/investments/999/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectionTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        FeeSchedule.objects.create(effective_from=date(2020, 1, 1), fee_rate_percentage=Decimal('2.000'))
+        self.addCleanup(fees.fee_schedule.invalidate)  # drop the band about to be rolled back
+
+    def test_balances_match_hand_computation(self):
+        customer = create_client(self.manager, contribution_frequency='annual', expected_contribution=Decimal('1000.00'),
+                                 target_amount=Decimal('3000.00'))
+        create_client(self.manager, 1)
+        create_contribution(customer, '1000.00')  # 980.00 investable after the 2% fee
+        create_investment(customer, '500.00', start_date=date.today(), investment_duration=120)
+
+        with patch.object(fees.fragments, 'generation', wraps=fees.fragments.generation) as generation:
+            projections.load_inputs(Client.objects.all(), date.today())
+        self.assertEqual(generation.call_count, 1)  # one schedule snapshot for every client
+
+        response = self.client.get(reverse('client_projections'), {'client': customer.pk})
+        [row] = response.context['rows']
+        # The 980.00 grows at the portfolio's 10%; 980.00 net of fees is added at each anniversary
+        self.assertAlmostEqual(row['yearly_balances'][1], 980 * 1.1 + 980, places=6)
+        self.assertAlmostEqual(row['balance_5y'], 980 * 1.1 ** 5 + 980 * sum(1.1 ** year for year in range(5)), places=6)
+        self.assertEqual(row['goal_date'], date.today() + relativedelta(months=24))  # 980 * 1.21 + 980 * 2.1 = 3243.8
+
+    def test_malformed_client_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('client_projections'), {'client': 'abc'}).status_code, 400)
+
+
+class SeedingTests(TestCase):
+
+    def test_seeded_book_passes_balance_verification(self):
+        counts = seeding.seed(clients=30, contributions=600, investments=200, managers=2, batch_size=100, seed_value=7)
+        self.assertEqual(Contribution.objects.count(), counts['contributions'])
+        output = StringIO()
+        call_command('rebuild_balances', '--verify', stdout=output)
+        self.assertIn("All client balances match", output.getvalue())
+
+    def test_benchmarked_views_all_resolve(self):
+        manager = User.objects.create_user('manager', password='password')
+        customer = create_client(manager)
+        results = benchmarks.benchmark_views(manager, customer.pk, repeat=1)
+        self.assertEqual(results['pick_client']['url'], reverse('pick_client', args=['contribution']))
+        self.assertEqual({name: result['status'] for name, result in results.items() if result['status'] >= 400}, {})
+
+
+class ClientSearchTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.mwila = create_client(self.manager, 1, full_name='Mwila Banda', email='mwila.banda@example.com', phone='0971112233')
+        self.chanda = create_client(self.manager, 2, full_name='Chanda Phiri', email='chanda@example.com', phone='0965554433')
+
+    def names(self, query):
+        return [row['full_name'] for row in search.typeahead(query)]
+
+    def test_typeahead_matches_each_field_by_prefix(self):
+        self.assertEqual(self.names('mwi'), ['Mwila Banda'])
+        self.assertEqual(self.names('band mwi'), ['Mwila Banda'])
+        self.assertEqual(self.names('mwila.b'), ['Mwila Banda'])
+        self.assertEqual(self.names('096555'), ['Chanda Phiri'])
+        self.assertEqual(self.names('000002/1'), ['Chanda Phiri'])
+        self.assertEqual(self.names('   '), [])
+
+    def test_punctuation_and_operators_match_nothing(self):
+        for query in ('-', '"', '""', '*', '^', '(', ':', '- -', 'AND', 'NOT', 'NEAR('):
+            self.assertEqual(self.names(query), [], query)
+            self.assertFalse(search.filter_clients(Client.objects.all(), query).exists(), query)
+
+    def test_index_lookup_is_cached(self):
+        search.typeahead('mwi')
+        with self.assertNumQueries(2):  # the FTS match and the client rows, no catalog query
+            self.assertEqual(self.names('mwi'), ['Mwila Banda'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.chanda.full_name = 'Chanda Tembo'
+        self.chanda.save()
+        self.assertEqual(self.names('tembo'), ['Chanda Tembo'])
+        self.assertEqual(self.names('phiri'), [])
+        self.chanda.delete()
+        self.assertEqual(self.names('chanda'), [])
+
+    def test_endpoints(self):
+        response = self.client.get(reverse('api_client_typeahead'), {'q': 'chan'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.chanda.id])
+        response = self.client.get(reverse('api_clients'), {'q': 'banda'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.mwila.id])
+        self.assertEqual(self.client.get(reverse('api_client_typeahead'), {'q': 'a', 'limit': 'x'}).status_code, 400)
+
+    def test_picker_links_to_the_create_flows(self):
+        response = self.client.get(reverse('pick_client', args=['investment']))
+        self.assertContains(response, reverse('create_investment', args=[0]).replace('/0/', '/{id}/'))
+        self.assertEqual(self.client.get(reverse('pick_client', args=['other'])).status_code, 404)
+
+
+class MaturityTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '10000.00')
+
+    def test_calendar_buckets(self):
+        today = date(2024, 5, 15)  # a Wednesday
+        on_day = create_investment(self.customer, maturity_date=today)
+        this_week = create_investment(self.customer, maturity_date=date(2024, 5, 19))
+        this_month = create_investment(self.customer, maturity_date=date(2024, 5, 31))
+        create_investment(self.customer, maturity_date=date(2024, 6, 1))
+        Investment.objects.update(status='active')
+
+        calendar = maturities.maturity_calendar(today)
+        ids = {bucket: [row['id'] for row in rows] for bucket, rows in calendar.items()}
+        self.assertEqual(ids['today'], [on_day.id])
+        self.assertEqual(ids['this_week'], [on_day.id, this_week.id])
+        self.assertEqual(ids['this_month'], [on_day.id, this_week.id, this_month.id])
+
+        response = self.client.get(reverse('api_maturities'), {'date': '2024-05-15'})
+        self.assertEqual(len(response.json()['this_month']), 3)
+        self.assertEqual(self.client.get(reverse('maturity_calendar')).status_code, 200)
+
+    def test_week_running_into_next_month(self):
+        today = date(2024, 5, 29)  # a Wednesday; the week ends on Sunday 2 June
+        this_month = create_investment(self.customer, maturity_date=date(2024, 5, 31))
+        next_month = create_investment(self.customer, maturity_date=date(2024, 6, 2))
+        create_investment(self.customer, maturity_date=date(2024, 6, 3))
+        Investment.objects.update(status='active')
+
+        calendar = maturities.maturity_calendar(today)
+        ids = {bucket: [row['id'] for row in rows] for bucket, rows in calendar.items()}
+        self.assertEqual(ids['this_week'], [this_month.id, next_month.id])
+        self.assertEqual(ids['this_month'], [this_month.id])
+        self.assertEqual(calendar['this_week'][1]['maturity_value'], next_month.expected_current_value)
+
+    def test_complete_matured_stores_the_kernel_final_values(self):
+        create_contribution(self.customer, '10000000.00')
+        rng = random.Random(18)
+        for _ in range(80):
+            create_investment(self.customer, f'{rng.randint(100, 2000000) / 100:.2f}',
+                              start_date=date(2018, 1, 1) + timedelta(days=rng.randint(0, 2500)),
+                              investment_duration=rng.choice((1, 3, 6, 12, 24)),
+                              expected_annual_growth_rate_percentage=Decimal(rng.randint(0, 30000)) / 1000)
+        running = create_investment(self.customer, '500.00', start_date=date.today(), investment_duration=12)
+        Investment.objects.update(status='active', expected_current_value=None)
+        matured = Investment.objects.filter(maturity_date__lt=date.today())
+
+        self.assertEqual(maturities.complete_matured(chunk_size=25), matured.count())
+        self.assertEqual(maturities.complete_matured(), 0)
+        for investment in matured:
+            days = (investment.maturity_date - investment.start_date).days
+            self.assertEqual(investment.status, 'completed')
+            self.assertEqual(
+                investment.expected_current_value,
+                valuation.value(investment.investment_amount, investment.expected_annual_growth_rate_percentage, days),
+            )
+        self.assertEqual(Investment.objects.get(pk=running.pk).status, 'active')
+
+
+class ValuationKernelTests(TestCase):
+
+    def reference(self, amount, rate, days):
+        # The formula Investment.save used before the kernel, with nothing cached
+        years = Decimal(days) / Decimal('365.25')
+        return (amount * (Decimal('1') + rate / 100) ** years).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def test_batch_matches_decimal_on_a_large_sample(self):
+        rng = random.Random(19)
+        size = 20000
+        amounts = [Decimal(rng.randint(100, 100000000)) / 100 for _ in range(size)]
+        rates = [Decimal(rng.randint(0, 30000)) / 1000 for _ in range(size)]
+        days = [rng.randint(0, 3660) for _ in range(size)]
+
+        expected = [self.reference(*row) for row in zip(amounts, rates, days)]
+        self.assertEqual(valuation.value_batch(amounts, rates, days), expected)
+        cents = valuation.cents_batch([int(amount * 100) for amount in amounts], [int(rate * 1000) for rate in rates], days)
+        self.assertEqual([Decimal(value).scaleb(-2) for value in cents.tolist()], expected)
+        self.assertEqual([valuation.value(*row) for row in zip(amounts, rates, days)], expected)
+
+    def test_save_and_bulk_revaluation_agree(self):
+        manager = User.objects.create_user('manager', password='password')
+        customer = create_client(manager)
+        create_contribution(customer, '100000.00')
+        investments = [
+            create_investment(customer, amount, start_date=start, investment_duration=months,
+                              expected_annual_growth_rate_percentage=Decimal(rate))
+            for amount, start, months, rate in [
+                ('1234.56', date(2022, 2, 28), 24, '11.125'),
+                ('999.99', date(2023, 7, 1), 6, '24.000'),
+                ('5000.00', date.today(), 12, '0.000'),
+            ]
+        ]
+        saved = {investment.pk: investment.expected_current_value for investment in investments}
+
+        for investment in revalue_chunk(list(Investment.objects.all())):
+            self.assertEqual(investment.expected_current_value, saved[investment.pk])
+
+
+@override_settings(REPORTING_CURRENCY='usd')
+class FxReportingTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password', first_name='Ann', last_name='Banda')
+        self.client.force_login(self.manager)
+        fx.rate_table.invalidate()  # rows loaded by earlier tests were rolled back
+
+    def test_load_rates_stores_inverses_and_looks_up_as_of(self):
+        self.assertEqual(fx.load_rates([(date(2024, 1, 2), 'ZMW', 'usd', '0.04'), (date(2024, 1, 5), 'zmw', 'usd', '0.05')]), 4)
+        self.assertEqual(FxRate.objects.get(currency='usd', quote_currency='zmw', rate_date=date(2024, 1, 2)).rate, Decimal('25'))
+
+        self.assertIsNone(fx.rate_table.rate('zmw', date(2024, 1, 1)))
+        self.assertEqual(fx.rate_table.rate('zmw', date(2024, 1, 4)), Decimal('0.04'))
+        self.assertEqual(fx.rate_table.rate('zmw', date(2024, 2, 1)), Decimal('0.05'))
+        self.assertEqual(fx.rate_table.rate('usd', date(2024, 1, 2)), Decimal('1'))
+
+        # A correction reloads the in-memory table
+        fx.load_rates([(date(2024, 1, 4), 'zmw', 'usd', '0.045')])
+        with self.assertNumQueries(1):
+            self.assertEqual(fx.rate_table.rate('zmw', date(2024, 1, 4)), Decimal('0.045'))
+        with self.assertNumQueries(0):
+            self.assertEqual(fx.rate_table.rate('usd', date(2024, 1, 4), 'zmw'), Decimal('22.2222222222'))
+
+    @override_settings(TABLE_RECHECK_SECONDS=0)
+    def test_rate_table_follows_writes_the_counter_missed(self):
+        fx.load_rates([(date(2024, 1, 2), 'zmw', 'usd', '0.04')])
+        self.assertEqual(fx.rate_table.rate('zmw', date(2024, 1, 2)), Decimal('0.04'))
+        # As from another process whose counter bump went to its own cache: no signal, no bump here
+        FxRate.objects.filter(currency='zmw').update(rate=Decimal('0.05'), updated_at=timezone.now())
+        with self.assertNumQueries(2):
+            self.assertEqual(fx.rate_table.rate('zmw', date(2024, 1, 2)), Decimal('0.05'))
+        with self.assertNumQueries(1):
+            self.assertEqual(fx.rate_table.rate('zmw', date(2024, 1, 2)), Decimal('0.05'))
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FxRate._meta.db_table} WHERE currency = %s", ['zmw'])
+        self.assertIsNone(fx.rate_table.rate('zmw', date(2024, 1, 2)))
+
+    def test_consolidated_totals_use_the_rate_for_each_rows_date(self):
+        fx.load_rates([(date(2024, 1, 1), 'zmw', 'usd', '0.04'), (date(2024, 1, 3), 'zmw', 'usd', '0.05')])
+        rows = [
+            (date(2023, 12, 31), 'zmw', '1000.00'),  # before the first rate
+            (date(2024, 1, 2), 'zmw', '1000.00'),
+            (date(2024, 1, 2), 'usd', '10.00'),
+            (date(2024, 1, 4), 'zmw', '1000.00'),
+            (date(2024, 1, 4), 'usd', '10.00'),
+        ]
+        AumSnapshot.objects.bulk_create([
+            AumSnapshot(snapshot_date=day, investment_type='fd', currency=currency, risk_level='low',
+                        manager=self.manager, investment_count=1, current_value=Decimal(value))
+            for day, currency, value in rows
+        ])
+
+        with self.assertNumQueries(1):
+            trend = aum.consolidated(AumSnapshot.objects.all(), 'snapshot_date', counts=['investment_count'])
+        self.assertEqual([row['consolidated']['current_value'] for row in trend], [Decimal('0.00'), Decimal('50.00'), Decimal('60.00')])
+        self.assertEqual([row['missing_rates'] for row in trend], [1, 0, 0])
+        self.assertEqual(trend[2]['by_currency'], {'usd': {'current_value': Decimal('10.00')}, 'zmw': {'current_value': Decimal('1000.00')}})
+        self.assertEqual(trend[2]['investment_count'], 2)
+
+        response = self.client.get(reverse('aum_dashboard'))
+        self.assertEqual(response.context['by_manager'][0]['consolidated']['current_value'], Decimal('60.00'))
+        self.assertEqual(response.context['missing_rates'], 1)
+
+    def test_client_page_shows_reporting_currency_totals(self):
+        customer = create_client(self.manager, currency='zmw')
+        create_contribution(customer, '1000.00')
+        response = self.client.get(reverse('individual_client', args=[customer.pk]))
+        self.assertIsNone(response.context['reporting']['totals'])
+
+        fx.load_rates([(date.today(), 'zmw', 'usd', '0.04')])
+        response = self.client.get(reverse('individual_client', args=[customer.pk]))
+        self.assertEqual(response.context['reporting']['totals']['total_contributed'], Decimal('40.00'))
+        self.assertContains(response, "In USD at today")
+
+
+class FeeScheduleTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager, currency='zmw')
+        fees.fee_schedule.invalidate()  # bands created by earlier tests were rolled back
+
+    def band(self, rate, effective_from=date(2023, 1, 1), min_amount='0.00', currency='', payment_method=''):
+        return FeeSchedule.objects.create(
+            effective_from=effective_from, currency=currency, payment_method=payment_method,
+            min_amount=Decimal(min_amount), fee_rate_percentage=Decimal(rate),
+        )
+
+    def test_rate_follows_band_version_and_specificity(self):
+        rate = fees.fee_schedule.rate
+        self.assertEqual(rate('zmw', 'cash', date(2024, 1, 1), Decimal('100.00')), fees.DEFAULT_FEE_RATE)
+
+        self.band('3.000')
+        self.band('2.000', min_amount='10000.00')
+        self.band('2.500', effective_from=date(2024, 1, 1))  # replaces both 2023 bands
+        self.band('1.000', currency='zmw', payment_method='mobile_money', effective_from=date(2023, 6, 1))
+
+        self.assertEqual(rate('usd', 'cash', date(2023, 3, 1), Decimal('9999.99')), Decimal('3.000'))
+        self.assertEqual(rate('usd', 'cash', date(2023, 3, 1), Decimal('10000.00')), Decimal('2.000'))
+        self.assertEqual(rate('usd', 'cash', date(2024, 3, 1), Decimal('50000.00')), Decimal('2.500'))
+        self.assertEqual(rate('zmw', 'mobile_money', date(2023, 3, 1), Decimal('100.00')), Decimal('3.000'))
+        self.assertEqual(rate('zmw', 'mobile_money', date(2024, 3, 1), Decimal('100.00')), Decimal('1.000'))
+
+        self.client.post(reverse('create_contribution', args=[self.customer.pk]), {
+            'date': '2024-03-01', 'contribution_amount': '200.00', 'payment_method': 'mobile_money',
+        })
+        contribution = Contribution.objects.get(client=self.customer)
+        self.assertEqual((contribution.fee_rate_percentage, contribution.fees, contribution.investable_amount),
+                         (Decimal('1.000'), Decimal('2.00'), Decimal('198.00')))
+
+    @override_settings(TABLE_RECHECK_SECONDS=0)
+    def test_schedule_follows_writes_the_counter_missed(self):
+        band = self.band('3.000')
+        self.assertEqual(fees.fee_schedule.rate('zmw', 'cash', date(2024, 1, 1), Decimal('100.00')), Decimal('3.000'))
+        # As from another process whose counter bump went to its own cache
+        FeeSchedule.objects.filter(pk=band.pk).update(fee_rate_percentage=Decimal('2.000'), updated_at=timezone.now())
+        self.assertEqual(fees.fee_schedule.rate('zmw', 'cash', date(2024, 1, 1), Decimal('100.00')), Decimal('2.000'))
+
+    def test_edit_moves_looked_up_rate_to_new_band(self):
+        self.band('3.000')
+        self.band('2.000', min_amount='10000.00')
+        self.band('1.000', effective_from=date(2024, 1, 1))
+        looked_up = create_contribution(self.customer, '5000.00', date=date(2023, 6, 1))
+        manual = create_contribution(self.customer, '5000.00', date=date(2023, 6, 1), fee_rate_percentage=Decimal('0.250'))
+
+        looked_up.contribution_amount = manual.contribution_amount = Decimal('20000.00')
+        looked_up.save()
+        manual.save()
+        self.assertEqual((looked_up.fee_rate_percentage, looked_up.fees), (Decimal('2.000'), Decimal('400.00')))
+        self.assertEqual((manual.fee_rate_percentage, manual.fees), (Decimal('0.250'), Decimal('50.00')))
+
+        looked_up.date = date(2024, 2, 1)
+        looked_up.save()
+        self.assertEqual(Contribution.objects.get(pk=looked_up.pk).fee_rate_percentage, Decimal('1.000'))
+        self.assertEqual(find_mismatches(), [])
+
+    def test_batch_fees_round_like_compute_fees(self):
+        rng = random.Random(21)
+        amounts = [Decimal(rng.randint(1, 10**11)) / 100 for _ in range(20000)] + [Decimal('0.50'), Decimal('12.50')]
+        rates = [Decimal(rng.randint(0, 10000)) / 1000 for _ in range(20000)] + [Decimal('1.000'), Decimal('1.000')]
+        batch_fees, batch_investable = fees.compute_fees_batch(
+            [int(amount * 100) for amount in amounts], [int(rate * 1000) for rate in rates]
+        )
+        for amount, rate, fee, investable in zip(amounts, rates, batch_fees.tolist(), batch_investable.tolist()):
+            self.assertEqual((Decimal(fee) / 100, Decimal(investable) / 100), Contribution.compute_fees(amount, rate))
+
+    def test_recompute_corrects_fees_balances_and_summaries(self):
+        self.band('3.000')
+        contributions = [create_contribution(self.customer, amount, date=date(2024, 1, day)) for day, amount in ((1, '1000.00'), (2, '333.33'))]
+        untouched = create_contribution(self.customer, '500.00', date=date(2022, 1, 1))
+        self.assertEqual(summary_cache.get(self.customer.pk)['total_fees'], Decimal('55.00'))
+
+        # The 2024 rate should have been 1.5%
+        self.band('1.500', effective_from=date(2024, 1, 1))
+        result = fees.recompute_fees(Contribution.objects.all())
+        self.assertEqual((result.rows, result.changed, result.uncovered, result.clients), (3, 2, 1, 1))
+
+        recomputed = Contribution.objects.get(pk=contributions[1].pk)
+        self.assertEqual((recomputed.fee_rate_percentage, recomputed.fees, recomputed.investable_amount),
+                         (Decimal('1.500'), Decimal('5.00'), Decimal('328.33')))
+        self.assertEqual(Contribution.objects.get(pk=untouched.pk).fees, Decimal('15.00'))
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(summary_cache.get(self.customer.pk)['total_fees'], Decimal('35.00'))
+        self.assertEqual(fees.recompute_fees(Contribution.objects.all()).changed, 0)
+
+    def test_recompute_keeps_manual_and_uncovered_rates(self):
+        manual = create_contribution(self.customer, '1000.00', date=date(2024, 2, 1), fee_rate_percentage=Decimal('0.500'))
+        uncovered = create_contribution(self.customer, '1000.00', date=date(2022, 6, 1), fee_rate_percentage=Decimal('2.750'))
+        Contribution.objects.filter(pk=uncovered.pk).update(fee_rate_overridden=False)  # as rows from before the flag
+        self.assertTrue(manual.fee_rate_overridden)
+
+        self.band('1.500', effective_from=date(2024, 1, 1))
+        with self.assertRaises(CommandError):
+            call_command('recompute_fees', stdout=StringIO())
+        call_command('recompute_fees', '--all', stdout=StringIO())
+
+        for contribution, rate in ((manual, '0.500'), (uncovered, '2.750')):
+            stored = Contribution.objects.get(pk=contribution.pk)
+            self.assertEqual((stored.fee_rate_percentage, stored.fees), (Decimal(rate), contribution.fees))
+        self.assertEqual(find_mismatches(), [])
+
+
+class LedgerTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        self.customer = create_client(self.manager)
+        fees.fee_schedule.invalidate()
+
+    def totals(self, balance):
+        return (balance.contributed, balance.fees, balance.invested, balance.matured, balance.available)
+
+    def test_as_of_balance_follows_edits_and_deletes(self):
+        contribution = create_contribution(self.customer, '1000.00', date=date(2023, 1, 1))
+        create_contribution(self.customer, '2000.00', date=date(2023, 3, 1))
+        investment = create_investment(self.customer, '500.00', start_date=date(2023, 2, 1), investment_duration=12)
+
+        self.assertEqual(self.totals(ledger.balance_as_of(self.customer.pk, date(2023, 1, 31))),
+                         (Decimal('1000.00'), Decimal('30.00'), 0, 0, Decimal('970.00')))
+        self.assertEqual(self.totals(ledger.balance_as_of(self.customer.pk, date(2024, 2, 1))),
+                         (Decimal('3000.00'), Decimal('90.00'), Decimal('500.00'), Decimal('549.96'), Decimal('2410.00')))
+
+        entries = LedgerEntry.objects.count()
+        contribution.save()  # nothing changed, nothing appended
+        self.assertEqual(LedgerEntry.objects.count(), entries)
+
+        contribution.contribution_amount = Decimal('1500.00')
+        contribution.fee_rate_percentage = None
+        contribution.save()
+        investment.delete()
+        self.assertEqual(LedgerEntry.objects.count(), entries + 2 + 2)  # a difference per kind, and the reversals
+        self.assertEqual(self.totals(ledger.balance_as_of(self.customer.pk, date(2023, 1, 31))),
+                         (Decimal('1500.00'), Decimal('45.00'), 0, 0, Decimal('1455.00')))
+
+        balance = ClientBalance.objects.get(client=self.customer)
+        today = ledger.balance_as_of(self.customer.pk)
+        self.assertEqual((today.contributed, today.available), (balance.total_contributed, balance.available))
+
+        response = self.client.get(reverse('api_client_balance', args=[self.customer.pk]), {'date': '2023-02-15'})
+        self.assertEqual(response.json()['available'], '1455.00')
+        self.assertEqual(self.client.get(reverse('api_client_balance', args=[self.customer.pk]), {'date': 'soon'}).status_code, 400)
+
+    def test_checkpoint_plus_tail_matches_full_history(self):
+        rng = random.Random(22)
+        for _ in range(60):
+            create_contribution(self.customer, f"{rng.randint(100, 5000)}.{rng.randint(0, 99):02d}",
+                                date=date(2023, rng.randint(1, 12), rng.randint(1, 28)))
+        for month in range(1, 7):
+            create_investment(self.customer, '1000.00', start_date=date(2023, month, 15), investment_duration=month)
+        dates = [date(2023, month, 10) for month in range(1, 13)] + [date(2024, 6, 30)]
+        expected = {on: self.totals(ledger.balance_as_of(self.customer.pk, on)) for on in dates}
+
+        first = ledger.build_checkpoints(date(2023, 4, 30), settle_seconds=0)
+        second = ledger.build_checkpoints(date(2023, 8, 31), settle_seconds=0)
+        self.assertEqual((first.carried_from, second.carried_from), (None, date(2023, 4, 30)))
+        self.assertLess(second.entries, LedgerEntry.objects.filter(entry_date__lte=date(2023, 8, 31)).count())
+
+        # Backdated past both checkpoints, after they were taken
+        create_contribution(self.customer, '100.00', date=date(2023, 2, 1))
+        for on in dates:
+            if on >= date(2023, 2, 1):
+                contributed, charged, invested, matured, available = expected[on]
+                expected[on] = (contributed + 100, charged + 3, invested, matured, available + 97)
+
+        for on in dates:
+            with assert_max_queries(2):
+                balance = ledger.balance_as_of(self.customer.pk, on)
+            self.assertEqual(self.totals(balance), expected[on])
+        self.assertEqual(ledger.balance_as_of(self.customer.pk, date(2023, 9, 10)).checkpoint_date, date(2023, 8, 31))
+        self.assertEqual(LedgerCheckpoint.objects.filter(client=self.customer).count(), 2)
+
+
+@override_settings(REPORTING_CURRENCY='usd')
+class PortfolioValuationTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        fx.rate_table.invalidate()
+        self.zambian = create_client(self.manager, 1, currency='zmw')
+        self.american = create_client(self.manager, 2, currency='usd')
+        for customer in (self.zambian, self.american):
+            create_contribution(customer, '100000.00', fee_rate_percentage=0)
+        self.investments = [
+            create_investment(self.zambian, '1000.00', start_date=date(2023, 1, 1), investment_duration=6),
+            create_investment(self.zambian, '2000.00', start_date=date(2023, 3, 1), investment_duration=24,
+                              expected_annual_growth_rate_percentage=Decimal('12.500')),
+            create_investment(self.american, '500.00', start_date=date(2023, 6, 30), investment_duration=12),
+        ]
+        fx.load_rates([(date(2023, 1, 1), 'zmw', 'usd', '0.05')])
+
+    def test_values_as_of_date_with_maturity_cap(self):
+        as_of = date(2023, 9, 30)
+        values = {row[0]: row[1:] for row in portfolios.iter_investment_values(as_of)}
+        first, second, third = self.investments
+        self.assertEqual(values[first.pk], (self.zambian.pk, Decimal('1000.00'), valuation.value(1000, 10, 181), 'completed'))
+        self.assertEqual(values[second.pk][2], valuation.value(2000, Decimal('12.5'), 213))
+        self.assertEqual(values[third.pk][3], 'active')
+        self.assertEqual(len(list(portfolios.iter_investment_values(date(2023, 2, 1)))), 1)
+
+        # As of today the values are the ones save() stored
+        today = {row[0]: row[3] for row in portfolios.iter_investment_values(date.today(), chunk_size=2)}
+        self.assertEqual(today, {investment.pk: investment.expected_current_value for investment in self.investments})
+
+    def test_report_totals_and_api_filters(self):
+        report = portfolios.value_portfolios(date(2023, 9, 30))
+        self.assertEqual([(row['client_id'], row['investments'], row['active']) for row in report.clients],
+                         [(self.zambian.pk, 2, 1), (self.american.pk, 1, 1)])
+        zambian_value = report.by_currency['zmw']['value']
+        self.assertEqual(zambian_value, report.clients[0]['value'])
+        self.assertEqual(report.consolidated['value'],
+                         (zambian_value * Decimal('0.05')).quantize(Decimal('0.01')) + report.by_currency['usd']['value'])
+
+        url = reverse('api_portfolio_valuation')
+        response = self.client.get(url, {'date': '2023-09-30', 'currency': 'usd'})
+        self.assertEqual([row['client_id'] for row in response.json()['clients']], [self.american.pk])
+        self.assertEqual(self.client.get(url, {'date': '2023-09-30', 'client': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class GoalSimulationTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.client.force_login(self.manager)
+        fees.fee_schedule.invalidate()
+        caches['default'].clear()  # keys repeat across tests once their rows are rolled back
+
+    def investor(self, index, risk_level, target='20000.00'):
+        customer = create_client(self.manager, index, risk_level=risk_level, target_amount=Decimal(target),
+                                 contribution_frequency='once_off')
+        create_contribution(customer, '10000.00', fee_rate_percentage=0)
+        investment = create_investment(customer, '10000.00', start_date=date.today(), investment_duration=240,
+                                       expected_annual_growth_rate_percentage=Decimal('7.000'))
+        Investment.objects.filter(pk=investment.pk).update(investment_type='abc_ef')
+        return customer
+
+    def test_probability_follows_risk_and_schedule(self):
+        cautious, bold = self.investor(1, 'low'), self.investor(2, 'high')
+        saver = create_client(self.manager, 3, target_amount=Decimal('2900.00'), expected_contribution=Decimal('1000.00'))
+        create_contribution(saver, '1000.00', fee_rate_percentage=0)
+
+        result = simulations.simulate_goals(paths=2000, horizon_months=60)
+        self.assertEqual(result.simulated, 3)
+        cautious_row, bold_row = result.clients[cautious.pk], result.clients[bold.pk]
+        # Both median paths grow ~7% a year, so 10000 does not double in 5 years; only volatility gets there
+        self.assertLess(cautious_row['probability'], bold_row['probability'])
+        self.assertLess(cautious_row['p90'] - cautious_row['p10'], bold_row['p90'] - bold_row['p10'])
+        # Nothing invested: no growth, no randomness, 970 a month after fees on top of 1000
+        self.assertEqual(result.clients[saver.pk]['probability'], 1.0)
+        self.assertEqual(result.clients[saver.pk]['p50'], 1000 + 60 * 970)
+
+        # Scenarios are shared, so partitioning does not change anyone's numbers
+        inputs = simulations.load_simulation_inputs(Client.objects.all(), date.today())
+        whole = simulations.simulate(inputs, 500, 24)
+        split = [simulations.simulate(inputs.partition(index, index + 1), 500, 24) for index in range(len(inputs))]
+        np.testing.assert_allclose(whole[0], np.concatenate([part[0] for part in split]))
+        np.testing.assert_allclose(whole[1], np.concatenate([part[1] for part in split]))
+
+    def test_cached_until_money_moves(self):
+        cautious, bold = self.investor(1, 'low'), self.investor(2, 'high')
+        first = simulations.simulate_goals(paths=200, horizon_months=24)
+        again = simulations.simulate_goals(paths=200, horizon_months=24)
+        self.assertEqual((again.simulated, again.cached), (0, 2))
+        self.assertEqual(again.clients, first.clients)
+
+        create_contribution(bold, '5000.00', fee_rate_percentage=0)
+        after = simulations.simulate_goals(paths=200, horizon_months=24)
+        self.assertEqual((after.simulated, after.cached), (1, 1))
+        self.assertGreater(after.clients[bold.pk]['p50'], first.clients[bold.pk]['p50'])
+
+        # Moving the cautious client's money into a fixed deposit writes no ledger entry
+        investment = Investment.objects.get(client=cautious)
+        investment.investment_type = 'fd'
+        investment.save()
+        moved = simulations.simulate_goals(paths=200, horizon_months=24)
+        self.assertEqual((moved.simulated, moved.cached), (1, 1))
+        self.assertLess(moved.clients[cautious.pk]['p90'] - moved.clients[cautious.pk]['p10'],
+                        first.clients[cautious.pk]['p90'] - first.clients[cautious.pk]['p10'])
+
+        response = self.client.get(reverse('api_client_goal', args=[cautious.pk]), {'paths': 200, 'horizon_months': 24})
+        self.assertEqual(response.json()['probability'], first.clients[cautious.pk]['probability'])
+        self.assertEqual(self.client.get(reverse('api_client_goal', args=[cautious.pk]), {'paths': 0}).status_code, 400)
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRouterTests(TransactionTestCase):
+    """Routing decisions only; no query reaches the replica alias, so it need not exist."""
+
+    def test_reads_go_to_replica_only_where_marked(self):
+        self.assertEqual(router.db_for_read(Client), 'default')
+        with reads_from_replica():
+            self.assertEqual(router.db_for_read(Client), 'replica')
+            self.assertEqual(router.db_for_write(Client), 'default')
+            with on_primary():
+                self.assertEqual(router.db_for_read(Investment), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Client), 'default')
+            with override_settings(REPLICA_DATABASE_ALIAS=None):
+                self.assertEqual(router.db_for_read(Client), 'default')
+
+    def test_writes_pin_reads_to_primary(self):
+        seen = []
+
+        @reads_from_replica
+        def view(request):
+            seen.append(router.db_for_read(Client))
+            if request.method == 'POST':
+                router.db_for_write(Client)
+                seen.append(router.db_for_read(Client))
+            return HttpResponse()
+
+        middleware = ReplicaPinMiddleware(view)
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        pinned = RequestFactory().get('/')
+        pinned.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        expired = RequestFactory().get('/')
+        expired.COOKIES[PIN_COOKIE] = str(int(time.time()) - 1)
+        self.assertNotIn(PIN_COOKIE, middleware(pinned).cookies)
+        middleware(expired)
+        self.assertEqual(seen[2:], ['default', 'replica'])
+
+
+@skipUnless('replica' in settings.DATABASES, "needs a second database standing in for the replica (REPLICA_DB_NAME)")
+@override_settings(ROOT_URLCONF='investment_manager.tests', REPLICA_DATABASE_ALIAS='replica')
+class ReplicaReadTests(TransactionTestCase):
+    """Against a separate database playing a replica that has not caught up with the primary."""
+
+    # The runner sets up every alias a test class names, skipped or not
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', password='password')
+        self.customer = create_client(self.manager)
+        create_contribution(self.customer, '1000.00', fee_rate_percentage=Decimal('0.000'))
+        # The replica has the client, under another name, but none of their money yet
+        User.objects.using('replica').bulk_create([User(pk=self.manager.pk, username='manager')])
+        stale = Client.objects.get(pk=self.customer.pk)
+        stale.full_name = 'Replica Copy'
+        Client.objects.using('replica').bulk_create([stale])
+        self.client.force_login(self.manager)
+
+    def contributed(self):
+        return Decimal(self.client.get(reverse('api_client_balance', args=[self.customer.pk])).json()['contributed'])
+
+    def test_reports_read_replica_until_user_writes(self):
+        self.assertEqual(self.contributed(), Decimal('0.00'))
+        export = self.client.get(reverse('export_data', args=['clients']))
+        self.assertIn(b'Replica Copy', b''.join(export.streaming_content))
+
+        response = self.client.post(reverse('create_contribution', args=[self.customer.pk]), {
+            'date': '2023-02-01', 'contribution_amount': '500.00', 'payment_method': 'bank_transfer',
+        })
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.contributed(), Decimal('1500.00'))
+
+        self.client.cookies[PIN_COOKIE] = '0'
+        self.assertEqual(self.contributed(), Decimal('0.00'))
+
+    def test_balance_check_reads_primary(self):
+        # 500 left plus the 500 already in this investment covers 800; the replica has never seen the investment
+        investment = create_investment(self.customer, '500.00')
+        investment.investment_amount = Decimal('800.00')
+        with reads_from_replica(), CaptureQueriesContext(connections['replica']) as replica_queries:
+            investment.clean()
+        self.assertEqual(len(replica_queries), 0)
@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, exports, imports, views
+
+
+# Under ASGI the read-heavy pages are served by coroutine views (see async_views.py)
+reads = async_views if getattr(settings, 'ASYNC_READ_VIEWS', False) else views
 
 
 urlpatterns = [
@@ -8,14 +13,29 @@ urlpatterns = [
     path('logout/', views.logout_user, name='logout'),
     path('about/', views.about, name='about'),
     path('register/', views.register_user, name='register'),
-    path('client/', views.all_client_data, name='client'),
-    path('contribution/', views.all_contribution_data, name='client_contribution'),
-    path('investment/', views.all_investment_data, name='client_investment'),
-    path('individual/client/<int:pk>/', views.individual_client_data, name='individual_client'),
-    path('individual/contributions/<int:pk>/', views.individual_contribution_data, name='individual_contributions'),
-    path('individual/investments/<int:pk>/', views.individual_investment_data, name='individual_investments'),
+    path('client/', reads.all_client_data, name='client'),
+    path('contribution/', reads.all_contribution_data, name='client_contribution'),
+    path('investment/', reads.all_investment_data, name='client_investment'),
+    path('individual/client/<int:pk>/', reads.individual_client_data, name='individual_client'),
+    path('individual/contributions/<int:pk>/', reads.individual_contribution_data, name='individual_contributions'),
+    path('individual/investments/<int:pk>/', reads.individual_investment_data, name='individual_investments'),
     path('create_client/', views.create_client, name='create_client'),
     path('update_records/', views.update_records, name='update_records'),
     path('individual/<int:client_id>/create_contribution/', views.create_contribution, name='create_contribution'),
     path('individual/<int:client_id>/create_investment', views.create_investment, name='create_investment'),
+    path('pick_client/<str:action>/', views.pick_client, name='pick_client'),
+    path('api/clients/', api.client_list, name='api_clients'),
+    path('api/contributions/', api.contribution_list, name='api_contributions'),
+    path('api/investments/', api.investment_list, name='api_investments'),
+    path('api/clients/typeahead/', api.client_typeahead, name='api_client_typeahead'),
+    path('api/clients/<int:pk>/balance/', api.client_balance, name='api_client_balance'),
+    path('api/clients/<int:pk>/goal/', api.client_goal, name='api_client_goal'),
+    path('api/maturities/', api.maturity_calendar, name='api_maturities'),
+    path('api/portfolios/valuation/', api.portfolio_valuation, name='api_portfolio_valuation'),
+    path('api/cache-stats/', api.cache_stats, name='api_cache_stats'),
+    path('export/<str:dataset>/', exports.export_data, name='export_data'),
+    path('import/', imports.import_data, name='import_data'),
+    path('projections/', views.client_projections, name='client_projections'),
+    path('aum/', views.aum_dashboard, name='aum_dashboard'),
+    path('maturities/', views.maturity_calendar, name='maturity_calendar'),
 ]
@@ -0,0 +1,116 @@
+"""
+Valuation kernel: value = amount * (1 + rate/100) ** (elapsed_days / 365.25), in cents.
+
+value() is the reference Decimal computation with the growth factor memoized per
+(rate, days); investments share a handful of rates and day counts, so the slow
+fractional Decimal power runs once per pair rather than once per row.
+value_batch() is the float64 NumPy path for bulk work. In exact mode (the default)
+it re-derives, through the Decimal kernel, the few values that land so close to a
+half cent that float rounding could differ, so it returns the same cents as value().
+cents_batch() is the same computation over integer cents in and out.
+"""
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import numpy as np
+
+
+CENT = Decimal('0.01')
+DAYS_PER_YEAR = Decimal('365.25')  # Approximate number of days in a year including leap years
+GROWTH_CACHE_SIZE = 65536
+# float64 is good to ~1e-16 relative; anything within this many cents of a half cent is redone in Decimal
+HALF_CENT_TOLERANCE = 1e-9
+RELATIVE_TOLERANCE = 1e-12
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # day 0 of NumPy's datetime64
+NO_DATE = -1
+
+
+def elapsed_days(start_date, maturity_date, today=None):
+    """Days growth accrues for: up to today, or up to maturity once matured."""
+    today = today or date.today()
+    end = maturity_date if today > maturity_date else today
+    return (end - start_date).days
+
+
+def elapsed_days_batch(start_ordinals, maturity_ordinals, today):
+    """elapsed_days() over arrays of start and maturity date ordinals: (days, matured)."""
+    today = today.toordinal()
+    matured = today > maturity_ordinals
+    return np.where(matured, maturity_ordinals - start_ordinals, today - start_ordinals), matured
+
+
+def ordinals(dates):
+    """date.toordinal() over a sequence of dates or of ISO date strings; None becomes NO_DATE."""
+    if isinstance(next((day for day in dates if day is not None), None), str):
+        # NumPy parses ISO strings in C, far faster than it converts date objects
+        days = np.asarray(dates, dtype='datetime64[D]')
+        return np.where(np.isnat(days), NO_DATE, days.astype(np.int64) + EPOCH_ORDINAL)
+    return np.fromiter((day.toordinal() if day is not None else NO_DATE for day in dates), dtype=np.int64, count=len(dates))
+
+
+@lru_cache(maxsize=GROWTH_CACHE_SIZE)
+def growth_factor(rate, days):
+    """(1 + rate/100) ** (days / 365.25) as a Decimal, memoized per (rate, days)."""
+    return (Decimal('1') + Decimal(rate) / 100) ** (Decimal(days) / DAYS_PER_YEAR)
+
+
+def value(amount, rate, days):
+    """Value in cents of `amount` grown at `rate` percent a year for `days` days."""
+    return (Decimal(amount) * growth_factor(Decimal(rate), int(days))).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _float_values(amounts, rates, days):
+    amount_array = np.asarray(amounts, dtype=np.float64)
+    rate_array = np.asarray(rates, dtype=np.float64)
+    return amount_array * np.power(1 + rate_array / 100, days / float(DAYS_PER_YEAR))
+
+
+def _ambiguous(values):
+    """Indexes of float values too close to a half cent to round reliably."""
+    cents = values * 100
+    distance = np.abs(cents - np.floor(cents) - 0.5)
+    return np.flatnonzero(distance <= np.abs(cents) * RELATIVE_TOLERANCE + HALF_CENT_TOLERANCE)
+
+
+def value_batch(amounts, rates, days, exact=True):
+    """
+    Values for equal-length sequences of amounts, percentage rates and elapsed days,
+    as a list of Decimals rounded to cents. exact=False skips the half-cent check
+    and trusts float64 throughout.
+    """
+    amounts = list(amounts)
+    rates = list(rates)
+    days = np.asarray(days, dtype=np.int64)
+    values = _float_values(amounts, rates, days)
+    results = [Decimal(repr(v)).quantize(CENT, rounding=ROUND_HALF_UP) for v in values.tolist()]
+    if not exact:
+        return results
+    for index in _ambiguous(values).tolist():
+        results[index] = value(amounts[index], rates[index], days[index])
+    return results
+
+
+def cents_batch(amount_cents, rate_milli, days, exact=True):
+    """
+    value_batch() for integer inputs and output: amounts in cents and rates in
+    thousandths of a percent (as fees.compute_fees_batch takes them), values as an
+    int64 array of cents, for callers that read columns straight from the database
+    and sum or group the values in NumPy.
+    """
+    amount_cents = np.asarray(amount_cents, dtype=np.int64)
+    rate_milli = np.asarray(rate_milli, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    # Dividing the integers rounds exactly as float(Decimal) would, so this matches value_batch
+    values = _float_values(amount_cents / 100, rate_milli / 1000, days)
+    cents = np.floor(np.abs(values) * 100 + 0.5).astype(np.int64) * np.sign(values).astype(np.int64)
+    if exact:
+        for index in _ambiguous(values).tolist():
+            amount = Decimal(int(amount_cents[index])).scaleb(-2)
+            rate = Decimal(int(rate_milli[index])).scaleb(-3)
+            cents[index] = int(value(amount, rate, days[index]).scaleb(2))
+    return cents
+
+
+def cache_info():
+    return growth_factor.cache_info()
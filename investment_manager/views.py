@@ -2,12 +2,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Client, Investment, Contribution
+from .models import AumSnapshot, Client, Investment, Contribution
 from .forms import SignUpForm, CreateClientForm, CreateContributionForm, CreateInvestmentForm
+from .revaluation import revalue_pending
+from .projections import project_clients
+from . import aum, fx, maturities
+from .summaries import reporting_summary, summary_cache
+from .fragments import conditional_on, render_fragment
+from .routers import reads_from_replica
 from django.core.exceptions import ValidationError
 from django.urls import reverse
-from django.http import HttpResponseRedirect
-from django.db.models import Sum
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect
+from django.core.paginator import Paginator
+from datetime import timedelta
 
 @login_required
 def home(request):
@@ -59,77 +66,146 @@ def register_user(request):
 
 def all_client_data(request):
     if request.user.is_authenticated:
-        # look up client data
-        context = {
-        'clients': Client.objects.all()
-    }
-        return render(request, 'investment_manager/clients.html', context)
+        return client_table(request)
     else:
         messages.success(request, 'You Must Be Logged in to View Client Records!')
         return redirect('login')
+
+
+@conditional_on('clients')
+def client_table(request):
+    # look up client data
+    return render_fragment(request, 'investment_manager/clients.html', lambda: {
+        'clients': Client.objects.all()
+    })
     
 
 def all_contribution_data(request):
     if request.user.is_authenticated:
-        # client = get_object_or_404(Client)
-        contributions = Contribution.objects.all()
-        context = {
-            'contributions': contributions 
-        }
-        return render(request, 'investment_manager/all_client_contributions.html', context)
+        return contribution_table(request)
+
+
+@conditional_on('contributions')
+def contribution_table(request):
+    return render_fragment(request, 'investment_manager/all_client_contributions.html', lambda: {
+        'contributions': Contribution.objects.select_related('client', 'manager')
+    })
 
 
 def all_investment_data(request):
     if request.user.is_authenticated:
-        # Example of fetching investments for a specific client
-        # client = get_object_or_404(Client, pk=request.GET.get('client_id'))
-        investments = Investment.objects.all()
-        context = {
-            'investments': investments
-        }
-        return render(request, 'investment_manager/all_client_investments.html', context)
-    
+        return investment_table(request)
+
+
+@conditional_on('investments')
+def investment_table(request):
+    return render_fragment(request, 'investment_manager/all_client_investments.html', lambda: {
+        'investments': Investment.objects.with_current_value().select_related('client', 'manager')
+    })
+
 @login_required
+@reads_from_replica
 def individual_client_data(request, pk):
-    client_data = get_object_or_404(Client, pk=pk)
-    return render(request, 'investment_manager/individual_client.html', {'client_data': client_data})
+    client_data = get_object_or_404(Client.objects.select_related('manager'), pk=pk)
+    summary = summary_cache.get(client_data.id)
+    context = {
+        'client_data': client_data,
+        'summary': summary,
+        'reporting': reporting_summary(summary, client_data.currency),
+    }
+    return render(request, 'investment_manager/individual_client.html', context)
 
 
 @login_required
+@reads_from_replica
 def individual_contribution_data(request, pk):
     client = Client.objects.get(id=pk)
-    contributions = Contribution.objects.filter(client=client)
-    total_contributions = contributions.count()
-    total_amount_contributed = contributions.aggregate(Sum('contribution_amount'))['contribution_amount__sum'] or 0
-    total_fees = contributions.aggregate(Sum('fees'))['fees__sum'] or 0
+    summary = summary_cache.get(client.id)
+    contributions = Contribution.objects.filter(client=client).select_related('client', 'manager')
 
     context = {
         'client_data': client,
         'contributions': contributions,
-        'total_contributions': total_contributions,
-        'total_amount_contributed': total_amount_contributed,
-        'total_fees': total_fees,
+        'total_contributions': summary['contribution_count'],
+        'total_amount_contributed': summary['total_contributed'],
+        'total_fees': summary['total_fees'],
     }
     return render(request, 'investment_manager/individual_contributions.html', context)
 
 
 @login_required
+@reads_from_replica
 def individual_investment_data(request, pk):
     client = get_object_or_404(Client, id=pk)
-    investments = Investment.objects.filter(client=client)
-    total_investments = investments.count()
-    total_amount_invested = investments.aggregate(Sum('investment_amount'))['investment_amount__sum'] or 0
+    summary = summary_cache.get(client.id)
+    investments = Investment.objects.filter(client=client).with_current_value().select_related('client', 'manager')
 
     context = {
         'client_data': client,
         'investments': investments,
-        'total_investments': total_investments,
-        'total_amount_invested': total_amount_invested,
+        'total_investments': summary['investment_count'],
+        'total_amount_invested': summary['total_invested'],
+        'total_current_value': summary['current_value'],
+        'amount_available': summary['available'],
     }
     return render(request, 'investment_manager/individual_investments.html', context)
 
 
 
+@login_required
+@reads_from_replica
+def client_projections(request):
+    clients = Client.objects.order_by('pk')
+    if request.GET.get('client'):
+        try:
+            clients = clients.filter(pk=int(request.GET['client']))
+        except ValueError:
+            return HttpResponseBadRequest("client must be a client id")
+    page = Paginator(clients, 50).get_page(request.GET.get('page'))
+    page_clients = {client.id: client for client in page}
+
+    projection = project_clients(Client.objects.filter(pk__in=list(page_clients)))
+    rows = []
+    for row in projection.rows():
+        yearly = row['yearly_balances']
+        row.update({
+            'client': page_clients[row['client_id']],
+            'balance_5y': yearly[min(5, len(yearly) - 1)],
+            'balance_10y': yearly[min(10, len(yearly) - 1)],
+        })
+        rows.append(row)
+
+    return render(request, 'investment_manager/projections.html', {'page': page, 'rows': rows})
+
+
+# Longest AUM trend the dashboard draws, in days
+MAX_TREND_DAYS = 366 * 5
+
+
+@login_required
+@reads_from_replica
+def aum_dashboard(request):
+    latest = AumSnapshot.objects.order_by('-snapshot_date').values_list('snapshot_date', flat=True).first()
+    context = {'latest': latest, 'reporting_currency': fx.reporting_currency()}
+    if latest:
+        try:
+            days = max(1, min(int(request.GET.get('days', 90)), MAX_TREND_DAYS))
+        except ValueError:
+            return HttpResponseBadRequest("days must be a whole number")
+        snapshots = AumSnapshot.objects.filter(snapshot_date__gt=latest - timedelta(days=days))
+        context['trend'] = aum.consolidated(snapshots, 'snapshot_date')[::-1]
+
+        current = AumSnapshot.objects.filter(snapshot_date=latest)
+        context['by_type'] = aum.largest_first(aum.consolidated(current, 'investment_type', counts=['investment_count']))
+        labels = aum.type_labels()
+        for row in context['by_type']:
+            row['investment_type_display'] = labels.get(row['investment_type'], row['investment_type'])
+        context['by_risk'] = aum.consolidated(current, 'risk_level')
+        context['by_manager'] = aum.largest_first(aum.consolidated(current, 'manager_id', 'manager__first_name', 'manager__last_name'))
+        context['missing_rates'] = sum(row['missing_rates'] for row in context['trend'])
+    return render(request, 'investment_manager/aum.html', context)
+
+
 @login_required
 def create_client(request):
     if request.method == 'POST':
@@ -160,6 +236,28 @@ def create_contribution(request, client_id):
     return render(request, 'investment_manager/create_contribution.html', {'form': form})
 
 
+@login_required
+@reads_from_replica
+def maturity_calendar(request):
+    return render(request, 'investment_manager/maturities.html', {'calendar': maturities.maturity_calendar()})
+
+
+PICK_CLIENT_ACTIONS = {
+    'contribution': ('Add Contribution', 'create_contribution'),
+    'investment': ('Add Investment', 'create_investment'),
+}
+
+
+@login_required
+def pick_client(request, action):
+    if action not in PICK_CLIENT_ACTIONS:
+        raise Http404(f"Unknown action '{action}'")
+    title, url_name = PICK_CLIENT_ACTIONS[action]
+    # The page swaps {id} for the chosen client's id
+    target_url = reverse(url_name, args=[0]).replace('/0/', '/{id}/')
+    return render(request, 'investment_manager/pick_client.html', {'title': title, 'target_url': target_url})
+
+
 @login_required
 def create_investment(request, client_id):
     if request.method == 'POST':
@@ -167,9 +265,14 @@ def create_investment(request, client_id):
         if form.is_valid():
             investment = form.save(commit=False)
             investment.manager = request.user
-            investment.save()
-            messages.success(request, "Investment Added Successfully!")
-            return HttpResponseRedirect(reverse('create_investment', args=[client_id]))  # Redirect to the same view
+            try:
+                investment.save()
+            except ValidationError as error:
+                # Another allocation for this client committed after the form was validated
+                form.add_error(None, error)
+            else:
+                messages.success(request, "Investment Added Successfully!")
+                return HttpResponseRedirect(reverse('create_investment', args=[client_id]))  # Redirect to the same view
     else:
         form = CreateInvestmentForm(client_id=client_id)
     return render(request, 'investment_manager/create_investment.html', {'form': form})
@@ -185,11 +288,6 @@ def about(request):
 @login_required
 def update_records(request):
     if request.method == 'POST':
-        investments = Investment.objects.all()
-        for investment in investments:
-            try:
-                investment.save(validate=False)  # Bypass validation
-            except ValidationError as e:
-                messages.error(request, f"Failed to update investment {investment.id}: {e}")
-        messages.success(request, "All valid Investment Records updated")
+        result = revalue_pending()
+        messages.success(request, f"All valid Investment Records updated: {result}")
     return render(request, 'investment_manager/update_records.html', {})